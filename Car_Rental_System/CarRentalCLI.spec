@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Not used at runtime; keeps the archive small so the onefile bootloader
+    # has less to unpack before main.py starts.
+    excludes=['tkinter', 'pydoc', 'doctest', 'pytest', '_pytest', 'IPython', 'numpy'],
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +28,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,  # UPX-packed binaries are decompressed on every launch
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -0,0 +1,82 @@
+# benchmarks/bench_rows.py
+"""
+Memory/CPU of a large listing: dictionary-cursor rows with every column
+(the old `SELECT *` + cursor(dictionary=True)) vs projected tuple rows wrapped
+in models.Record.
+
+    python -m benchmarks.bench_rows [rows]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+
+from models.models import Booking
+
+ALL_COLUMNS = ("booking_id", "user_id", "car_id", "start_date", "end_date", "status",
+               "total_cost", "approved_by", "created_at", "updated_at", "brand", "model",
+               "daily_rate", "payment_status", "payment_amount", "qr_token")
+PROJECTED = ("booking_id", "user_id", "car_id", "start_date", "end_date", "status",
+             "total_cost", "brand", "model", "payment_status", "qr_token")
+
+
+class FakeCursor:
+    """Returns driver-style tuples, like mysql.connector's default cursor."""
+    SAMPLE = {
+        "booking_id": 0, "user_id": 2, "car_id": 1,
+        "start_date": date(2025, 9, 6), "end_date": date(2025, 9, 8), "status": "approved",
+        "total_cost": Decimal("149.97"), "approved_by": 1,
+        "created_at": datetime(2025, 9, 1, 10, 0), "updated_at": datetime(2025, 9, 2, 10, 0),
+        "brand": "Toyota", "model": "Corolla", "daily_rate": Decimal("49.99"),
+        "payment_status": "paid", "payment_amount": Decimal("149.97"), "qr_token": "tok",
+    }
+
+    def __init__(self, columns, n):
+        self.description = [(c,) for c in columns]
+        self._rest = tuple(self.SAMPLE[c] for c in columns[1:])
+        self._n = n
+
+    def fetchall(self):
+        rest = self._rest
+        return [(i,) + rest for i in range(self._n)]
+
+
+def _run(build):
+    rows = build()
+    # touch the fields a view prints
+    for r in rows:
+        r["booking_id"], r["brand"], r["status"], r.get("qr_token")
+    return rows
+
+
+def _measure(build):
+    started = time.perf_counter()
+    count = len(_run(build))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    tracemalloc.start()
+    rows = _run(build)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return count, elapsed_ms, peak / 1024 / 1024
+
+
+def main(n: int = 200_000) -> int:
+    def dict_rows():
+        cur = FakeCursor(ALL_COLUMNS, n)
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def record_rows():
+        return Booking.fetchall(FakeCursor(PROJECTED, n))
+
+    for label, build in (("dict rows, all columns", dict_rows), ("Record rows, projected", record_rows)):
+        count, ms, mib = _measure(build)
+        print(f"{label:<26} {count} rows  {ms:8.1f} ms  peak {mib:7.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
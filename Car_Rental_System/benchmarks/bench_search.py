@@ -0,0 +1,54 @@
+# benchmarks/bench_search.py
+"""
+Build an in-memory SearchIndex over synthetic customers and time ranked top-k
+queries (target: p95 under TARGET_MS per query).
+
+    python -m benchmarks.bench_search [users]
+"""
+import random
+import statistics
+import sys
+import time
+
+from utils.search_index import SearchIndex
+
+TARGET_MS = 10.0
+FIRST = ["carl", "carla", "alice", "marcus", "nina", "omar", "priya", "liam", "sofia", "yuki",
+         "mateo", "amara", "jonas", "leila", "tariq", "hana", "diego", "freya", "ravi", "zoe"]
+LAST = ["smith", "jones", "carlsen", "nguyen", "patel", "garcia", "kim", "müller", "okafor", "rossi",
+        "tanaka", "silva", "brown", "khan", "novak", "dubois", "larsen", "cohen", "ali", "wong"]
+DOMAINS = ["example.com", "corp.co.nz", "mail.com", "fleet.io"]
+QUERIES = ["carl", "carla jo", "smith", "example", "priya pat", "arcu", "nguyen", "zoe w", "okafor@", "li"]
+
+
+def build(n: int) -> SearchIndex:
+    rnd = random.Random(42)
+    docs = []
+    for i in range(1, n + 1):
+        first, last = rnd.choice(FIRST), rnd.choice(LAST)
+        docs.append((i, (f"{first.title()} {last.title()}", f"{first}.{last}{i}@{rnd.choice(DOMAINS)}"),
+                     "customer"))
+    idx = SearchIndex()
+    idx.add_many(docs)
+    return idx
+
+
+def main(n: int = 100_000) -> int:
+    started = time.perf_counter()
+    idx = build(n)
+    print(f"indexed {n} users in {(time.perf_counter() - started):.2f} s")
+    samples = []
+    for _ in range(5):
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            idx.search(q, k=20, where=lambda role: role == "customer")
+            samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"top-20 query: median {statistics.median(samples):.2f} ms, p95 {p95:.2f} ms "
+          f"(target {TARGET_MS} ms)")
+    return 0 if p95 <= TARGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,70 @@
+# benchmarks/bench_startup.py
+"""
+Time from launching `python main.py` until the main menu is printed.
+
+Run from the Car_Rental_System folder:
+    python -m benchmarks.bench_startup [runs]
+
+No database is needed: the menu must appear before any connection is opened.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+TARGET_MS = 150          # time-to-first-menu budget (median); was ~200 ms + DB connect before lazy init
+MENU_MARKER = "--- Main Menu ---"
+HEAVY_MODULES = ("mysql.connector", "bcrypt", "qrcode", "qrcode_terminal", "PIL", "dotenv")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_to_first_menu() -> float:
+    """Launch main.py, wait for the menu line, answer 'Exit'. Returns milliseconds."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "main.py"],
+        cwd=APP_DIR,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, encoding="utf-8",
+    )
+    try:
+        for line in proc.stdout:
+            if MENU_MARKER in line:
+                elapsed = (time.perf_counter() - started) * 1000
+                break
+        else:
+            raise RuntimeError("main.py exited before printing the main menu")
+        proc.communicate("3\n", timeout=10)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    return elapsed
+
+
+def heavy_modules_at_import() -> list[str]:
+    """Heavy third-party modules that `import main` pulls in (should be none)."""
+    code = (
+        "import sys, main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+
+def main(runs: int = 10) -> int:
+    samples = [time_to_first_menu() for _ in range(runs)]
+    median = statistics.median(samples)
+    heavy = heavy_modules_at_import()
+    print(f"time to first menu: median {median:.1f} ms, min {min(samples):.1f} ms, "
+          f"max {max(samples):.1f} ms over {runs} runs (target {TARGET_MS} ms)")
+    print("heavy modules imported at startup:", ", ".join(heavy) or "none")
+    ok = median <= TARGET_MS and not heavy
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,92 @@
+# benchmarks/bench_streaming.py
+"""
+Peak memory and time-to-first-row of a listing: fetchall() into a list vs
+utils.streaming.open_stream() batches, for growing result sizes.
+
+    python -m benchmarks.bench_streaming
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+from models.models import Booking
+from utils.streaming import open_stream
+
+ROW = (date(2025, 9, 6), date(2025, 9, 8), "approved", Decimal("149.97"), "Toyota", "Corolla", "paid")
+COLUMNS = ("booking_id", "start_date", "end_date", "status", "total_cost", "brand", "model", "payment_status")
+
+
+class FakeUnbufferedCursor:
+    def __init__(self, n):
+        self.n = n
+        self.pos = 0
+        self.description = [(c,) for c in COLUMNS]
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetchmany(self, size):
+        end = min(self.pos + size, self.n)
+        rows = [(i,) + ROW for i in range(self.pos, end)]
+        self.pos = end
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(self.n - self.pos)
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, n):
+        self._cur = FakeUnbufferedCursor(n)
+
+    def cursor(self):
+        return self._cur
+
+    def close(self):
+        pass
+
+
+def _render(r):
+    return f"#{r['booking_id']} | {r['brand']} {r['model']} | {r['start_date']}→{r['end_date']} | {r['status']}"
+
+
+def run_list(n):
+    cur = FakeConn(n).cursor()
+    started = time.perf_counter()
+    rows = Booking.fetchall(cur)
+    first_ms = None
+    for r in rows:
+        _render(r)
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+    return first_ms
+
+
+def run_stream(n):
+    started = time.perf_counter()
+    first_ms = None
+    for r in open_stream(FakeConn(n), "SELECT ...", (), Booking):
+        _render(r)
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+    return first_ms
+
+
+def main() -> int:
+    for n in (10_000, 100_000, 500_000):
+        for label, fn in (("fetchall", run_list), ("stream", run_stream)):
+            tracemalloc.start()
+            first_ms = fn(n)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{n:>8} rows  {label:<9} first row {first_ms:8.1f} ms  peak {peak / 1024 / 1024:7.2f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 -- =========================
 -- Car Rental DB (SCHEMA)
+-- Baseline only: run `python -m config.migrate up` afterwards
 -- =========================
 CREATE DATABASE IF NOT EXISTS car_rental
   CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci;
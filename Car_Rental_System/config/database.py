@@ -1,31 +1,310 @@
 import os
-import mysql.connector
-from mysql.connector import Error
-from dotenv import load_dotenv
+import threading
+import time
+from contextlib import closing
+
+from utils.metrics import REGISTRY
+
+DB_CONNECTS = REGISTRY.counter("db_connections_total", "Connections opened/checked out", ("target", "outcome"))
+DB_CONNECT_SECONDS = REGISTRY.histogram("db_connect_seconds", "Time to open or check out a connection", ("target",))
+POOL_SIZE = REGISTRY.gauge("db_pool_size", "Connections in primary pools (all pools in this process)")
+POOL_IN_USE = REGISTRY.gauge("db_pool_in_use", "Pooled primary connections currently checked out")
+
+_env_loaded = False
+
+def load_env():
+    """Load environment variables from .env (if present), once, on first use."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def primary_dsn() -> dict:
+    return {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "database": os.getenv("DB_NAME", "car_rental"),
+        "user": os.getenv("DB_USER", "root"),
+        "password": os.getenv("DB_PASSWORD", "root"),
+        "port": int(os.getenv("DB_PORT", 3306)),
+    }
+
+
+def replica_dsns() -> list[dict]:
+    """DB_REPLICAS=host[:port],host[:port] ; same database/credentials as the primary
+    unless DB_REPLICA_USER / DB_REPLICA_PASSWORD are set."""
+    base = primary_dsn()
+    base["user"] = os.getenv("DB_REPLICA_USER", base["user"])
+    base["password"] = os.getenv("DB_REPLICA_PASSWORD", base["password"])
+    dsns = []
+    for item in os.getenv("DB_REPLICAS", "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        dsns.append({**base, "host": host, "port": int(port or base["port"])})
+    return dsns
+
+
+def replication_lag(conn) -> float | None:
+    """
+    Seconds the replica is behind its source; None if replication is broken.
+    A server that is not a replica at all (e.g. a second local copy) reports 0.
+    """
+    with closing(conn.cursor()) as cur:
+        try:
+            cur.execute("SHOW REPLICA STATUS")            # MySQL 8.0.22+
+        except Exception:
+            cur.execute("SHOW SLAVE STATUS")
+        row = cur.fetchone()
+        if row is None:
+            return 0.0
+        cols = [d[0] for d in cur.description]
+        status = dict(zip(cols, row))
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+
+class _Replica:
+    __slots__ = ("dsn", "name", "in_flight", "lag", "lag_checked_at", "down_until")
+
+    def __init__(self, dsn: dict):
+        self.dsn = dsn
+        self.name = f"{dsn['host']}:{dsn['port']}"
+        self.in_flight = 0
+        self.lag = None
+        self.lag_checked_at = None
+        self.down_until = 0.0
+
+
+class ReplicaRouter:
+    """
+    Picks a replica for a read: round_robin, or least_loaded (fewest connections
+    currently checked out from this process). Replicas that fail to connect are
+    skipped for `cooldown` seconds; replicas lagging more than `max_lag` seconds
+    (or with replication stopped) are skipped until their lag is re-checked,
+    at most every `lag_check_interval` seconds.
+    """
+    STRATEGIES = ("round_robin", "least_loaded")
+
+    def __init__(self, dsns: list[dict], strategy: str = "round_robin", max_lag: float = 5.0,
+                 lag_check_interval: float = 2.0, cooldown: float = 30.0, clock=time.monotonic):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown read strategy: {strategy}")
+        self.replicas = [_Replica(d) for d in dsns]
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.cooldown = cooldown
+        self._clock = clock
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def candidates(self) -> list[_Replica]:
+        """Replicas to try, best first (down ones excluded)."""
+        now = self._clock()
+        with self._lock:
+            up = [r for r in self.replicas if r.down_until <= now]
+            if self.strategy == "least_loaded":
+                return sorted(up, key=lambda r: r.in_flight)
+            if not up:
+                return []
+            start = self._next % len(up)
+            self._next += 1
+            return up[start:] + up[:start]
+
+    def mark_down(self, replica: _Replica):
+        replica.down_until = self._clock() + self.cooldown
+
+    def lag_ok(self, replica: _Replica, conn, probe) -> bool:
+        now = self._clock()
+        if replica.lag_checked_at is None or now - replica.lag_checked_at >= self.lag_check_interval:
+            try:
+                replica.lag = probe(conn)
+            except Exception:
+                replica.lag = None
+            replica.lag_checked_at = now
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def checkout(self, replica: _Replica, conn):
+        with self._lock:
+            replica.in_flight += 1
+
+        def release():
+            with self._lock:
+                replica.in_flight -= 1
+        return _TrackedConnection(conn, release, replica.name)
+
+    def stats(self) -> list[dict]:
+        now = self._clock()
+        return [{"replica": r.name, "in_flight": r.in_flight, "lag": r.lag, "up": r.down_until <= now}
+                for r in self.replicas]
+
+
+class _TrackedConnection:
+    """
+    Connection proxy: `release` runs on close (router in-flight count, pool gauge),
+    `on_commit` after each commit (read-your-writes pin on primaries).
+    """
+    __slots__ = ("_conn", "_release", "replica", "_on_commit")
+
+    def __init__(self, conn, release, replica: str, on_commit=None):
+        self._conn = conn
+        self._release = release
+        self.replica = replica
+        self._on_commit = on_commit
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        self._conn.commit()
+        if self._on_commit is not None:
+            self._on_commit()
+
+    def close(self):
+        if self._release is not None:
+            self._release()
+            self._release = None
+        return self._conn.close()
 
-# Load environment variables from .env (if present)
-load_dotenv()
 
 class DatabaseConnection:
-    def __init__(self):
-        self.connection = self.get_connection()
+    """
+    Cheap to construct: nothing is imported or opened until the first query.
+    python-dotenv and mysql.connector are loaded on the first get_connection() call.
+
+    get_connection() always returns the primary; use it for writes and for reads
+    that must see them. get_read_connection() returns a replica from DB_REPLICAS
+    (DB_READ_STRATEGY=round_robin|least_loaded, DB_REPLICA_MAX_LAG seconds) and
+    falls back to the primary when no replica is configured, reachable or fresh.
+    After a commit on a primary connection, reads stay on the primary for
+    DB_PIN_PRIMARY_SECONDS (read-your-writes for whoever shares this instance);
+    a checkout alone, e.g. a read that still uses get_connection(), does not pin.
+
+    With pool_size (or DB_POOL_SIZE), primary connections come from a
+    mysql.connector pool of that size: close() hands them back instead of
+    disconnecting, so a long run of short operations reuses the same sockets.
+
+    `connect(dsn) -> connection` and `lag_probe(conn) -> seconds|None` are pluggable
+    (defaults: mysql.connector.connect and replication_lag), e.g. for tests.
+
+    quiet=True drops the connect banners, for background workers that connect
+    on every poll while the menus (or a batch run's JSON output) own stdout;
+    outcomes are still counted in db_connections_total.
+    """
+    def __init__(self, connect=None, replicas: list[dict] | None = None, strategy: str | None = None,
+                 pin_seconds: float | None = None, lag_probe=None, pool_size: int | None = None,
+                 quiet: bool = False):
+        self._connection = None
+        self.quiet = quiet
+        self._connect = connect
+        self._pool_size = pool_size
+        self._pool = None
+        self._replicas = replicas
+        self._strategy = strategy
+        self._pin_seconds = pin_seconds
+        self._lag_probe = lag_probe or replication_lag
+        self._router = None
+        self._pinned_until = 0.0
+
+    @property
+    def connection(self):
+        """Shared long-lived connection, opened on first access."""
+        if self._connection is None or not self._connection.is_connected():
+            self._connection = self.get_connection()
+        return self._connection
+
+    def _open(self, dsn: dict):
+        if self._connect is not None:
+            return self._connect(dsn)
+        import mysql.connector
+        return mysql.connector.connect(**dsn, autocommit=True)
+
+    def _open_primary(self):
+        size = self._pool_size if self._pool_size is not None else int(os.getenv("DB_POOL_SIZE", 0))
+        if not size or self._connect is not None:
+            conn = self._open(primary_dsn())
+            return conn and _TrackedConnection(conn, None, "primary", self.pin_primary)
+        if self._pool is None:
+            from mysql.connector import pooling
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name=f"car_rental_{id(self)}", pool_size=size, **primary_dsn(), autocommit=True,
+            )
+            POOL_SIZE.inc(size)
+        conn = self._pool.get_connection()
+        POOL_IN_USE.inc()
+        return _TrackedConnection(conn, POOL_IN_USE.dec, "primary", self.pin_primary)
+
+    def _say(self, message: str):
+        if not self.quiet:
+            print(message)
 
     def get_connection(self):
+        load_env()
+        from mysql.connector import Error
+        from mysql.connector.errors import PoolError
+
+        started = time.perf_counter()
         try:
-            connection = mysql.connector.connect(
-                host=os.getenv("DB_HOST", "localhost"),
-                database=os.getenv("DB_NAME", "car_rental"),
-                user=os.getenv("DB_USER", "root"),
-                password=os.getenv("DB_PASSWORD", "root"),
-                port=int(os.getenv("DB_PORT", 3306)),
-                autocommit=True
-            )
+            connection = self._open_primary()
             if connection.is_connected():
-                print("✅ Database connection established!")
+                self._say("✅ Database connection established!")
+                DB_CONNECTS.inc(target="primary", outcome="ok")
             else:
-                print("❌ Database connection failed.")
+                self._say("❌ Database connection failed.")
+                DB_CONNECTS.inc(target="primary", outcome="failed")
             return connection
         except Error as e:
-            print(f"Error connecting to database: {e}")
+            self._say(f"Error connecting to database: {e}")
+            DB_CONNECTS.inc(target="primary", outcome="pool_exhausted" if isinstance(e, PoolError) else "error")
             return None
-        
+        finally:
+            DB_CONNECT_SECONDS.observe(time.perf_counter() - started, target="primary")
+
+    # ---------------- read routing ----------------
+    @property
+    def router(self) -> ReplicaRouter:
+        if self._router is None:
+            load_env()
+            self._router = ReplicaRouter(
+                self._replicas if self._replicas is not None else replica_dsns(),
+                strategy=self._strategy or os.getenv("DB_READ_STRATEGY", "round_robin"),
+                max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", 5)),
+            )
+        return self._router
+
+    def pin_primary(self, seconds: float | None = None):
+        """Send this instance's reads to the primary for the next `seconds`."""
+        if seconds is None:
+            seconds = self._pin_seconds if self._pin_seconds is not None else float(os.getenv("DB_PIN_PRIMARY_SECONDS", 5))
+        self._pinned_until = max(self._pinned_until, time.monotonic() + seconds)
+
+    def get_read_connection(self):
+        router = self.router
+        if not router or time.monotonic() < self._pinned_until:
+            return self._primary_for_read()
+        for replica in router.candidates():
+            started = time.perf_counter()
+            try:
+                conn = self._open(replica.dsn)
+            except Exception:
+                conn = None
+            DB_CONNECT_SECONDS.observe(time.perf_counter() - started, target="replica")
+            if not conn or not conn.is_connected():
+                DB_CONNECTS.inc(target="replica", outcome="error")
+                router.mark_down(replica)
+                continue
+            DB_CONNECTS.inc(target="replica", outcome="ok")
+            if not router.lag_ok(replica, conn, self._lag_probe):
+                conn.close()
+                continue
+            return router.checkout(replica, conn)
+        return self._primary_for_read()
+
+    def _primary_for_read(self):
+        return self.get_connection()
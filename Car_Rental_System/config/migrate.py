@@ -0,0 +1,259 @@
+# config/migrate.py
+"""
+Versioned schema migrations on top of config/car_rental.sql.
+
+Usage (from the Car_Rental_System folder):
+    python -m config.migrate status
+    python -m config.migrate up [--dry-run]
+
+Migrations live in config/migrations as NNNN_name.sql. Each applied version is
+recorded in `schema_migrations` with the file's sha256; editing an applied file
+is refused. Lines of the form
+
+    -- @explain <expected_key>: <SELECT ...>
+
+are query-plan checks: the SELECT is EXPLAINed before and after the migration
+and the report shows whether the optimizer picked <expected_key> afterwards.
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+from contextlib import closing
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_FILE_RE = re.compile(r"^(\d{4})_([A-Za-z0-9_]+)\.sql$")
+_EXPLAIN_RE = re.compile(r"^--\s*@explain\s+([A-Za-z0-9_]+)\s*:\s*(.+)$")
+
+CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version      INT PRIMARY KEY,
+    name         VARCHAR(255) NOT NULL,
+    checksum     CHAR(64) NOT NULL,
+    execution_ms INT NOT NULL DEFAULT 0,
+    applied_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version: int, name: str, path: str, sql: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.sql = sql
+        self.checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        self.statements = split_statements(sql)
+        self.explain_checks = parse_explain_checks(sql)
+
+    def __repr__(self):
+        return f"Migration({self.version:04d}_{self.name})"
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split a migration body on ';' at end of line; '--' comment lines are dropped."""
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("--"):
+            continue
+        current.append(line)
+        if stripped.endswith(";"):
+            stmt = "\n".join(current).strip().rstrip(";").strip()
+            if stmt:
+                statements.append(stmt)
+            current = []
+    tail = "\n".join(current).strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+def parse_explain_checks(sql: str) -> list[tuple[str, str]]:
+    """Return [(expected_key, query), ...] from '-- @explain' lines."""
+    checks = []
+    for line in sql.splitlines():
+        m = _EXPLAIN_RE.match(line.strip())
+        if m:
+            checks.append((m.group(1), m.group(2).strip()))
+    return checks
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list[Migration]:
+    migrations, seen = [], set()
+    for fname in sorted(os.listdir(directory)):
+        m = _FILE_RE.match(fname)
+        if not m:
+            continue
+        version = int(m.group(1))
+        if version in seen:
+            raise MigrationError(f"Duplicate migration version {version:04d}")
+        seen.add(version)
+        path = os.path.join(directory, fname)
+        with open(path, encoding="utf-8") as fh:
+            migrations.append(Migration(version, m.group(2), path, fh.read()))
+    return migrations
+
+
+def pending_migrations(applied: dict[int, str], migrations: list[Migration]) -> list[Migration]:
+    """
+    Compare applied {version: checksum} against files on disk.
+    Raises MigrationError if an applied file was edited or removed.
+    """
+    by_version = {m.version: m for m in migrations}
+    for version, checksum in applied.items():
+        m = by_version.get(version)
+        if m is None:
+            raise MigrationError(f"Applied migration {version:04d} is missing from {MIGRATIONS_DIR}")
+        if m.checksum != checksum:
+            raise MigrationError(
+                f"Checksum mismatch for {version:04d}_{m.name}: file was edited after it was applied"
+            )
+    return [m for m in migrations if m.version not in applied]
+
+
+class MigrationRunner:
+    def __init__(self, db=None, directory: str = MIGRATIONS_DIR, out=None):
+        if db is None:
+            from config.database import DatabaseConnection
+            db = DatabaseConnection()
+        self.db = db
+        self.directory = directory
+        self.out = out or sys.stdout
+
+    def _print(self, *parts):
+        print(*parts, file=self.out)
+
+    @staticmethod
+    def _applied(cur) -> dict[int, str]:
+        cur.execute(CREATE_VERSION_TABLE)
+        cur.execute("SELECT version, checksum FROM schema_migrations ORDER BY version")
+        return {int(v): c for v, c in cur.fetchall()}
+
+    @staticmethod
+    def _explain(cur, query: str) -> list[dict]:
+        cur.execute(f"EXPLAIN {query}")
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    @classmethod
+    def _explain_before(cls, cur, query: str) -> list[dict]:
+        """Plan before the migration; [] when the migration creates the table being read."""
+        try:
+            return cls._explain(cur, query)
+        except Exception:
+            return []
+
+    @staticmethod
+    def _plan_summary(plan: list[dict]) -> str:
+        if not plan:
+            return "(no plan: table not created yet)"
+        return "; ".join(
+            f"{p.get('table')}: type={p.get('type')} key={p.get('key') or '-'} rows={p.get('rows')}"
+            for p in plan
+        )
+
+    def status(self):
+        migrations = load_migrations(self.directory)
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                applied = self._applied(cur)
+        try:
+            pending = pending_migrations(applied, migrations)
+        except MigrationError as e:
+            return {"success": False, "message": str(e)}
+        return {
+            "success": True,
+            "applied": sorted(applied),
+            "pending": [m.version for m in pending],
+        }
+
+    def up(self, dry_run: bool = False):
+        migrations = load_migrations(self.directory)
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                try:
+                    pending = pending_migrations(self._applied(cur), migrations)
+                except MigrationError as e:
+                    return {"success": False, "message": str(e)}
+                if not pending:
+                    return {"success": True, "message": "Schema is up to date", "applied": []}
+
+                done, plan_report = [], []
+                for m in pending:
+                    self._print(f"== {m.version:04d}_{m.name} ({len(m.statements)} statements)")
+                    before = {q: self._explain_before(cur, q) for _, q in m.explain_checks}
+                    if dry_run:
+                        for key, q in m.explain_checks:
+                            self._print(f"   plan before [{key}]: {self._plan_summary(before[q])}")
+                        continue
+
+                    started = time.perf_counter()
+                    for i, stmt in enumerate(m.statements, 1):
+                        try:
+                            cur.execute(stmt)
+                        except Exception as e:
+                            # DDL auto-commits in MySQL, so earlier statements stay applied.
+                            return {
+                                "success": False,
+                                "message": f"{m.version:04d}_{m.name} failed at statement {i}: {e}",
+                                "applied": done,
+                            }
+                    elapsed_ms = int((time.perf_counter() - started) * 1000)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+                        (m.version, m.name, m.checksum, elapsed_ms),
+                    )
+                    conn.commit()
+                    done.append(m.version)
+
+                    for key, q in m.explain_checks:
+                        after = self._explain(cur, q)
+                        used = any(p.get("key") == key for p in after)
+                        plan_report.append({
+                            "version": m.version, "expected_key": key, "uses_expected_key": used,
+                            "before": before[q], "after": after,
+                        })
+                        self._print(f"   [{key}] {'OK' if used else 'NOT USED'}")
+                        self._print(f"     before: {self._plan_summary(before[q])}")
+                        self._print(f"     after:  {self._plan_summary(after)}")
+                    self._print(f"   applied in {elapsed_ms} ms")
+
+                msg = "Dry run complete" if dry_run else f"Applied {len(done)} migration(s)"
+                return {"success": True, "message": msg, "applied": done, "plans": plan_report}
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cmd = argv[0] if argv else "status"
+    runner = MigrationRunner()
+    if cmd == "status":
+        res = runner.status()
+        if res.get("success"):
+            print("Applied:", res["applied"] or "-")
+            print("Pending:", res["pending"] or "-")
+    elif cmd == "up":
+        res = runner.up(dry_run="--dry-run" in argv)
+        if res.get("success"):
+            print("✅", res.get("message"))
+    else:
+        print("Usage: python -m config.migrate [status|up [--dry-run]]")
+        return 2
+    if not res.get("success"):
+        print("❌", res.get("message"))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+-- =========================================
+-- 0001: bookings indexes that match the access paths
+-- =========================================
+-- list_user_bookings  -> WHERE user_id = ? ORDER BY created_at DESC
+-- list_admin_bookings -> WHERE status = ? ORDER BY created_at DESC
+-- overlap checks      -> WHERE car_id = ? AND start_date <= ? AND end_date >= ?
+--
+-- The single-column user/car/status indexes become left prefixes of the new
+-- composites, so they are dropped in the same ALTER (the FKs stay covered).
+
+-- @explain idx_bookings_user_created: SELECT booking_id, status FROM bookings WHERE user_id = 2 ORDER BY created_at DESC
+-- @explain idx_bookings_status_created: SELECT booking_id, user_id FROM bookings WHERE status = 'pending' ORDER BY created_at DESC
+-- @explain idx_bookings_car_dates: SELECT booking_id FROM bookings WHERE car_id = 1 AND start_date <= '2025-09-08' AND end_date >= '2025-09-06'
+
+ALTER TABLE bookings
+    ADD INDEX idx_bookings_user_created   (user_id, created_at),
+    ADD INDEX idx_bookings_status_created (status, created_at),
+    ADD INDEX idx_bookings_car_dates      (car_id, start_date, end_date),
+    DROP INDEX idx_bookings_user,
+    DROP INDEX idx_bookings_car,
+    DROP INDEX idx_bookings_status;
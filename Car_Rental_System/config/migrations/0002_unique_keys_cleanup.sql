@@ -0,0 +1,25 @@
+-- =========================================
+-- 0002: drop indexes that duplicate UNIQUE keys, make payments 1:1
+-- =========================================
+-- users.email and booking_qr_codes.qr_token are already UNIQUE, so
+-- idx_users_email / idx_qr_token only cost extra writes.
+-- PaymentService treats payments as one row per booking; enforce it.
+-- Duplicates (if any) keep the newest payment row.
+
+-- @explain email: SELECT user_id, password, role FROM users WHERE email = 'carl@example.com'
+-- @explain qr_token: SELECT booking_id, expires_at FROM booking_qr_codes WHERE qr_token = 'QR-BOOKING-1-DEMO-TOKEN-ABC123'
+-- @explain uq_payments_booking: SELECT payment_id, payment_status FROM payments WHERE booking_id = 1
+
+DROP INDEX idx_users_email ON users;
+
+DROP INDEX idx_qr_token ON booking_qr_codes;
+
+DELETE p_old
+FROM payments p_old
+JOIN payments p_new
+  ON p_new.booking_id = p_old.booking_id
+ AND p_new.payment_id > p_old.payment_id;
+
+ALTER TABLE payments
+    ADD UNIQUE KEY uq_payments_booking (booking_id),
+    DROP INDEX idx_payments_booking;
@@ -0,0 +1,12 @@
+-- =========================================
+-- 0003: FULLTEXT indexes for customer / car search
+-- =========================================
+-- Replaces `name LIKE '%term%' OR email LIKE '%term%'` (full scan of users)
+-- for SearchService's database path (MATCH ... AGAINST in boolean mode).
+
+-- @explain ft_users_name_email: SELECT user_id FROM users WHERE MATCH(name, email) AGAINST ('+carl*' IN BOOLEAN MODE)
+-- @explain ft_cars_brand_model: SELECT car_id FROM cars WHERE MATCH(brand, model) AGAINST ('+toyota* +cor*' IN BOOLEAN MODE)
+
+ALTER TABLE users ADD FULLTEXT INDEX ft_users_name_email (name, email);
+
+ALTER TABLE cars ADD FULLTEXT INDEX ft_cars_brand_model (brand, model);
@@ -0,0 +1,13 @@
+-- =========================================
+-- 0004: pickup/return timestamps
+-- =========================================
+-- QRService.scan_pickup/scan_return stamp these columns; the baseline schema
+-- never had them, so every scan failed on MySQL with "Unknown column".
+-- The (status, start_date) index serves the gate prefetch of today's pickups.
+
+-- @explain idx_bookings_status_start: SELECT booking_id, car_id FROM bookings WHERE status = 'approved' AND start_date = '2025-09-06'
+
+ALTER TABLE bookings
+    ADD COLUMN pickup_at DATETIME NULL AFTER approved_by,
+    ADD COLUMN return_at DATETIME NULL AFTER pickup_at,
+    ADD INDEX idx_bookings_status_start (status, start_date);
@@ -0,0 +1,26 @@
+-- =========================================
+-- 0005: transactional outbox
+-- =========================================
+-- Domain events (BookingCreated, BookingApproved, ...) are inserted here in the
+-- same transaction as the state change that caused them; services/events.py
+-- OutboxDispatcher delivers them to handlers at least once.
+--   available_at doubles as the delivery lease: a claimed event is pushed into
+--   the future, so if the worker dies it becomes claimable again.
+-- idx_outbox_due serves the claim query (status = 'pending' AND available_at <= NOW()).
+
+-- @explain idx_outbox_due: SELECT event_id FROM outbox_events WHERE status = 'pending' AND available_at <= '2025-09-06 10:00:00' ORDER BY event_id LIMIT 100
+
+CREATE TABLE IF NOT EXISTS outbox_events (
+    event_id      BIGINT AUTO_INCREMENT PRIMARY KEY,
+    event_type    VARCHAR(64) NOT NULL,
+    aggregate_id  INT NOT NULL,
+    payload       JSON NOT NULL,
+    status        ENUM('pending','done','failed') NOT NULL DEFAULT 'pending',
+    attempts      INT NOT NULL DEFAULT 0,
+    last_error    VARCHAR(500) NULL,
+    created_at    DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    available_at  DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    delivered_at  DATETIME(3) NULL,
+    INDEX idx_outbox_due (status, available_at),
+    INDEX idx_outbox_aggregate (aggregate_id, event_id)
+) ENGINE=InnoDB;
@@ -0,0 +1,24 @@
+-- =========================================
+-- 0006: booking status history (audit trail)
+-- =========================================
+-- Append-only log of booking state transitions, written in batches by
+-- services/audit_service.py. bookings.approved_by keeps meaning "who approved";
+-- who picked up / returned / cancelled is recorded here instead.
+--   idx_history_booking: a booking's timeline
+--   idx_history_actor:   one admin's activity, newest first
+
+-- @explain idx_history_booking: SELECT to_status, created_at FROM booking_status_history WHERE booking_id = 42 ORDER BY created_at, history_id
+-- @explain idx_history_actor: SELECT booking_id, action FROM booking_status_history WHERE actor_id = 1 AND created_at >= '2025-09-01' ORDER BY created_at DESC
+
+CREATE TABLE IF NOT EXISTS booking_status_history (
+    history_id   BIGINT AUTO_INCREMENT PRIMARY KEY,
+    booking_id   INT NOT NULL,
+    from_status  VARCHAR(20) NULL,
+    to_status    VARCHAR(20) NOT NULL,
+    action       VARCHAR(32) NOT NULL,
+    actor_id     INT NULL,
+    note         VARCHAR(255) NULL,
+    created_at   DATETIME(3) NOT NULL,
+    INDEX idx_history_booking (booking_id, created_at),
+    INDEX idx_history_actor (actor_id, created_at)
+) ENGINE=InnoDB;
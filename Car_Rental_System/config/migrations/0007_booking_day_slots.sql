@@ -0,0 +1,36 @@
+-- =========================================
+-- 0007: per-day reservation slots
+-- =========================================
+-- One row per (car, day) held by a pending, approved or active booking. The
+-- primary key is what stops two concurrent create_booking calls from both
+-- reserving the same car for overlapping dates: the second INSERT fails with
+-- a duplicate key (services/reservations.py). Slots are deleted on reject,
+-- cancellation and return.
+--   PRIMARY KEY (car_id, day): conflict check, and "is this car free on these days"
+--   idx_slots_booking:         release all slots of a booking
+--
+-- Backfill: existing bookings are expanded to days with a recursive CTE. If the
+-- data already contains overlaps, INSERT IGNORE keeps the first booking's slot.
+
+-- @explain PRIMARY: SELECT booking_id FROM booking_day_slots WHERE car_id = 1 AND day BETWEEN '2025-09-06' AND '2025-09-10'
+-- @explain idx_slots_booking: SELECT day FROM booking_day_slots WHERE booking_id = 42
+
+CREATE TABLE IF NOT EXISTS booking_day_slots (
+    car_id      INT NOT NULL,
+    day         DATE NOT NULL,
+    booking_id  INT NOT NULL,
+    PRIMARY KEY (car_id, day),
+    INDEX idx_slots_booking (booking_id)
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO booking_day_slots (car_id, day, booking_id)
+WITH RECURSIVE d (booking_id, car_id, day, end_date) AS (
+    SELECT booking_id, car_id, start_date, end_date
+    FROM bookings
+    WHERE status IN ('pending', 'approved', 'active') AND end_date >= start_date
+    UNION ALL
+    SELECT booking_id, car_id, day + INTERVAL 1 DAY, end_date
+    FROM d
+    WHERE day < end_date
+)
+SELECT car_id, day, booking_id FROM d ORDER BY booking_id;
@@ -0,0 +1,48 @@
+-- =========================================
+-- 0008: booking summary projection
+-- =========================================
+-- Read model for the booking views (services/booking_summaries.py): one row
+-- per booking with the user name, car brand/model, payment status and whether
+-- a QR token exists, kept current in the same transaction as each write.
+--   idx_summaries_user:    customer "My Bookings", newest first
+--   idx_summaries_status:  admin lists filtered by status, and the status counts
+--   idx_summaries_created: admin "all bookings", newest first
+-- The foreign key removes the summary when a booking is deleted (e.g. with its user).
+
+-- @explain idx_summaries_user: SELECT booking_id, status, brand, model FROM booking_summaries WHERE user_id = 2 ORDER BY created_at DESC
+-- @explain idx_summaries_status: SELECT booking_id, user_name FROM booking_summaries WHERE status = 'pending' ORDER BY created_at DESC LIMIT 200
+-- @explain idx_summaries_created: SELECT booking_id, user_name FROM booking_summaries ORDER BY created_at DESC LIMIT 200
+
+CREATE TABLE IF NOT EXISTS booking_summaries (
+    booking_id      INT PRIMARY KEY,
+    user_id         INT NOT NULL,
+    car_id          INT NOT NULL,
+    start_date      DATE NOT NULL,
+    end_date        DATE NOT NULL,
+    status          VARCHAR(20) NOT NULL,
+    total_cost      DECIMAL(10,2) NULL,
+    created_at      TIMESTAMP NOT NULL,
+    user_name       VARCHAR(100) NOT NULL,
+    brand           VARCHAR(100) NOT NULL,
+    model           VARCHAR(100) NOT NULL,
+    payment_status  VARCHAR(20) NULL,
+    has_qr          BOOLEAN NOT NULL DEFAULT FALSE,
+    INDEX idx_summaries_user (user_id, created_at),
+    INDEX idx_summaries_status (status, created_at),
+    INDEX idx_summaries_created (created_at),
+    CONSTRAINT fk_summaries_booking
+      FOREIGN KEY (booking_id) REFERENCES bookings(booking_id)
+      ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+INSERT INTO booking_summaries
+    (booking_id, user_id, car_id, start_date, end_date, status, total_cost, created_at,
+     user_name, brand, model, payment_status, has_qr)
+SELECT b.booking_id, b.user_id, b.car_id, b.start_date, b.end_date, b.status,
+       b.total_cost, b.created_at, u.name, c.brand, c.model,
+       p.payment_status, q.booking_id IS NOT NULL
+FROM bookings b
+JOIN users u ON u.user_id = b.user_id
+JOIN cars  c ON c.car_id = b.car_id
+LEFT JOIN payments p ON p.booking_id = b.booking_id
+LEFT JOIN booking_qr_codes q ON q.booking_id = b.booking_id;
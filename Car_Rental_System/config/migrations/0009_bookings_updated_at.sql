@@ -0,0 +1,19 @@
+-- =========================================
+-- 0009: bookings.updated_at (export watermark)
+-- =========================================
+-- Incremental BI exports (services/export_service.py) read bookings changed
+-- since a watermark, in (updated_at, booking_id) order. Booking updates bump
+-- the column automatically; payment writes bump it explicitly, since the export
+-- row includes the booking's payment. Millisecond precision keeps rows of the
+-- same second apart, and booking_id breaks the remaining ties.
+-- The baseline column is a nullable TIMESTAMP that is NULL until the first
+-- update, so rows that were never updated start from their created_at.
+
+-- @explain idx_bookings_updated: SELECT booking_id FROM bookings WHERE updated_at > '2025-09-01 00:00:00' AND updated_at <= '2025-09-06 00:00:00' ORDER BY updated_at, booking_id LIMIT 5000
+
+UPDATE bookings SET updated_at = created_at WHERE updated_at IS NULL;
+
+ALTER TABLE bookings
+    MODIFY COLUMN updated_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+        ON UPDATE CURRENT_TIMESTAMP(3),
+    ADD INDEX idx_bookings_updated (updated_at, booking_id);
@@ -0,0 +1,22 @@
+-- =========================================
+-- 0010: idempotency keys
+-- =========================================
+-- Retried writes (create_booking, mark_paid, approve) carry a client key.
+-- services/idempotency.py claims (scope, idem_key) in the write's own
+-- transaction and stores the JSON result before the commit. A retry reads the
+-- result back instead of writing again. Rows live until expires_at. The
+-- housekeeping job purge_idempotency_keys deletes them in chunks through
+-- idx_idem_expires.
+
+-- @explain idx_idem_expires: SELECT scope, idem_key FROM idempotency_keys WHERE expires_at < '2025-09-06 10:00:00' LIMIT 500
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope         VARCHAR(32)  NOT NULL,
+    idem_key      VARCHAR(128) NOT NULL,
+    request_hash  CHAR(64)     NOT NULL,
+    response      JSON         NULL,
+    created_at    DATETIME(3)  NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    expires_at    DATETIME     NOT NULL,
+    PRIMARY KEY (scope, idem_key),
+    INDEX idx_idem_expires (expires_at)
+) ENGINE=InnoDB;
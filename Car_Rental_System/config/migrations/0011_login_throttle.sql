@@ -0,0 +1,19 @@
+-- =========================================
+-- 0011: shared login throttle buckets
+-- =========================================
+-- Only used with LOGIN_THROTTLE_BACKEND=db, when several processes should
+-- share one set of token buckets (utils/throttle.py DBBuckets). The default
+-- backend is per process and needs no table.
+-- There is one row per bucket key: a sha256 of "account:<email>" or
+-- "client:<id>". A row holds the tokens left at updated_at; refill is computed
+-- on read. The housekeeping job purge_login_throttle deletes rows idle long
+-- enough to be full again, through idx_throttle_updated.
+
+-- @explain idx_throttle_updated: SELECT bucket_key FROM login_throttle WHERE updated_at < '2025-09-06 10:00:00' LIMIT 500
+
+CREATE TABLE IF NOT EXISTS login_throttle (
+    bucket_key  CHAR(64)      NOT NULL PRIMARY KEY,
+    tokens      DECIMAL(10,4) NOT NULL,
+    updated_at  DATETIME(3)   NOT NULL,
+    INDEX idx_throttle_updated (updated_at)
+) ENGINE=InnoDB;
@@ -0,0 +1,24 @@
+-- =========================================
+-- 0012: cold storage for finished bookings
+-- =========================================
+-- services/archive_service.py moves bookings that ended long ago and are in a
+-- terminal status (completed, rejected, cancelled) out of the hot tables. Each
+-- booking moves in one transaction together with its payment, QR token and
+-- summary row. The hot tables then only hold recent and live bookings, which is
+-- what every list, count and availability check reads.
+-- The archive tables are created LIKE their hot table: same columns and
+-- indexes, no foreign keys. A column added to a hot table later must be added
+-- to its archive table too.
+--   idx_bookings_status_start (0004) bounds the archiver's scan for candidates
+--   idx_summaries_user on booking_summaries_archive serves the archived half of
+--     a customer's "My Bookings"
+
+-- @explain idx_bookings_status_start: SELECT booking_id FROM bookings WHERE status IN ('completed','rejected','cancelled') AND start_date < '2025-03-01' AND end_date < '2025-03-01' LIMIT 500
+-- @explain idx_summaries_user: SELECT booking_id, status, brand, model FROM booking_summaries_archive WHERE user_id = 2 ORDER BY created_at DESC
+
+CREATE TABLE IF NOT EXISTS bookings_archive LIKE bookings;
+ALTER TABLE bookings_archive ADD COLUMN archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS payments_archive LIKE payments;
+CREATE TABLE IF NOT EXISTS booking_qr_codes_archive LIKE booking_qr_codes;
+CREATE TABLE IF NOT EXISTS booking_summaries_archive LIKE booking_summaries;
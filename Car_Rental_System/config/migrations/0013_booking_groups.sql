@@ -0,0 +1,31 @@
+-- =========================================
+-- 0013: group bookings
+-- =========================================
+-- BookingService.create_group_booking books several cars for one customer and
+-- one date range, all-or-nothing. One transaction inserts a booking_groups row
+-- and a booking per car carrying its group_id. Admins approve or reject the
+-- whole group at once, using idx_bookings_group.
+-- bookings_archive (0012) gets the column too, so archived group bookings keep
+-- their group.
+
+-- @explain idx_bookings_group: SELECT booking_id, status FROM bookings WHERE group_id = 7
+
+CREATE TABLE IF NOT EXISTS booking_groups (
+    group_id    INT AUTO_INCREMENT PRIMARY KEY,
+    user_id     INT NOT NULL,
+    created_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_groups_user
+      FOREIGN KEY (user_id) REFERENCES users(user_id)
+      ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB;
+
+ALTER TABLE bookings
+    ADD COLUMN group_id INT NULL AFTER car_id,
+    ADD INDEX idx_bookings_group (group_id),
+    ADD CONSTRAINT fk_bookings_group
+      FOREIGN KEY (group_id) REFERENCES booking_groups(group_id)
+      ON DELETE SET NULL ON UPDATE CASCADE;
+
+ALTER TABLE bookings_archive
+    ADD COLUMN group_id INT NULL AFTER car_id,
+    ADD INDEX idx_bookings_group (group_id);
@@ -0,0 +1,318 @@
+# controllers/batch_controller.py
+"""
+Scriptable admin commands: `python main.py run commands.txt` (or `run -` for stdin).
+
+One command per line, shell-style quoting, '#' starts a comment:
+
+    approve 41 42 43
+    reject 44
+    approve-group 7
+    reject-group 8
+    mark-paid 41 cash TXN-001 key=till-7-0001
+    add-car brand=Toyota model=Corolla daily_rate=45 year=2021 available_now=1
+    update-car 7 available_now=0
+    delete-car 9
+    reprice brand=Toyota percent=10 dry_run=1
+    set-limits model=RAV4 min_days=2 max_days=21
+    set-availability ids=7,8,9 available=0
+    scan-pickup QR-BOOKING-41-...
+    scan-return QR-BOOKING-41-...
+    list-bookings status=pending limit=50
+
+approve and mark-paid take an optional key=...: re-running a script after an
+interrupted run replays the commands that already went through instead of
+repeating them (approve uses key:booking_id per booking).
+
+Logs in once (--email, or CAR_RENTAL_EMAIL; password from CAR_RENTAL_PASSWORD
+or prompted, admins only), then runs every line on a small connection pool
+(DB_POOL_SIZE, default 2), so commands reuse one open connection. Each command
+prints one JSON object on stdout with its result and "ms"; anything else
+printed during the run (services, background workers) goes to stderr so
+stdout stays machine-readable.
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import time
+from contextlib import closing, nullcontext, redirect_stdout
+from datetime import date, datetime
+from decimal import Decimal
+from getpass import getpass
+
+from config.database import DatabaseConnection
+from services.audit_service import AuditService
+from services.booking_service import BookingService
+from services.car_service import CarService
+from services.event_handlers import build_dispatcher
+from services.payment_service import PaymentService
+from services.qrcode_service import QRService
+from services.userservice import UserService
+from utils.metrics import REGISTRY
+from utils.profiling import profiler
+
+CAR_INT_FIELDS = ("year", "mileage", "min_period_days", "max_period_days")
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "keys"):          # Record rows
+        return dict(value)
+    return str(value)
+
+
+def _split(args: list[str]):
+    """Positional args and key=value options."""
+    positional, options = [], {}
+    for a in args:
+        key, sep, value = a.partition("=")
+        if sep:
+            options[key] = value
+        else:
+            positional.append(a)
+    return positional, options
+
+
+def _car_fields(options: dict) -> dict:
+    fields = {}
+    for key, value in options.items():
+        if key in CAR_INT_FIELDS:
+            fields[key] = int(value) if value else None
+        elif key == "daily_rate":
+            fields[key] = float(value)
+        elif key == "available_now":
+            fields[key] = value.lower() in ("1", "y", "yes", "true")
+        else:
+            fields[key] = value
+    return fields
+
+
+class BatchController:
+    def __init__(self, db: DatabaseConnection, user):
+        self.db = db
+        self.user = user
+        self.booking_service = BookingService(db)
+        self.car_service = CarService(db)
+        self.payment_service = PaymentService(db)
+        self.qr_service = QRService(db)
+        self.verbs = {
+            "approve": self.approve,
+            "reject": self.reject,
+            "approve-group": self.approve_group,
+            "reject-group": self.reject_group,
+            "mark-paid": self.mark_paid,
+            "add-car": self.add_car,
+            "update-car": self.update_car,
+            "delete-car": self.delete_car,
+            "reprice": self.reprice,
+            "set-limits": self.set_limits,
+            "set-availability": self.set_availability,
+            "scan-pickup": self.scan_pickup,
+            "scan-return": self.scan_return,
+            "list-bookings": self.list_bookings,
+        }
+
+    # ---------------- verbs ----------------
+    def _decide(self, args, approve: bool):
+        positional, options = _split(args)
+        ids = [int(a) for a in positional]
+        if not ids:
+            raise ValueError("booking id required")
+        key = options.get("key")
+        results = [dict(self.booking_service.approve_booking(
+                            self.user["user_id"], bid, approve=approve,
+                            idempotency_key=f"{key}:{bid}" if key else None),
+                        booking_id=bid) for bid in ids]
+        ok = sum(1 for r in results if r.get("success"))
+        if len(results) == 1:
+            return results[0]
+        return {"success": ok == len(results), "message": f"{ok}/{len(results)} done", "results": results}
+
+    def approve(self, args):
+        return self._decide(args, True)
+
+    def reject(self, args):
+        return self._decide(args, False)
+
+    def _decide_group(self, args, approve: bool):
+        positional, options = _split(args)
+        if len(positional) != 1:
+            raise ValueError("usage: approve-group|reject-group <group_id> [key=...]")
+        return self.booking_service.approve_group(self.user["user_id"], int(positional[0]), approve=approve,
+                                                  idempotency_key=options.get("key"))
+
+    def approve_group(self, args):
+        return self._decide_group(args, True)
+
+    def reject_group(self, args):
+        return self._decide_group(args, False)
+
+    def mark_paid(self, args):
+        args, options = _split(args)
+        if not args:
+            raise ValueError("usage: mark-paid <booking_id> [method] [provider_txn_id] [key=...]")
+        booking_id, method, txn = int(args[0]), (args[1] if len(args) > 1 else "cash"), \
+            (args[2] if len(args) > 2 else None)
+        return self.payment_service.mark_paid(booking_id, method=method, provider_txn_id=txn,
+                                              idempotency_key=options.get("key"))
+
+    def add_car(self, args):
+        _, options = _split(args)
+        if not options.get("brand") or not options.get("model"):
+            raise ValueError("usage: add-car brand=... model=... daily_rate=... [year= mileage= ...]")
+        return self.car_service.add_car(**_car_fields(options))
+
+    def update_car(self, args):
+        positional, options = _split(args)
+        if len(positional) != 1 or not options:
+            raise ValueError("usage: update-car <car_id> field=value ...")
+        return self.car_service.update_car(int(positional[0]), **_car_fields(options))
+
+    def delete_car(self, args):
+        if len(args) != 1:
+            raise ValueError("usage: delete-car <car_id>")
+        return self.car_service.delete_car(int(args[0]))
+
+    @staticmethod
+    def _fleet(options: dict) -> dict:
+        """brand=/model=/ids= filter plus dry_run= for the bulk car verbs."""
+        ids = options.get("ids")
+        return {"brand": options.get("brand"), "model": options.get("model"),
+                "car_ids": [int(i) for i in ids.split(",") if i] if ids else None,
+                "dry_run": options.get("dry_run", "").lower() in ("1", "y", "yes", "true")}
+
+    def reprice(self, args):
+        _, options = _split(args)
+        percent, amount = options.get("percent"), options.get("amount")
+        return self.car_service.bulk_update_rates(
+            percent=float(percent) if percent else None, amount=float(amount) if amount else None,
+            **self._fleet(options))
+
+    def set_limits(self, args):
+        _, options = _split(args)
+        lo, hi = options.get("min_days"), options.get("max_days")
+        return self.car_service.bulk_set_period_limits(
+            min_days=int(lo) if lo else None, max_days=int(hi) if hi else None, **self._fleet(options))
+
+    def set_availability(self, args):
+        _, options = _split(args)
+        if "available" not in options:
+            raise ValueError("usage: set-availability available=0|1 brand=... model=... ids=...")
+        return self.car_service.bulk_set_availability(
+            options["available"].lower() in ("1", "y", "yes", "true"), **self._fleet(options))
+
+    def scan_pickup(self, args):
+        if len(args) != 1:
+            raise ValueError("usage: scan-pickup <token>")
+        return self.qr_service.scan_pickup(args[0], self.user["user_id"])
+
+    def scan_return(self, args):
+        if len(args) != 1:
+            raise ValueError("usage: scan-return <token>")
+        return self.qr_service.scan_return(args[0], self.user["user_id"])
+
+    def list_bookings(self, args):
+        _, options = _split(args)
+        res = self.booking_service.list_admin_bookings(
+            status=options.get("status"),
+            user_id=int(options["user_id"]) if options.get("user_id") else None,
+            date_from=options.get("date_from"), date_to=options.get("date_to"),
+            limit=int(options.get("limit", 200)), offset=int(options.get("offset", 0)),
+        )
+        if res.get("success"):
+            res["message"] = f"{len(res['bookings'])} bookings"
+        return res
+
+    # ---------------- runner ----------------
+    def execute(self, line_no: int, line: str) -> dict | None:
+        """Run one line; None for blank/comment lines."""
+        try:
+            parts = shlex.split(line, comments=True)
+        except ValueError as e:
+            return {"line": line_no, "cmd": None, "success": False, "message": f"Parse error: {e}", "ms": 0.0}
+        if not parts:
+            return None
+        verb, args = parts[0], parts[1:]
+        started = time.perf_counter()
+        handler = self.verbs.get(verb)
+        try:
+            if handler is None:
+                res = {"success": False, "message": f"Unknown command '{verb}'"}
+            else:
+                with redirect_stdout(sys.stderr), profiler.action(f"batch.{verb}"):
+                    res = handler(args)
+        except Exception as e:
+            res = {"success": False, "message": str(e)}
+        elapsed = (time.perf_counter() - started) * 1000
+        return {"line": line_no, "cmd": verb, "args": args, **res, "ms": round(elapsed, 2)}
+
+    def run(self, lines, out=None, stop_on_error: bool = False) -> dict:
+        out = out or sys.stdout
+        total = failed = 0
+        for line_no, line in enumerate(lines, 1):
+            result = self.execute(line_no, line)
+            if result is None:
+                continue
+            out.write(json.dumps(result, default=_json_default) + "\n")
+            out.flush()
+            total += 1
+            if not result.get("success"):
+                failed += 1
+                if stop_on_error:
+                    break
+        return {"commands": total, "failed": failed}
+
+
+def run_batch(argv: list[str]) -> int:
+    """Entry point for `main.py run FILE|- [--email ...] [--stop-on-error]`."""
+    parser = argparse.ArgumentParser(prog="main.py run", description="Run admin commands from a file or stdin.")
+    parser.add_argument("file", help="command file, or - for stdin")
+    parser.add_argument("--email", default=os.getenv("CAR_RENTAL_EMAIL"))
+    parser.add_argument("--stop-on-error", action="store_true")
+    opts = parser.parse_args(argv)
+    if not opts.email:
+        print("❌ --email or CAR_RENTAL_EMAIL is required", file=sys.stderr)
+        return 2
+
+    db = DatabaseConnection(pool_size=int(os.getenv("DB_POOL_SIZE", 2)))
+    password = os.getenv("CAR_RENTAL_PASSWORD") or getpass("Password: ", stream=sys.stderr)
+    with redirect_stdout(sys.stderr):
+        login = UserService(db).login_user(opts.email, password)
+    if not login.get("success"):
+        print(f"❌ {login.get('message', 'Login failed')}", file=sys.stderr)
+        return 2
+    if login["role"] != "admin":
+        print("❌ Admin only.", file=sys.stderr)
+        return 2
+
+    try:
+        source = sys.stdin if opts.file == "-" else open(opts.file, encoding="utf-8")
+    except OSError as e:
+        print(json.dumps({"line": 0, "cmd": None, "success": False,
+                          "message": f"Cannot read {opts.file}: {e.strerror}", "ms": 0.0}))
+        return 2
+
+    # same background workers as an interactive session, on their own (quiet) connections
+    AuditService.configure(DatabaseConnection(quiet=True))
+    dispatcher = build_dispatcher(DatabaseConnection(quiet=True))
+    controller = BatchController(db, login["user"])
+    # the JSON lines go to the real stdout; anything else printed meanwhile,
+    # from a command or from a background thread between commands, goes to stderr
+    out = sys.stdout
+    with redirect_stdout(sys.stderr):
+        dispatcher.start()
+        REGISTRY.start_exporter()
+        try:
+            with closing(source) if source is not sys.stdin else nullcontext(source) as fh:
+                summary = controller.run(fh, out=out, stop_on_error=opts.stop_on_error)
+        finally:
+            dispatcher.stop()
+            # deliver the events of the last commands (payments, QR) before exiting
+            drained = dispatcher.drain()
+    print(f"{summary['commands']} commands, {summary['failed']} failed; "
+          f"{drained['delivered']} events delivered at exit", file=sys.stderr)
+    return 1 if summary["failed"] else 0
@@ -1,11 +1,17 @@
+from itertools import chain
+
 from config.database import DatabaseConnection
 from utils.pricing import parse_yyyy_mm_dd
 from utils.sessions import SessionManager
+from utils.pager import page
 from services.qrcode_service import QRService
 from utils.qrcode_utils import print_qr_ascii
 from services.car_service import CarService
 from services.booking_service import BookingService
+from services.search_service import SearchService
+from utils.profiling import profiled
 
+@profiled
 class CarController:
 
     def __init__(self, db: DatabaseConnection | None = None):
@@ -13,6 +19,7 @@ class CarController:
         self.car_service = CarService(self.db)
         self.booking_service = BookingService(self.db)
         self.qr_service = QRService(self.db)
+        self.search_service = SearchService(self.db)
     
 
     # ------------- internal helper -------------
@@ -136,9 +143,18 @@ class CarController:
 
     # ---------- CUSTOMER ----------
 
-    def view_available_cars(self):
+    def view_available_cars(self, current_user: dict | None = None):
         print("\n=== Available Cars ===")
-        res = self.car_service.list_available_cars()
+        start_s = input("From date (YYYY-MM-DD) [Enter=any]: ").strip()
+        end_s = input("To date (YYYY-MM-DD) [Enter=any]: ").strip() if start_s else ""
+        start_d = end_d = None
+        if start_s and end_s:
+            try:
+                start_d, end_d = parse_yyyy_mm_dd(start_s), parse_yyyy_mm_dd(end_s)
+            except ValueError:
+                print("❌ Invalid date format. Use YYYY-MM-DD"); return
+        res = self.car_service.list_available_cars(start_d, end_d,
+                                                   user_id=(current_user or {}).get("user_id"))
         if not res.get("success"):
             print("❌", res.get("message"))
             return
@@ -150,6 +166,21 @@ class CarController:
             print(f"- #{c['car_id']}: {c['brand']} {c['model']} | ${c['daily_rate']}/day")
 
 
+    def search_cars(self):
+        term = input("Search cars (brand/model): ").strip()
+        if not term:
+            print("❌ Enter a search term"); return
+        res = self.search_service.search_cars(term, k=20)
+        if not res.get("success"):
+            print("❌", res.get("message")); return
+        cars = res.get("cars", [])
+        if not cars:
+            print("No matching cars."); return
+        for c in cars:
+            avail = "available" if c['available_now'] else "unavailable"
+            print(f"- #{c['car_id']}: {c['brand']} {c['model']} | ${c['daily_rate']}/day | {avail}")
+
+
     def book_car(self, current_user: dict, session_token: str):
         # Require a valid CUSTOMER session
         sess_user = CarController._check_session(session_token, current_user=current_user, required_role="customer")
@@ -173,7 +204,18 @@ class CarController:
             print("❌ Invalid input")
             return
 
-        res = self.booking_service.create_booking(sess_user["user_id"], car_id, start_s, end_s)
+        # Hold the car while the customer looks at the price and confirms
+        held = self.booking_service.place_hold(sess_user["user_id"], car_id, start_s, end_s)
+        if not held.get("success"):
+            print("❌", held.get("message"))
+            return
+        print(f"Car #{car_id} held for {held['expires_in'] // 60} min ({start_s} → {end_s}).")
+        if input("Confirm booking? [y/N]: ").strip().lower() != "y":
+            self.booking_service.release_hold(sess_user["user_id"], held["hold_id"])
+            print("Hold released.")
+            return
+
+        res = self.booking_service.confirm_hold(sess_user["user_id"], held["hold_id"])
         if res.get("success"):
             print(f"✅ {res['message']} | Booking #{res['booking_id']} | Cost: ${res['total_cost']}")
             if "days" in res:
@@ -183,6 +225,32 @@ class CarController:
 
 
 
+    def book_group(self, current_user: dict, session_token: str):
+        # Require a valid CUSTOMER session
+        sess_user = CarController._check_session(session_token, current_user=current_user, required_role="customer")
+        if not sess_user:
+            return
+
+        try:
+            car_ids = [int(x) for x in input("Car IDs to book (comma-separated): ").split(",") if x.strip()]
+            start_s = input("Start date (YYYY-MM-DD): ").strip()
+            end_s   = input("End date (YYYY-MM-DD): ").strip()
+        except ValueError:
+            print("❌ Invalid car id list")
+            return
+        if not car_ids:
+            print("❌ No cars given")
+            return
+
+        res = self.booking_service.create_group_booking(sess_user["user_id"], car_ids, start_s, end_s)
+        if not res.get("success"):
+            print("❌", res.get("message"))
+            return
+        print(f"✅ {res['message']} | Group #{res['group_id']} | Total: ${res['total_cost']}")
+        for b in res["bookings"]:
+            print(f"   Booking #{b['booking_id']} | car #{b['car_id']} | ${b['total_cost']} ({b['days']} days)")
+
+
     def view_my_bookings(self, current_user: dict, session_token: str):
         # Require a valid CUSTOMER session
         sess_user = CarController._check_session(session_token, current_user=current_user, required_role="customer")
@@ -196,26 +264,31 @@ class CarController:
         if flt and status is None:
             print("⚠️ Unknown status filter ignored.")
 
-        res = self.booking_service.list_user_bookings(sess_user["user_id"], status=status)
+        res = self.booking_service.stream_user_bookings(sess_user["user_id"], status=status)
         if not res.get("success"):
             print("❌", res.get("message")); return
 
-        rows = res.get("bookings", [])
-        if not rows:
+        rows = res["bookings"]
+        first = next(rows, None)
+        if first is None:
             print("You have no bookings." if not status else f"No bookings with status '{flt}'.")
             return
 
-        # Pretty print
+        # Pretty print (rows are rendered as they stream in)
         print("\n=== My Bookings ===")
         print(f"{'ID':<5} {'Car':<20} {'Dates':<23} {'Status':<10} {'Total':<10} {'Pay':<8} {'QR?':<4}")
         print("-" * 84)
-        for r in rows:
+
+        def fmt(r):
             car = f"{r['brand']} {r['model']}"
             dates = f"{r['start_date']}→{r['end_date']}"
             total = f"${r['total_cost']}" if r['total_cost'] is not None else "-"
             pay   = r.get('payment_status') or "-"
-            qr    = "Y" if r.get('qr_token') else "N"
-            print(f"{r['booking_id']:<5} {car:<20} {dates:<23} {r['status']:<10} {total:<10} {pay:<8} {qr:<4}")
+            qr    = "Y" if r.get('has_qr') else "N"
+            return f"{r['booking_id']:<5} {car:<20} {dates:<23} {r['status']:<10} {total:<10} {pay:<8} {qr:<4}"
+
+        page(fmt(r) for r in chain([first], rows))
+        rows.close()  # release the cursor if the pager was quit early
 
     # ---------- ADMIN ----------
 
@@ -358,16 +431,80 @@ class CarController:
         if not sess_user:
             return
 
-        res = self.car_service.list_cars()
+        res = self.car_service.stream_cars()
         if not res.get("success"):
             print("❌", res.get("message")); return
-        cars = res.get("cars", [])
-        if not cars:
-            print("No cars found."); return
-        for c in cars:
-            print(f"- #{c['car_id']}: {c['brand']} {c['model']} | rate ${c['daily_rate']} | avail={bool(c['available_now'])}")
+        rows = res["cars"]
+        try:
+            shown = page(
+                f"- #{c['car_id']}: {c['brand']} {c['model']} | rate ${c['daily_rate']} | avail={bool(c['available_now'])}"
+                for c in rows
+            )
+        finally:
+            rows.close()  # release the cursor if the pager was quit early
+        if not shown:
+            print("No cars found.")
+
 
 
+    def bulk_update_cars(self, current_user: dict, session_token: str):
+        # Require a valid ADMIN session
+        sess_user = CarController._check_session(session_token, current_user=current_user, required_role="admin")
+        if not sess_user:
+            return
+
+        print("Select cars (Enter to skip a filter)")
+        brand = input("Brand: ").strip() or None
+        model = input("Model: ").strip() or None
+        ids_raw = input("Car IDs (comma-separated): ").strip()
+        try:
+            car_ids = [int(x) for x in ids_raw.split(",") if x.strip()] or None
+        except ValueError:
+            print("❌ Invalid car id list"); return
+        filters = {"brand": brand, "model": model, "car_ids": car_ids}
+
+        print("1) Change daily rate by %")
+        print("2) Change daily rate by amount")
+        print("3) Set min/max rental days")
+        print("4) Set availability")
+        op = input("Choose: ").strip()
+        try:
+            if op == "1":
+                pct = float(input("Percent (e.g. 10 or -5): ").strip())
+                action = lambda dry: self.car_service.bulk_update_rates(percent=pct, dry_run=dry, **filters)
+            elif op == "2":
+                amt = float(input("Amount (e.g. 5 or -2.50): ").strip())
+                action = lambda dry: self.car_service.bulk_update_rates(amount=amt, dry_run=dry, **filters)
+            elif op == "3":
+                lo = input("Min days (Enter=keep): ").strip()
+                hi = input("Max days (Enter=keep): ").strip()
+                lo, hi = (int(lo) if lo else None), (int(hi) if hi else None)
+                action = lambda dry: self.car_service.bulk_set_period_limits(
+                    min_days=lo, max_days=hi, dry_run=dry, **filters)
+            elif op == "4":
+                avail = input("Available now (y/N): ").strip().lower() == "y"
+                action = lambda dry: self.car_service.bulk_set_availability(avail, dry_run=dry, **filters)
+            else:
+                print("Invalid choice."); return
+        except ValueError:
+            print("❌ Invalid number"); return
+
+        preview = action(True)
+        if not preview.get("success"):
+            print("❌", preview.get("message")); return
+        if not preview["cars"]:
+            print("No cars would change."); return
+        page(
+            "- #{}: {} {} | {}".format(
+                c["car_id"], c["brand"], c["model"],
+                " | ".join(f"{k}={c[k]}" for k in list(c)[3:]))
+            for c in preview["cars"]
+        )
+        if input(f"{preview['message']}. Apply? [y/N]: ").strip().lower() != "y":
+            print("Cancelled."); return
+        res = action(False)
+        print(("✅ " if res.get("success") else "❌ ") + res.get("message"))
+
 
     def customer_view_qr(self, current_user: dict, session_token: str):
         # Require a valid CUSTOMER session
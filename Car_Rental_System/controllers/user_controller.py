@@ -1,12 +1,17 @@
 from getpass import getpass
+from itertools import chain
 
 from config.database import DatabaseConnection
 from services.booking_service import BookingService
 from services.car_service import CarService
 from services.qrcode_service import QRService
 from services.userservice  import UserService
+from services.user_import import UserImportService, write_report
 from utils.sessions import SessionManager
+from utils.pager import page
+from utils.profiling import profiled
 
+@profiled
 class UserController:
 
     def __init__(self, db: DatabaseConnection | None = None):
@@ -67,16 +72,36 @@ class UserController:
     def list_customers(self, current_user: dict, session_token: str):
         if not self._require_admin(current_user, session_token): return
         q = input("Search (name/email, Enter=all): ").strip() or None
-        res = self.userservice.list_customers(search=q)
+        res = self.userservice.stream_customers(search=q)
         if not res.get("success"):
             print("❌", res.get("message")); return
-        rows = res.get("customers", [])
-        if not rows:
+        rows = res["customers"]
+        first = next(rows, None)
+        if first is None:
             print("No customers found."); return
         print("\n=== Customers ===")
         print(f"{'ID':<5} {'Name':<20} {'Email':<28} {'Since':<19}")
         print("-"*76)
-        for r in rows:
-            print(f"{r['user_id']:<5} {r['name']:<20} {r['email']:<28} {str(r['created_at'])[:19]:<19}")
-
+        page(
+            f"{r['user_id']:<5} {r['name']:<20} {r['email']:<28} {str(r['created_at'])[:19]:<19}"
+            for r in chain([first], rows)
+        )
+        rows.close()  # release the cursor if the pager was quit early
 
+    def import_users(self, current_user: dict, session_token: str):
+        if not self._require_admin(current_user, session_token): return
+        path = input("CSV file (name,email,password[,role]): ").strip()
+        if not path:
+            print("❌ No file given."); return
+        print("⏳ Importing (passwords are hashed on all cores)...")
+        res = UserImportService(self.db).import_csv(path)
+        if not res.get("success"):
+            print("❌", res.get("message")); return
+        print("✅", res["message"])
+        errors = [e for e in res["report"] if e["status"] == "error"]
+        if errors:
+            page(f"   line {e['line']}: {e['email'] or '-'}: {e['message']}" for e in errors)
+            out = input("Save full report to (Enter=skip): ").strip()
+            if out:
+                write_report(res["report"], out)
+                print(f"✅ Report written to {out}")
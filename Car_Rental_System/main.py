@@ -8,11 +8,16 @@ if base_dir not in sys.path:
 
 from controllers.car_controller import CarController
 from controllers.user_controller import UserController
-from services.userservice import UserService
 from services.booking_service import BookingService
 from services.payment_service import PaymentService
 from services.qrcode_service import QRService
+from services.offline_gate import OfflineGate
+from services.housekeeping_service import HousekeepingService, format_result
+from services.event_handlers import build_dispatcher
+from services.audit_service import AuditService
+from utils.metrics import REGISTRY
 from utils.sessions import SessionManager
+from utils.pager import page
 from config.database import DatabaseConnection
 
 
@@ -22,6 +27,7 @@ def main():
     print("=== 🚗 Car Rental System ===")
 
     # Create shared DB adapter and controller instances ONCE
+    # (construction is cheap: the first connection opens on the first query)
     db = DatabaseConnection()
     car_controller = CarController(db)
     user_controller = UserController(db)
@@ -30,9 +36,17 @@ def main():
     booking_service = BookingService(db)
     payment_service = PaymentService(db)
     qr_service = QRService(db)
+    gate = OfflineGate(qr_service)   # fallback when the DB is unreachable during a scan
+    # background writers get their own DatabaseConnection so their primary
+    # checkouts do not pin this session's reads to the primary, and a quiet one
+    # so their polling does not print connect banners over the menus
+    AuditService.configure(DatabaseConnection(quiet=True))   # status history is written behind, in batches
+    audit_service = AuditService(db)
+    dispatcher = build_dispatcher(DatabaseConnection(quiet=True))   # delivers booking events (payment prep, QR) in the background
 
     current_user = None
     session_token = None
+    gate_refresher = None
 
     while True:
         # -------------------- MAIN MENU (not logged in) --------------------
@@ -52,11 +66,19 @@ def main():
                     current_user  = result["user"]
                     session_token = result.get("session_token")
                     print(f"✅ Logged in as {current_user['name']} ({current_user['role']})")
+                    dispatcher.start()   # started after login so startup stays DB-free
+                    REGISTRY.start_exporter()   # METRICS_PORT / METRICS_FILE, if set
+                    if current_user["role"] == "admin" and gate_refresher is None:
+                        # keep the offline gate's snapshot fresh while the DB is up
+                        gate_refresher = gate.start_refresher(QRService(DatabaseConnection(quiet=True)))
                 else:
                     print("❌ Login failed:", (result or {}).get("message", "Unknown error"))
 
             elif choice == "3":
                 print("Goodbye!")
+                dispatcher.stop()
+                if gate_refresher is not None:
+                    gate_refresher.stop()
                 break
             else:
                 print("Invalid option.")
@@ -79,6 +101,14 @@ def main():
             print("12) Scan QR for PICKUP")
             print("13) Scan QR for RETURN")
             print("14) Record Payment (mark PAID)")
+            print("15) Search Cars")
+            print("16) Gate Sync (replay offline scans, refresh snapshot)")
+            print("17) Run Housekeeping Now")
+            print("18) Booking Timeline (status history)")
+            print("19) My Recent Activity")
+            print("20) Import Customers from CSV")
+            print("21) Bulk Update Cars (rates / limits / availability)")
+            print("22) Approve/Reject Group Booking")
             print("0) Logout")
             ch = input("Choose: ").strip()
 
@@ -92,13 +122,16 @@ def main():
                 car_controller.delete_car(current_user, session_token)
 
             elif ch == "5":
-                res = booking_service.list_admin_bookings()
+                res = booking_service.stream_admin_bookings()
                 if not res.get("success"):
                     print("❌", res.get("message")); continue
-                for r in res["bookings"]:
-                    print(f"#{r['booking_id']} | {r['user_name']} | {r['brand']} {r['model']} | "
-                          f"{r['start_date']}→{r['end_date']} | {r['status']} | "
-                          f"${r['total_cost']} | pay={r.get('payment_status') or '-'}")
+                page(
+                    f"#{r['booking_id']} | {r['user_name']} | {r['brand']} {r['model']} | "
+                    f"{r['start_date']}→{r['end_date']} | {r['status']} | "
+                    f"${r['total_cost']} | pay={r.get('payment_status') or '-'}"
+                    for r in res["bookings"]
+                )
+                res["bookings"].close()  # release the cursor if the pager was quit early
                 print("Counts:", res.get("counts", {}))
 
             elif ch == "6":
@@ -134,8 +167,7 @@ def main():
             elif ch == "11":
                 try:
                     uid = int(input("Customer user_id to delete: ").strip())
-                    # If your UserService.delete_user is instance-based, call via service instance:
-                    res = UserService(db).delete_user(current_user["role"], uid)
+                    res = user_controller.userservice.delete_user(current_user["role"], uid)
                     print(("✅ " if res.get("success") else "❌ ") + res.get("message", ""))
                 except ValueError:
                     print("❌ Invalid user id")
@@ -143,11 +175,15 @@ def main():
             elif ch == "12":
                 token = input("Scan/Enter QR token for PICKUP: ").strip()
                 res = qr_service.scan_pickup(token, current_user["user_id"])
+                if res.get("message") == "DB connection failed":
+                    res = gate.scan("pickup", token, current_user["user_id"])
                 print(("✅ " if res.get("success") else "❌ ") + res.get("message", ""))
 
             elif ch == "13":
                 token = input("Scan/Enter QR token for RETURN: ").strip()
                 res = qr_service.scan_return(token, current_user["user_id"])
+                if res.get("message") == "DB connection failed":
+                    res = gate.scan("return", token, current_user["user_id"])
                 print(("✅ " if res.get("success") else "❌ ") + res.get("message", ""))
 
             elif ch == "14":
@@ -160,6 +196,60 @@ def main():
                 except ValueError:
                     print("❌ Invalid booking id")
 
+            elif ch == "15":
+                car_controller.search_cars()
+
+            elif ch == "16":
+                res = gate.sync()
+                print(("✅ " if res.get("success") else "❌ ") + res.get("message", ""))
+                for c in res.get("conflicts", []):
+                    print(f"   ⚠ {c['kind']} #{c['booking_id']} at {c['scanned_at']}: {c['reason']}")
+                for err in res.get("errors", []):
+                    print(f"   ❌ {err}")
+
+            elif ch == "17":
+                for r in HousekeepingService(db).run_once()["results"]:
+                    print(format_result(r))
+
+            elif ch == "18":
+                try:
+                    bid = int(input("Booking ID: ").strip())
+                except ValueError:
+                    print("❌ Invalid booking id"); continue
+                res = audit_service.timeline(bid)
+                if not res.get("success"):
+                    print("❌", res.get("message")); continue
+                for h in res["timeline"]:
+                    print(f"{h['created_at']} | {h['action']:<8} | {h['from_status'] or '-'} → {h['to_status']}"
+                          f" | by {h['actor_name'] or 'system'}")
+                if not res["timeline"]:
+                    print("No history for this booking.")
+
+            elif ch == "19":
+                res = audit_service.admin_activity(current_user["user_id"], limit=50)
+                if not res.get("success"):
+                    print("❌", res.get("message")); continue
+                for a in res["activity"]:
+                    print(f"{a['created_at']} | #{a['booking_id']} | {a['action']:<8} | "
+                          f"{a['from_status'] or '-'} → {a['to_status']}")
+                if not res["activity"]:
+                    print("No recorded activity.")
+
+            elif ch == "20":
+                user_controller.import_users(current_user, session_token)
+
+            elif ch == "21":
+                car_controller.bulk_update_cars(current_user, session_token)
+
+            elif ch == "22":
+                try:
+                    gid = int(input("Group ID: ").strip())
+                except ValueError:
+                    print("❌ Invalid group id"); continue
+                approve = input("Approve or reject? [a/r]: ").strip().lower() == "a"
+                res = booking_service.approve_group(current_user["user_id"], gid, approve=approve)
+                print(("✅ " if res.get("success") else "❌ ") + res.get("message", ""))
+
             elif ch == "0":
                 SessionManager.invalidate(session_token)
                 current_user = None
@@ -175,17 +265,23 @@ def main():
             print("2) Book a Car")
             print("3) View My Bookings")
             print("4) Show QR for Approved Booking")
+            print("5) Search Cars")
+            print("6) Group Booking (several cars)")
             print("0) Logout")
             ch = input("Choose: ").strip()
 
             if ch == "1":
-                car_controller.view_available_cars()
+                car_controller.view_available_cars(current_user)
             elif ch == "2":
                 car_controller.book_car(current_user, session_token)
             elif ch == "3":
                 car_controller.view_my_bookings(current_user, session_token)
             elif ch == "4":
                 car_controller.customer_view_qr(current_user, session_token)
+            elif ch == "5":
+                car_controller.search_cars()
+            elif ch == "6":
+                car_controller.book_group(current_user, session_token)
             elif ch == "0":
                 SessionManager.invalidate(session_token)
                 current_user = None
@@ -197,4 +293,12 @@ def main():
 
 
 if __name__ == "__main__":
+    # --profile / --profile=full|sample overrides CAR_RENTAL_PROFILE (see utils/profiling.py)
+    for arg in [a for a in sys.argv[1:] if a == "--profile" or a.startswith("--profile=")]:
+        sys.argv.remove(arg)
+        from utils.profiling import profiler
+        profiler.configure(arg.partition("=")[2] or "full")
+    if sys.argv[1:2] == ["run"]:
+        from controllers.batch_controller import run_batch
+        sys.exit(run_batch(sys.argv[2:]))
     main()
@@ -1,32 +1,125 @@
-class Car:
-    def __init__(self, car_id, brand, model, available=True):
-        self.car_id = car_id
-        self.brand = brand
-        self.model = model
-        self.available = available
-
-class Booking:
-    def __init__(self, booking_id, user_id, car: Car, start_date, end_date, status='pending'):
-        self.booking_id = booking_id
-        self.user_id = user_id
-        self.car = car
-        self.start_date = start_date
-        self.end_date = end_date
-        self.status = status
-
-class User:
-    def __init__(self, user_id, name, email, password, role="customer"):
-        self.user_id = user_id
-        self.name = name
-        self.email = email
-        self.password = password
-        self.role = role
-
-
-class Rental:
-    def __init__(self, rental_id, car_id, customer_id, rental_date, return_date=None):
-        self.rental_id = rental_id
-        self.car_id = car_id
-        self.customer_id = customer_id
-        self.rental_date = rental_date
-        self.return_date = return_date
\ No newline at end of file
+# models/models.py
+from collections.abc import Mapping
+
+
+class Record(Mapping):
+    """
+    Read-only DB row: the driver's tuple plus a column -> position map that is
+    shared by every row of the same result set (built once from cursor.description).
+
+    Works like the dicts the services used to return (r["brand"], r.get("qr_token"),
+    dict(r), ==), and also as r.brand. Per row it costs one small slotted object on
+    top of the tuple the driver already allocated, instead of a full dict.
+    """
+    __slots__ = ("_values", "_index")
+
+    # Default projection for this table (no timestamps nobody reads)
+    COLUMNS: tuple[str, ...] = ()
+    COLUMN_INDEX: dict[str, int] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COLUMN_INDEX = {c: i for i, c in enumerate(cls.COLUMNS)}
+
+    def __init__(self, values, index: dict[str, int]):
+        self._values = values
+        self._index = index
+
+    # ---------- construction ----------
+    @classmethod
+    def select_list(cls, alias: str | None = None) -> str:
+        """'col1, col2, ...' for COLUMNS, optionally prefixed with a table alias."""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + c for c in cls.COLUMNS)
+
+    @classmethod
+    def from_values(cls, values):
+        """Wrap a tuple laid out as COLUMNS."""
+        return cls(tuple(values), cls.COLUMN_INDEX)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        keys = tuple(data)
+        return cls(tuple(data[k] for k in keys), {k: i for i, k in enumerate(keys)})
+
+    @staticmethod
+    def index_for(cursor) -> dict[str, int]:
+        return {d[0]: i for i, d in enumerate(cursor.description)}
+
+    @classmethod
+    def fetchone(cls, cursor):
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return cls(row, cls.index_for(cursor))
+
+    @classmethod
+    def fetchall(cls, cursor) -> list:
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+        index = cls.index_for(cursor)
+        return [cls(r, index) for r in rows]
+
+    # ---------- Mapping protocol ----------
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    # faster than the Mapping mixins, which go through __getitem__ + KeyError
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __getattr__(self, name):
+        # only reached for names that are not slots/methods
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__} has no column '{name}'") from None
+
+    def to_dict(self) -> dict:
+        return dict(zip(self._index, self._values))
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in zip(self._index, self._values))
+        return f"{type(self).__name__}({fields})"
+
+
+class Car(Record):
+    __slots__ = ()
+    COLUMNS = ("car_id", "brand", "model", "year", "mileage", "daily_rate",
+               "min_period_days", "max_period_days", "available_now")
+
+
+class Booking(Record):
+    __slots__ = ()
+    COLUMNS = ("booking_id", "user_id", "car_id", "start_date", "end_date",
+               "status", "total_cost", "approved_by")
+
+
+class User(Record):
+    __slots__ = ()
+    # never includes the password hash
+    COLUMNS = ("user_id", "name", "email", "role")
+
+
+class Payment(Record):
+    __slots__ = ()
+    COLUMNS = ("payment_id", "booking_id", "amount", "payment_method",
+               "payment_status", "provider_txn_id", "payment_date")
+
+
+class QRCode(Record):
+    __slots__ = ()
+    COLUMNS = ("qr_id", "booking_id", "qr_token", "expires_at")
@@ -0,0 +1,132 @@
+# services/archive_service.py
+"""
+Moves finished bookings from the hot tables to the archive tables (migration 0012).
+
+    python -m services.archive_service [--days N] [--chunk N]
+
+A booking is archived once it is completed, rejected or cancelled and ended
+more than ARCHIVE_AFTER_DAYS days ago. Its payment, QR token and
+booking_summaries row move with it, in chunks of chunk_size bookings. Each
+chunk is one short transaction that copies the rows to the archive tables and
+deletes them from the hot ones, so a booking is always in exactly one place.
+Candidates are locked with SKIP LOCKED, so the archiver never waits on a
+booking someone is working on. The housekeeping job archive_bookings runs this
+daily.
+
+Reads stay the same for callers. BookingService.list_user_bookings and
+stream_user_bookings add booking_summaries_archive to the hot summaries
+whenever the requested status can be archived. The admin lists stay on the hot
+tables, which hold every booking that can still change.
+"""
+import argparse
+import sys
+import time
+from contextlib import closing
+
+from config.database import DatabaseConnection
+from services.reservations import release_days
+
+ARCHIVE_AFTER_DAYS = 180
+CHUNK_SIZE = 500
+ARCHIVABLE_STATUSES = ("completed", "rejected", "cancelled")
+
+# hot table -> archive table; a booking's rows move together
+ARCHIVE_TABLES = (
+    ("bookings", "bookings_archive"),
+    ("payments", "payments_archive"),
+    ("booking_qr_codes", "booking_qr_codes_archive"),
+    ("booking_summaries", "booking_summaries_archive"),
+)
+
+
+class ArchiveService:
+    def __init__(self, db: DatabaseConnection | None = None, chunk_size: int = CHUNK_SIZE,
+                 pause_s: float = 0.0):
+        self.db = db or DatabaseConnection()
+        self.chunk_size = chunk_size
+        self.pause_s = pause_s   # optional breather between chunks
+
+    def archive_bookings(self, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """Move finished bookings that ended more than older_than_days ago; returns bookings moved."""
+        total = 0
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                raise ConnectionError("DB connection failed")
+            with closing(conn.cursor()) as cur:
+                columns = {hot: self._columns(cur, hot) for hot, _ in ARCHIVE_TABLES}
+                while True:
+                    conn.start_transaction()
+                    try:
+                        # start_date < cutoff is implied by end_date, but lets (status, start_date) bound the scan
+                        cur.execute(
+                            f"""
+                            SELECT booking_id FROM bookings
+                            WHERE status IN ({', '.join(['%s'] * len(ARCHIVABLE_STATUSES))})
+                              AND start_date < CURDATE() - INTERVAL %s DAY
+                              AND end_date < CURDATE() - INTERVAL %s DAY
+                            ORDER BY booking_id
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                            """,
+                            (*ARCHIVABLE_STATUSES, older_than_days, older_than_days, self.chunk_size),
+                        )
+                        ids = [row[0] for row in cur.fetchall()]
+                        if ids:
+                            self._move(cur, ids, columns)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    total += len(ids)
+                    if len(ids) < self.chunk_size:
+                        break
+                    if self.pause_s:
+                        time.sleep(self.pause_s)
+        return total
+
+    @staticmethod
+    def _columns(cur, table: str) -> str:
+        """The hot table's column list (its archive twin has the same, plus archived_at)."""
+        cur.execute(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s
+            ORDER BY ordinal_position
+            """,
+            (table,),
+        )
+        return ", ".join(f"`{row[0]}`" for row in cur.fetchall())
+
+    @staticmethod
+    def _move(cur, ids: list[int], columns: dict[str, str]):
+        in_ids = ", ".join(["%s"] * len(ids))
+        for hot, cold in ARCHIVE_TABLES:
+            cur.execute(
+                f"INSERT INTO {cold} ({columns[hot]}) SELECT {columns[hot]} FROM {hot} WHERE booking_id IN ({in_ids})",
+                ids,
+            )
+        # children first; deleting the booking also drops its summary (FK cascade)
+        for hot in ("booking_qr_codes", "payments"):
+            cur.execute(f"DELETE FROM {hot} WHERE booking_id IN ({in_ids})", ids)
+        release_days(cur, *ids)       # finished bookings hold none; keeps the move total
+        cur.execute(f"DELETE FROM bookings WHERE booking_id IN ({in_ids})", ids)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m services.archive_service",
+                                     description="Move finished bookings to the archive tables.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"archive bookings that ended more than N days ago (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    opts = parser.parse_args(argv)
+    try:
+        moved = ArchiveService(chunk_size=opts.chunk).archive_bookings(opts.days)
+    except ConnectionError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Archived {moved} booking(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# services/audit_service.py
+import atexit
+import threading
+from contextlib import closing
+from datetime import datetime
+
+from config.database import DatabaseConnection
+from utils.metrics import REGISTRY
+
+BOOKING_TRANSITIONS = REGISTRY.counter(
+    "booking_transitions_total", "Booking state transitions (create, approve, pickup, ...)",
+    ("action", "to_status"))
+AUDIT_BUFFERED = REGISTRY.gauge("audit_buffered_rows", "History rows waiting to be flushed")
+
+INSERT_HISTORY_SQL = """
+    INSERT INTO booking_status_history
+        (booking_id, from_status, to_status, action, actor_id, note, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+class AuditService:
+    """
+    Booking state-transition history (migration 0006).
+
+    Writes are write-behind: record() only appends to a process-wide buffer
+    (no DB round-trip on the request path). A background flusher inserts the
+    buffer with one executemany every FLUSH_INTERVAL_MS, or as soon as
+    FLUSH_ROWS rows are waiting, and once more at interpreter exit. Rows keep
+    the time they were recorded, not the time they were flushed. If a flush
+    fails the rows go back to the buffer (bounded by MAX_BUFFER, oldest dropped).
+    """
+    FLUSH_ROWS = 200
+    FLUSH_INTERVAL_MS = 500
+    MAX_BUFFER = 50_000
+
+    _buffer: list[tuple] = []
+    _lock = threading.Lock()
+    _wake = threading.Event()
+    _stop = threading.Event()
+    _thread: threading.Thread | None = None
+    _db: DatabaseConnection | None = None
+    dropped = 0
+
+    def __init__(self, db: DatabaseConnection | None = None):
+        self.db = db or DatabaseConnection()
+
+    # ---------------- write side ----------------
+    @classmethod
+    def configure(cls, db: DatabaseConnection | None = None, flush_rows: int | None = None,
+                  flush_interval_ms: int | None = None):
+        cls._db = db
+        if flush_rows is not None:
+            cls.FLUSH_ROWS = flush_rows
+        if flush_interval_ms is not None:
+            cls.FLUSH_INTERVAL_MS = flush_interval_ms
+
+    @classmethod
+    def record(cls, booking_id: int, from_status: str | None, to_status: str, action: str,
+               actor_id: int | None = None, note: str | None = None, at: datetime | None = None):
+        row = (booking_id, from_status, to_status, action, actor_id, note, at or datetime.now())
+        with cls._lock:
+            cls._buffer.append(row)
+            size = len(cls._buffer)
+            AUDIT_BUFFERED.set(size)
+        BOOKING_TRANSITIONS.inc(action=action, to_status=to_status)
+        cls._ensure_flusher()
+        if size >= cls.FLUSH_ROWS:
+            cls._wake.set()
+
+    @classmethod
+    def pending(cls) -> int:
+        return len(cls._buffer)
+
+    @classmethod
+    def flush(cls) -> int:
+        """Insert everything buffered so far; returns rows written."""
+        with cls._lock:
+            rows, cls._buffer = cls._buffer, []
+            AUDIT_BUFFERED.set(0)
+        if not rows:
+            return 0
+        db = cls._db or DatabaseConnection(quiet=True)
+        try:
+            with closing(db.get_connection()) as conn:
+                if not conn or not conn.is_connected():
+                    raise ConnectionError("DB connection failed")
+                with closing(conn.cursor()) as cur:
+                    cur.executemany(INSERT_HISTORY_SQL, rows)
+                    conn.commit()
+        except Exception:
+            with cls._lock:
+                cls._buffer[:0] = rows
+                overflow = len(cls._buffer) - cls.MAX_BUFFER
+                if overflow > 0:
+                    del cls._buffer[:overflow]
+                    cls.dropped += overflow
+                AUDIT_BUFFERED.set(len(cls._buffer))
+            return 0
+        return len(rows)
+
+    @classmethod
+    def _ensure_flusher(cls):
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._stop.clear()
+            cls._wake.clear()
+            cls._thread = threading.Thread(target=cls._run, name="audit-flusher", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _run(cls):
+        while not cls._stop.is_set():
+            cls._wake.wait(cls.FLUSH_INTERVAL_MS / 1000)
+            cls._wake.clear()
+            cls.flush()
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the flusher and write what is left (registered with atexit)."""
+        cls._stop.set()
+        cls._wake.set()
+        if cls._thread is not None:
+            cls._thread.join(timeout=5)
+            cls._thread = None
+        cls.flush()
+
+    # ---------------- read side ----------------
+    def timeline(self, booking_id: int):
+        """All transitions of one booking, oldest first (idx_history_booking)."""
+        self.flush()
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute(
+                    """
+                    SELECT h.created_at, h.from_status, h.to_status, h.action, h.actor_id, u.name, h.note
+                    FROM booking_status_history h
+                    LEFT JOIN users u ON u.user_id = h.actor_id
+                    WHERE h.booking_id = %s
+                    ORDER BY h.created_at, h.history_id
+                    """,
+                    (booking_id,),
+                )
+                keys = ("created_at", "from_status", "to_status", "action", "actor_id", "actor_name", "note")
+                return {"success": True, "timeline": [dict(zip(keys, r)) for r in cur.fetchall()]}
+
+    def admin_activity(self, admin_id: int, since: datetime | None = None, limit: int = 100):
+        """One admin's most recent actions (idx_history_actor)."""
+        self.flush()
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute(
+                    """
+                    SELECT created_at, booking_id, action, from_status, to_status, note
+                    FROM booking_status_history
+                    WHERE actor_id = %s AND created_at >= %s
+                    ORDER BY created_at DESC
+                    LIMIT %s
+                    """,
+                    (admin_id, since or datetime(1970, 1, 1), int(limit)),
+                )
+                keys = ("created_at", "booking_id", "action", "from_status", "to_status", "note")
+                return {"success": True, "activity": [dict(zip(keys, r)) for r in cur.fetchall()]}
+
+
+atexit.register(AuditService.shutdown)
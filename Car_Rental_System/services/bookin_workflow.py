@@ -2,106 +2,214 @@
 from contextlib import closing
 from decimal import Decimal
 from config.database import DatabaseConnection
-from services.payment_service import PaymentService
-from services.qrcode_service import QRService
+from models.models import Booking, Car
+from services.audit_service import AuditService
+from services.booking_summaries import refresh_summaries
+from services.events import BOOKING_APPROVED, record_event
+from services.idempotency import IdempotencyKeys, KeyReplayed, fingerprint
+from services.reservations import SlotConflict, reserve_days
 from utils.pricing import compute_total
+from utils.metrics import instrumented
+from utils.profiling import profiled
 
+# approval no longer returns or shows the QR: it is issued in the background
+QR_READY_HINT = "The QR appears in the customer's 'Show QR' menu once it is ready."
+
+@instrumented
+@profiled
 class BookingWorkflow:
     def __init__(self, db: DatabaseConnection|None = None):
         self.db = db or DatabaseConnection()
-        self.payment_service = PaymentService(self.db)
-        self.qr_service = QRService(self.db)
+        self.idempotency = IdempotencyKeys(self.db)
 
     """
-    Encapsulates side-effects for booking approval:
-    - set approved status/approved_by (tx)
+    Booking approval, as one transaction:
+    - lock the booking, set approved status/approved_by
+    - re-reserve the day slots of a previously rejected booking (refused if taken since)
     - ensure total_cost (compute if missing)
-    - ensure pending payment (tx)
-    - generate/refresh QR token (outside tx to keep flow resilient)
+    - write a BookingApproved outbox event
+    - with an idempotency_key, store the result so a retried approve replays it
+    approve_group does the same for every booking of a group booking, all in one transaction.
+    Payment prep and QR generation are BookingApproved handlers
+    (services/event_handlers.py), run by the outbox dispatcher after commit,
+    so the result carries no QR; the customer sees it under "Show QR".
     """
 
-    def approve(self,booking_id: int, admin_user_id: int, days_valid: int = 7):
-        # 1) In-transaction work: approve + payment
+    def approve(self,booking_id: int, admin_user_id: int, days_valid: int = 7,
+                idempotency_key: str | None = None):
+        request = fingerprint(booking_id, admin_user_id, days_valid)
+        if idempotency_key:
+            replay = self.idempotency.replay("approve", idempotency_key, request)
+            if replay:
+                return replay
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
 
-            with closing(conn.cursor(dictionary=True)) as cur:
-                # Lock the booking row to avoid race conditions
-                cur.execute(
-                    """
-                    SELECT booking_id, status, total_cost, user_id, car_id, start_date, end_date
-                    FROM bookings
-                    WHERE booking_id=%s
-                    FOR UPDATE
-                    """,
-                    (booking_id,),
-                )
-                b = cur.fetchone()
-                if not b:
-                    return {"success": False, "message": "Booking not found"}
-
-                if b["status"] not in ("pending", "approved", "rejected"):
-                    return {"success": False, "message": f"Cannot change booking in status: {b['status']}"}
-
-                # Set approved status + who approved
-                cur.execute(
-                    "UPDATE bookings SET status='approved', approved_by=%s WHERE booking_id=%s",
-                    (admin_user_id, booking_id),
-                )
-
-                # Ensure total_cost exists; recompute if missing (defensive)
-                total_cost = b["total_cost"]
-                if total_cost is None:
-                    # Fetch car constraints to compute price
+            with closing(conn.cursor()) as cur:
+                conn.start_transaction()
+                try:
+                    if idempotency_key:
+                        self.idempotency.claim(cur, "approve", idempotency_key, request)
+                    # Lock the booking row to avoid race conditions
                     cur.execute(
-                        "SELECT daily_rate, min_period_days, max_period_days FROM cars WHERE car_id=%s",
-                        (b["car_id"],),
-                    )
-                    car = cur.fetchone()
-                    if not car:
-                        return {"success": False, "message": "Related car not found"}
-
-                    pricing = compute_total(
-                        daily_rate=car["daily_rate"],
-                        start=b["start_date"],  # DATE
-                        end=b["end_date"],      # DATE
-                        min_days=car["min_period_days"],
-                        max_days=car["max_period_days"],
-                        fees=[],
-                        tax_rate=None,
+                        """
+                        SELECT booking_id, status, total_cost, user_id, car_id, start_date, end_date
+                        FROM bookings
+                        WHERE booking_id=%s
+                        FOR UPDATE
+                        """,
+                        (booking_id,),
                     )
-                    total_cost = pricing["total"]
+                    b = Booking.fetchone(cur)
+                    if not b:
+                        conn.rollback()
+                        return {"success": False, "message": "Booking not found"}
+
+                    error, total_cost = self._approve_locked(cur, b, admin_user_id, days_valid)
+                    if error:
+                        conn.rollback()
+                        return {"success": False, "message": error}
+
+                    result = {
+                        "success": True,
+                        "message": f"Booking approved; payment and QR are being prepared. {QR_READY_HINT}",
+                        "total_cost": str(total_cost),
+                    }
+                    if idempotency_key:
+                        self.idempotency.complete(cur, "approve", idempotency_key, result)
+                    conn.commit()
+                except KeyReplayed:
+                    conn.rollback()
+                    return self.idempotency.replayed("approve", idempotency_key, request)
+                except Exception:
+                    conn.rollback()
+                    raise
+        if idempotency_key:
+            self.idempotency.remember("approve", idempotency_key, request, result)
+        AuditService.record(booking_id, b["status"], "approved", "approve", admin_user_id)
+
+        return result
+
+    def approve_group(self, group_id: int, admin_user_id: int, days_valid: int = 7,
+                      idempotency_key: str | None = None):
+        """Approve every booking of a group booking in one transaction: all of them or none."""
+        request = fingerprint(group_id, admin_user_id, days_valid)
+        if idempotency_key:
+            replay = self.idempotency.replay("approve_group", idempotency_key, request)
+            if replay:
+                return replay
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+
+            with closing(conn.cursor()) as cur:
+                conn.start_transaction()
+                try:
+                    if idempotency_key:
+                        self.idempotency.claim(cur, "approve_group", idempotency_key, request)
                     cur.execute(
-                        "UPDATE bookings SET total_cost=%s WHERE booking_id=%s",
-                        (str(total_cost), booking_id),
+                        """
+                        SELECT booking_id, status, total_cost, user_id, car_id, start_date, end_date
+                        FROM bookings
+                        WHERE group_id=%s
+                        ORDER BY booking_id
+                        FOR UPDATE
+                        """,
+                        (group_id,),
                     )
+                    bookings = Booking.fetchall(cur)
+                    if not bookings:
+                        conn.rollback()
+                        return {"success": False, "message": "Group not found"}
+                    total = Decimal("0")
+                    for b in bookings:
+                        error, total_cost = self._approve_locked(cur, b, admin_user_id, days_valid)
+                        if error:
+                            conn.rollback()
+                            return {"success": False, "message": f"Booking #{b['booking_id']}: {error}"}
+                        total += Decimal(str(total_cost))
 
-                # Ensure there is a pending payment (idempotent create/update)
-                pay_res = self.payment_service.create_or_update_pending(
-                    booking_id, Decimal(str(total_cost))
-                )
-                if not pay_res.get("success"):
-                    # Rollback on payment prepare failure
+                    result = {
+                        "success": True,
+                        "message": f"Group approved ({len(bookings)} bookings); payments and QR are being prepared. "
+                                   f"{QR_READY_HINT}",
+                        "group_id": group_id,
+                        "booking_ids": [b["booking_id"] for b in bookings],
+                        "total_cost": str(total),
+                    }
+                    if idempotency_key:
+                        self.idempotency.complete(cur, "approve_group", idempotency_key, result)
+                    conn.commit()
+                except KeyReplayed:
+                    conn.rollback()
+                    return self.idempotency.replayed("approve_group", idempotency_key, request)
+                except Exception:
                     conn.rollback()
-                    return {"success": False, "message": f"Payment prepare failed: {pay_res.get('message')}"}
-
-                # Commit DB changes before QR generation
-                conn.commit()
-
-        # 2) Out-of-transaction work: generate/refresh QR (writes in its own call)
-        qr = self.qr_service.generate_for_booking(booking_id, days_valid=days_valid)
-        # Even if QR fails, approval+payment are already consistent
-        if qr.get("success"):
-            return {
-                "success": True,
-                "message": "Booking approved; payment pending; QR generated",
-                "qr_token": qr["token"],
-                "qr_png": qr["png_path"],
-                "expires_at": qr.get("expires_at"),
-            }
-        else:
-            return {
-                "success": True,
-                "message": "Booking approved; payment pending; QR generation failed",
-            }
+                    raise
+        if idempotency_key:
+            self.idempotency.remember("approve_group", idempotency_key, request, result)
+        for b in bookings:
+            AuditService.record(b["booking_id"], b["status"], "approved", "approve", admin_user_id,
+                                note=f"group {group_id}")
+
+        return result
+
+    def _approve_locked(self, cur, b, admin_user_id: int, days_valid: int):
+        """
+        Approve one booking whose row the caller has locked, on the caller's
+        transaction. Returns (error message or None, total_cost).
+        """
+        booking_id = b["booking_id"]
+        if b["status"] not in ("pending", "approved", "rejected"):
+            return f"Cannot change booking in status: {b['status']}", None
+
+        # Rejection released the slots; take them back or refuse
+        if b["status"] == "rejected":
+            try:
+                reserve_days(cur, booking_id, b["car_id"], b["start_date"], b["end_date"])
+            except SlotConflict:
+                return "Cannot approve: the car has been booked for these dates since", None
+
+        # Set approved status + who approved
+        cur.execute(
+            "UPDATE bookings SET status='approved', approved_by=%s WHERE booking_id=%s",
+            (admin_user_id, booking_id),
+        )
+
+        # Ensure total_cost exists; recompute if missing (defensive)
+        total_cost = b["total_cost"]
+        if total_cost is None:
+            # Fetch car constraints to compute price
+            cur.execute(
+                "SELECT daily_rate, min_period_days, max_period_days FROM cars WHERE car_id=%s",
+                (b["car_id"],),
+            )
+            car = Car.fetchone(cur)
+            if not car:
+                return "Related car not found", None
+
+            pricing = compute_total(
+                daily_rate=car["daily_rate"],
+                start=b["start_date"],  # DATE
+                end=b["end_date"],      # DATE
+                min_days=car["min_period_days"],
+                max_days=car["max_period_days"],
+                fees=[],
+                tax_rate=None,
+            )
+            total_cost = pricing["total"]
+            cur.execute(
+                "UPDATE bookings SET total_cost=%s WHERE booking_id=%s",
+                (str(total_cost), booking_id),
+            )
+
+        refresh_summaries(cur, booking_id)
+
+        # Side effects (pending payment, QR) are delivered from the outbox
+        record_event(cur, BOOKING_APPROVED, booking_id, {
+            "admin_user_id": admin_user_id,
+            "total_cost": str(Decimal(str(total_cost))),
+            "days_valid": days_valid,
+        })
+        return None, total_cost
@@ -4,36 +4,134 @@ from decimal import Decimal
 from typing import Optional
 
 from services.bookin_workflow import BookingWorkflow
+from services.archive_service import ARCHIVABLE_STATUSES
+from services.audit_service import AuditService
+from services.booking_summaries import refresh_summaries
+from services.events import BOOKING_CREATED, BOOKING_REJECTED, record_event
+from services.idempotency import IdempotencyKeys, KeyReplayed, fingerprint
+from services.reservations import SlotConflict, release_days, reserve_bookings, reserve_days
+from utils.holds import HoldStore
 from utils.pricing import compute_total, parse_yyyy_mm_dd
 from config.database import DatabaseConnection
+from models.models import Booking, Car
+from utils.streaming import DEFAULT_BATCH_SIZE, open_stream
+from utils.metrics import instrumented
+from utils.profiling import profiled
 
+BOOKING_STATUSES = {"pending", "approved", "rejected", "active", "completed", "cancelled"}
+HOLD_TTL_SECONDS = 600
+MAX_GROUP_CARS = 25
+
+# Booking views read the booking_summaries projection (one pre-joined row per booking)
+ADMIN_BOOKINGS_SQL = """
+    SELECT
+        b.booking_id, b.user_id, b.car_id,
+        b.start_date, b.end_date, b.status, b.total_cost,
+        b.user_name, b.brand, b.model, b.payment_status
+    FROM booking_summaries b
+    WHERE {where_clause}
+    ORDER BY b.created_at DESC
+"""
+
+@instrumented
+@profiled
 class BookingService:
+    # Checkout holds, shared by every instance in this process (never touch the DB)
+    holds = HoldStore(ttl=HOLD_TTL_SECONDS)
+
     def __init__(self, db: DatabaseConnection|None = None):
         self.db = db or DatabaseConnection()
-    
-    def create_booking(self, user_id: int, car_id: int, start_date_str: str, end_date_str: str):
+        self.idempotency = IdempotencyKeys(self.db)
+
+    @staticmethod
+    def _parse_range(start_date_str: str, end_date_str: str):
+        """(start, end, None) or (None, None, error message)."""
         try:
             start = parse_yyyy_mm_dd(start_date_str)
             end = parse_yyyy_mm_dd(end_date_str)
-            if end < start:
-                return {"success": False, "message": "End date must be on/after start date"}
         except Exception:
-            return {"success": False, "message": "Invalid date format. Use YYYY-MM-DD"}
+            return None, None, "Invalid date format. Use YYYY-MM-DD"
+        if end < start:
+            return None, None, "End date must be on/after start date"
+        return start, end, None
+
+    def place_hold(self, user_id: int, car_id: int, start_date_str: str, end_date_str: str):
+        """
+        Hold a car for a date range while the customer confirms (HOLD_TTL_SECONDS).
+        Reads the day slots only; the hold itself is kept in memory.
+        """
+        start, end, error = self._parse_range(start_date_str, end_date_str)
+        if error:
+            return {"success": False, "message": error}
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute(
+                    "SELECT 1 FROM booking_day_slots WHERE car_id=%s AND day BETWEEN %s AND %s LIMIT 1",
+                    (car_id, start, end),
+                )
+                if cur.fetchone():
+                    return {"success": False, "message": "Car is already booked for some of these dates"}
+        hold = self.holds.place(user_id, car_id, start, end)
+        if hold is None:
+            return {"success": False, "message": "Car is on hold by another customer for these dates"}
+        return {"success": True, "message": "Car held", "hold_id": hold.hold_id,
+                "expires_in": int(self.holds.ttl)}
+
+    def confirm_hold(self, user_id: int, hold_id: str):
+        """Turn the user's live hold into a pending booking; the hold is used up either way."""
+        hold = self.holds.take(hold_id, user_id)
+        if hold is None:
+            return {"success": False, "message": "Hold not found or expired"}
+        try:
+            res = self._create(user_id, hold.car_id, hold.start, hold.end)
+        except Exception:
+            self.holds.restore(hold)
+            raise
+        if not res.get("success") and res.get("message") == "DB connection failed":
+            self.holds.restore(hold)
+        return res
+
+    def release_hold(self, user_id: int, hold_id: str):
+        """Drop the user's own hold (e.g. they declined to confirm)."""
+        if self.holds.take(hold_id, user_id) is None:
+            return {"success": False, "message": "Hold not found or expired"}
+        return {"success": True, "message": "Hold released"}
 
+    def create_booking(self, user_id: int, car_id: int, start_date_str: str, end_date_str: str,
+                       idempotency_key: str | None = None):
+        """
+        Create a pending booking. A retry carrying the same idempotency_key gets the
+        first attempt's result back instead of a second booking.
+        """
+        start, end, error = self._parse_range(start_date_str, end_date_str)
+        if error:
+            return {"success": False, "message": error}
+        if idempotency_key:
+            replay = self.idempotency.replay("create_booking", idempotency_key,
+                                             fingerprint(user_id, car_id, start, end))
+            if replay:
+                return replay
+        if self.holds.is_held(car_id, start, end, user_id=user_id):
+            return {"success": False, "message": "Car is on hold by another customer for these dates"}
+        return self._create(user_id, car_id, start, end, idempotency_key)
+
+    def _create(self, user_id: int, car_id: int, start, end, idempotency_key: str | None = None):
+        request = fingerprint(user_id, car_id, start, end)
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
+            with closing(conn.cursor()) as cur:
                 # Get car pricing & constraints
                 cur.execute(
                     "SELECT daily_rate, min_period_days, max_period_days FROM cars WHERE car_id=%s",
                     (car_id,),
                 )
-                car = cur.fetchone()
+                car = Car.fetchone(cur)
                 if not car:
                     return {"success": False, "message": "Car not found"}
 
-                # (Optional) overlap/availability checks are assumed already handled
                 try:
                     pricing = compute_total(
                         daily_rate=car["daily_rate"],
@@ -47,62 +145,201 @@ class BookingService:
                 except ValueError as e:
                     return {"success": False, "message": str(e)}
 
+                conn.start_transaction()
+                try:
+                    if idempotency_key:
+                        self.idempotency.claim(cur, "create_booking", idempotency_key, request)
+                    cur.execute(
+                        """
+                        INSERT INTO bookings (user_id, car_id, start_date, end_date, status, total_cost)
+                        VALUES (%s, %s, %s, %s, 'pending', %s)
+                        """,
+                        (user_id, car_id, start, end, str(pricing["total"])),
+                    )
+                    booking_id = cur.lastrowid
+                    # the (car_id, day) key refuses overlapping bookings, even concurrent ones
+                    reserve_days(cur, booking_id, car_id, start, end)
+                    refresh_summaries(cur, booking_id)
+                    record_event(cur, BOOKING_CREATED, booking_id, {
+                        "user_id": user_id, "car_id": car_id, "start_date": start, "end_date": end,
+                        "total_cost": str(pricing["total"]),
+                    })
+                    result = {
+                        "success": True,
+                        "message": "Booking created (pending approval)",
+                        "booking_id": booking_id,
+                        "total_cost": str(pricing["total"]),
+                        "days": pricing["days"],
+                    }
+                    if idempotency_key:
+                        self.idempotency.complete(cur, "create_booking", idempotency_key, result)
+                    conn.commit()
+                except KeyReplayed:
+                    conn.rollback()
+                    return self.idempotency.replayed("create_booking", idempotency_key, request)
+                except SlotConflict as e:
+                    conn.rollback()
+                    return {"success": False, "message": str(e)}
+                except Exception:
+                    conn.rollback()
+                    raise
+                if idempotency_key:
+                    self.idempotency.remember("create_booking", idempotency_key, request, result)
+                AuditService.record(booking_id, None, "pending", "create", user_id)
+                return result
+
+
+    def create_group_booking(self, user_id: int, car_ids: list[int], start_date_str: str, end_date_str: str):
+        """
+        Book several cars for the same dates as one group: all of them or none.
+        One query prices every car, one checks their day slots, and one
+        transaction inserts the group, its bookings and their slots.
+        """
+        start, end, error = self._parse_range(start_date_str, end_date_str)
+        if error:
+            return {"success": False, "message": error}
+        try:
+            car_ids = list(dict.fromkeys(int(c) for c in car_ids))
+        except (TypeError, ValueError):
+            return {"success": False, "message": "Car ids must be whole numbers"}
+        if not car_ids:
+            return {"success": False, "message": "No cars selected"}
+        if len(car_ids) > MAX_GROUP_CARS:
+            return {"success": False, "message": f"At most {MAX_GROUP_CARS} cars per group booking"}
+        held = [c for c in car_ids if self.holds.is_held(c, start, end, user_id=user_id)]
+        if held:
+            return {"success": False, "unavailable": held,
+                    "message": f"On hold by another customer: cars {', '.join(map(str, held))}"}
+
+        in_ids = ", ".join(["%s"] * len(car_ids))
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute(
+                    f"SELECT car_id, daily_rate, min_period_days, max_period_days FROM cars WHERE car_id IN ({in_ids})",
+                    car_ids,
+                )
+                cars = {c["car_id"]: c for c in Car.fetchall(cur)}
+                missing = [c for c in car_ids if c not in cars]
+                if missing:
+                    return {"success": False, "message": f"Car(s) not found: {', '.join(map(str, missing))}"}
+
+                pricing, problems = {}, []
+                for car_id in car_ids:
+                    car = cars[car_id]
+                    try:
+                        pricing[car_id] = compute_total(
+                            daily_rate=car["daily_rate"], start=start, end=end,
+                            min_days=car["min_period_days"], max_days=car["max_period_days"],
+                            fees=[], tax_rate=None,
+                        )
+                    except ValueError as e:
+                        problems.append(f"car {car_id}: {e}")
+                if problems:
+                    return {"success": False, "message": "; ".join(problems)}
+
+                # friendly early answer; the slot key below is what actually guarantees it
                 cur.execute(
-                    """
-                    INSERT INTO bookings (user_id, car_id, start_date, end_date, status, total_cost)
-                    VALUES (%s, %s, %s, %s, 'pending', %s)
-                    """,
-                    (user_id, car_id, start, end, str(pricing["total"])),
+                    f"SELECT DISTINCT car_id FROM booking_day_slots WHERE car_id IN ({in_ids}) AND day BETWEEN %s AND %s",
+                    (*car_ids, start, end),
                 )
-                conn.commit()
-                booking_id = cur.lastrowid
+                taken = sorted(row[0] for row in cur.fetchall())
+                if taken:
+                    return {"success": False, "unavailable": taken,
+                            "message": f"Already booked for some of these dates: cars {', '.join(map(str, taken))}"}
 
-                return {
-                    "success": True,
-                    "message": "Booking created (pending approval)",
-                    "booking_id": booking_id,
-                    "total_cost": str(pricing["total"]),
-                    "days": pricing["days"],
-                }
+                conn.start_transaction()
+                try:
+                    cur.execute("INSERT INTO booking_groups (user_id) VALUES (%s)", (user_id,))
+                    group_id = cur.lastrowid
+                    cur.executemany(
+                        """
+                        INSERT INTO bookings (user_id, car_id, group_id, start_date, end_date, status, total_cost)
+                        VALUES (%s, %s, %s, %s, %s, 'pending', %s)
+                        """,
+                        [(user_id, c, group_id, start, end, str(pricing[c]["total"])) for c in car_ids],
+                    )
+                    # auto-increment ids of a multi-row insert need not be consecutive
+                    cur.execute("SELECT car_id, booking_id FROM bookings WHERE group_id=%s", (group_id,))
+                    booking_ids = dict(cur.fetchall())
+                    reserve_bookings(cur, [(booking_ids[c], c, start, end) for c in car_ids])
+                    refresh_summaries(cur, *booking_ids.values())
+                    for c in car_ids:
+                        record_event(cur, BOOKING_CREATED, booking_ids[c], {
+                            "user_id": user_id, "car_id": c, "start_date": start, "end_date": end,
+                            "total_cost": str(pricing[c]["total"]), "group_id": group_id,
+                        })
+                    conn.commit()
+                except SlotConflict as e:
+                    conn.rollback()
+                    return {"success": False, "message": str(e)}
+                except Exception:
+                    conn.rollback()
+                    raise
+        for c in car_ids:
+            AuditService.record(booking_ids[c], None, "pending", "create", user_id, note=f"group {group_id}")
 
+        total = sum((pricing[c]["total"] for c in car_ids), Decimal("0"))
+        return {
+            "success": True,
+            "message": f"Group booking created: {len(car_ids)} cars (pending approval)",
+            "group_id": group_id,
+            "bookings": [{"booking_id": booking_ids[c], "car_id": c, "total_cost": str(pricing[c]["total"]),
+                          "days": pricing[c]["days"]} for c in car_ids],
+            "total_cost": str(total),
+        }
 
     def list_user_bookings(self, user_id: int, status: Optional[str] = None):
         """
-        Return a user's bookings with car details, payment status, and QR token presence.
+        Return a user's bookings with car details, payment status, and QR token presence (has_qr).
+        Only the columns the booking views print are selected; rows are Booking records.
         Optional filter by booking status: pending/approved/rejected/active/completed/cancelled
         """
-        allowed = {"pending","approved","rejected","active","completed","cancelled"}
-        use_filter = status in allowed if status is not None else False
-
-        with closing(self.db.get_connection()) as conn:
+        sql, params = self._user_bookings_query(user_id, status)
+        with closing(self.db.get_read_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
-                sql = """
-                SELECT
-                    b.booking_id, b.user_id, b.car_id,
-                    b.start_date, b.end_date, b.status, b.total_cost,
-                    b.approved_by, b.created_at, b.updated_at,
-                    c.brand, c.model, c.daily_rate,
-                    p.payment_status, p.amount AS payment_amount,
-                    q.qr_token
-                FROM bookings b
-                JOIN cars c ON c.car_id = b.car_id
-                LEFT JOIN payments p ON p.booking_id = b.booking_id
-                LEFT JOIN booking_qr_codes q ON q.booking_id = b.booking_id
-                WHERE b.user_id = %s
-                {status_clause}
-                ORDER BY b.created_at DESC
-                """
-                if use_filter:
-                    sql = sql.format(status_clause="AND b.status = %s")
-                    cur.execute(sql, (user_id, status))
-                else:
-                    sql = sql.format(status_clause="")
-                    cur.execute(sql, (user_id,))
-                rows = cur.fetchall() or []
+            with closing(conn.cursor()) as cur:
+                cur.execute(sql, params)
+                rows = Booking.fetchall(cur)
                 return {"success": True, "bookings": rows}
-            
+
+    def stream_user_bookings(self, user_id: int, status: Optional[str] = None,
+                             batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Same rows as list_user_bookings, but "bookings" is a generator fed in
+        batches from an unbuffered cursor. Consume it (or .close() it) to release
+        the connection.
+        """
+        sql, params = self._user_bookings_query(user_id, status)
+        conn = self.db.get_read_connection()
+        if not conn or not conn.is_connected():
+            return {"success": False, "message": "DB connection failed"}
+        return {"success": True, "bookings": open_stream(conn, sql, params, Booking, batch_size)}
+
+    @staticmethod
+    def _user_bookings_query(user_id: int, status: Optional[str]):
+        """
+        Hot summaries, plus booking_summaries_archive when the status filter can
+        match archived bookings (see services/archive_service.py).
+        """
+        use_filter = status in BOOKING_STATUSES if status is not None else False
+        branch = """
+            SELECT
+                b.booking_id, b.user_id, b.car_id,
+                b.start_date, b.end_date, b.status, b.total_cost,
+                b.brand, b.model, b.payment_status, b.has_qr, b.created_at
+            FROM {table} b
+            WHERE b.user_id = %s
+            {status_clause}
+        """.replace("{status_clause}", "AND b.status = %s" if use_filter else "")
+        params = (user_id, status) if use_filter else (user_id,)
+        if use_filter and status not in ARCHIVABLE_STATUSES:
+            return branch.format(table="booking_summaries") + " ORDER BY b.created_at DESC", params
+        sql = (f"({branch.format(table='booking_summaries')}) UNION ALL "
+               f"({branch.format(table='booking_summaries_archive')}) ORDER BY created_at DESC")
+        return sql, params * 2
 
 
     def list_admin_bookings(self,
@@ -121,13 +358,56 @@ class BookingService:
         - pagination: limit/offset
         Returns: {success, bookings: [...], counts: {status->count}}
         """
-        allowed = {"pending","approved","rejected","active","completed","cancelled"}
+        try:
+            where_clause, params = self._admin_filters(status, user_id, date_from, date_to)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                # Main listing
+                sql = ADMIN_BOOKINGS_SQL.format(where_clause=where_clause) + " LIMIT %s OFFSET %s"
+                cur.execute(sql, (*params, int(limit), int(offset)))
+                rows = Booking.fetchall(cur)
+                counts = self._status_counts(cur)
+                return {"success": True, "bookings": rows, "counts": counts}
+
+    def stream_admin_bookings(self,
+        status: Optional[str] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        """
+        Admin listing without LIMIT/OFFSET: "bookings" is a generator that yields
+        rows batch by batch, so memory stays flat however many bookings match.
+        Counts are read up front on the same connection.
+        """
+        try:
+            where_clause, params = self._admin_filters(status, user_id, date_from, date_to)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+
+        conn = self.db.get_read_connection()
+        if not conn or not conn.is_connected():
+            return {"success": False, "message": "DB connection failed"}
+        with closing(conn.cursor()) as cur:
+            counts = self._status_counts(cur)
+        sql = ADMIN_BOOKINGS_SQL.format(where_clause=where_clause)
+        return {"success": True, "bookings": open_stream(conn, sql, params, Booking, batch_size),
+                "counts": counts}
+
+    @staticmethod
+    def _admin_filters(status, user_id, date_from, date_to):
         where = ["1=1"]
         params = []
 
         if status:
-            if status not in allowed:
-                return {"success": False, "message": f"Invalid status '{status}'"}
+            if status not in BOOKING_STATUSES:
+                raise ValueError(f"Invalid status '{status}'")
             where.append("b.status = %s")
             params.append(status)
 
@@ -143,42 +423,17 @@ class BookingService:
             where.append("b.start_date <= %s")
             params.append(date_to)
 
-        where_clause = " AND ".join(where)
+        return " AND ".join(where), params
 
-        with closing(self.db.get_connection()) as conn:
-            if not conn or not conn.is_connected():
-                return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
-                # Main listing
-                sql = f"""
-                    SELECT
-                        b.booking_id, b.user_id, b.car_id,
-                        b.start_date, b.end_date, b.status, b.total_cost,
-                        b.approved_by, b.created_at,
-                        u.name AS user_name, u.email AS user_email,
-                        c.brand, c.model, c.daily_rate,
-                        p.payment_status, p.amount AS payment_amount
-                    FROM bookings b
-                    JOIN users u ON u.user_id = b.user_id
-                    JOIN cars  c ON c.car_id = b.car_id
-                    LEFT JOIN payments p ON p.booking_id = b.booking_id
-                    WHERE {where_clause}
-                    ORDER BY b.created_at DESC
-                    LIMIT %s OFFSET %s
-                """
-                cur.execute(sql, (*params, int(limit), int(offset)))
-                rows = cur.fetchall() or []
-
-                # Status counts (for quick summary)
-                cur.execute("""
-                    SELECT status, COUNT(*) AS cnt
-                    FROM bookings
-                    GROUP BY status
-                """)
-                counts_raw = cur.fetchall() or []
-                counts = {r["status"]: r["cnt"] for r in counts_raw}
-
-                return {"success": True, "bookings": rows, "counts": counts}
+    @staticmethod
+    def _status_counts(cur) -> dict:
+        # Status counts (for quick summary)
+        cur.execute("""
+            SELECT status, COUNT(*) AS cnt
+            FROM booking_summaries
+            GROUP BY status
+        """)
+        return {status_: cnt for status_, cnt in cur.fetchall()}
 
 
     def list_pending_approvals(self, limit: int = 200, offset: int = 0):
@@ -190,26 +445,84 @@ class BookingService:
         """Admin shortcut: rejected bookings (status = 'rejected')."""
         return self.list_admin_bookings(status="rejected", limit=limit, offset=offset)
 
-    def approve_booking(self, admin_user_id: int, booking_id: int, approve: bool = True):
+    def approve_booking(self, admin_user_id: int, booking_id: int, approve: bool = True,
+                        idempotency_key: str | None = None):
         # Reject path (simple, all inside one connection scope)
         if not approve:
             with closing(self.db.get_connection()) as conn:
                 if not conn or not conn.is_connected():
                     return {"success": False, "message": "DB connection failed"}
-                with closing(conn.cursor(dictionary=True)) as cur:
-                    cur.execute("SELECT status FROM bookings WHERE booking_id=%s", (booking_id,))
-                    row = cur.fetchone()
-                    if not row:
-                        return {"success": False, "message": "Booking not found"}
-                    if row["status"] not in ("pending", "approved", "rejected"):
-                        return {"success": False, "message": f"Cannot change booking in status: {row['status']}"}
-                    cur.execute(
-                        "UPDATE bookings SET status='rejected', approved_by=%s WHERE booking_id=%s",
-                        (admin_user_id, booking_id),
-                    )
-                    conn.commit()
+                with closing(conn.cursor()) as cur:
+                    conn.start_transaction()
+                    try:
+                        cur.execute("SELECT status FROM bookings WHERE booking_id=%s FOR UPDATE", (booking_id,))
+                        row = cur.fetchone()
+                        if not row:
+                            conn.rollback()
+                            return {"success": False, "message": "Booking not found"}
+                        if row[0] not in ("pending", "approved", "rejected"):
+                            conn.rollback()
+                            return {"success": False, "message": f"Cannot change booking in status: {row[0]}"}
+                        cur.execute(
+                            "UPDATE bookings SET status='rejected', approved_by=%s WHERE booking_id=%s",
+                            (admin_user_id, booking_id),
+                        )
+                        release_days(cur, booking_id)
+                        refresh_summaries(cur, booking_id)
+                        record_event(cur, BOOKING_REJECTED, booking_id,
+                                     {"admin_user_id": admin_user_id, "previous_status": row[0]})
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+            AuditService.record(booking_id, row[0], "rejected", "reject", admin_user_id)
             return {"success": True, "message": "Booking rejected"}
 
         # Approve path: delegate to workflow (keeps all DB work properly scoped)
-        return BookingWorkflow(self.db).approve(booking_id=booking_id, admin_user_id=admin_user_id, days_valid=7)
+        return BookingWorkflow(self.db).approve(booking_id=booking_id, admin_user_id=admin_user_id, days_valid=7,
+                                                idempotency_key=idempotency_key)
+
+    def approve_group(self, admin_user_id: int, group_id: int, approve: bool = True,
+                      idempotency_key: str | None = None):
+        """Approve or reject every booking of a group booking, in one transaction."""
+        if approve:
+            return BookingWorkflow(self.db).approve_group(group_id=group_id, admin_user_id=admin_user_id, days_valid=7,
+                                                          idempotency_key=idempotency_key)
+
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                conn.start_transaction()
+                try:
+                    cur.execute(
+                        "SELECT booking_id, status FROM bookings WHERE group_id=%s ORDER BY booking_id FOR UPDATE",
+                        (group_id,),
+                    )
+                    rows = cur.fetchall()
+                    if not rows:
+                        conn.rollback()
+                        return {"success": False, "message": "Group not found"}
+                    stuck = [f"#{bid} ({st})" for bid, st in rows if st not in ("pending", "approved", "rejected")]
+                    if stuck:
+                        conn.rollback()
+                        return {"success": False, "message": f"Cannot change bookings: {', '.join(stuck)}"}
+                    ids = [bid for bid, _ in rows]
+                    cur.execute(
+                        "UPDATE bookings SET status='rejected', approved_by=%s WHERE group_id=%s",
+                        (admin_user_id, group_id),
+                    )
+                    release_days(cur, *ids)
+                    refresh_summaries(cur, *ids)
+                    for bid, previous in rows:
+                        record_event(cur, BOOKING_REJECTED, bid,
+                                     {"admin_user_id": admin_user_id, "previous_status": previous})
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        for bid, previous in rows:
+            AuditService.record(bid, previous, "rejected", "reject", admin_user_id, note=f"group {group_id}")
+        return {"success": True, "message": f"Group rejected ({len(rows)} bookings)",
+                "group_id": group_id, "booking_ids": ids}
 
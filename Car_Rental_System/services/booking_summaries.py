@@ -0,0 +1,100 @@
+# services/booking_summaries.py
+"""
+booking_summaries: one pre-joined row per booking (migration 0008) holding
+exactly what the booking views print, so the customer and admin lists are
+single-table range scans on (user_id, created_at) / (status, created_at)
+instead of a 4-way join per menu view.
+
+Writers keep it current: every change to a booking, its payment or its QR
+token calls refresh_summaries(cur, booking_id, ...) on the same cursor and in
+the same transaction, so the projection commits with the change. The row is
+recomputed from the source tables (INSERT ... SELECT ... ON DUPLICATE KEY
+UPDATE), which makes a refresh idempotent and order-independent.
+
+`python -m services.booking_summaries rebuild` recomputes every row in
+booking_id chunks and drops rows whose booking no longer exists.
+"""
+import sys
+from contextlib import closing
+
+from config.database import DatabaseConnection
+
+SUMMARY_COLUMNS = ("booking_id", "user_id", "car_id", "start_date", "end_date", "status",
+                   "total_cost", "created_at", "user_name", "brand", "model",
+                   "payment_status", "has_qr")
+
+_UPSERT_SQL = """
+    INSERT INTO booking_summaries ({columns})
+    SELECT b.booking_id, b.user_id, b.car_id, b.start_date, b.end_date, b.status,
+           b.total_cost, b.created_at, u.name, c.brand, c.model,
+           p.payment_status, q.booking_id IS NOT NULL
+    FROM bookings b
+    JOIN users u ON u.user_id = b.user_id
+    JOIN cars  c ON c.car_id = b.car_id
+    LEFT JOIN payments p ON p.booking_id = b.booking_id
+    LEFT JOIN booking_qr_codes q ON q.booking_id = b.booking_id
+    WHERE {where}
+    ON DUPLICATE KEY UPDATE {updates}
+""".replace("{columns}", ", ".join(SUMMARY_COLUMNS)).replace(
+    "{updates}", ", ".join(f"{c}=VALUES({c})" for c in SUMMARY_COLUMNS[1:]))
+
+REBUILD_CHUNK = 5000
+
+
+def refresh_summaries(cur, *booking_ids: int):
+    """Recompute the summary rows of these bookings on the caller's cursor/transaction."""
+    if not booking_ids:
+        return
+    cur.execute(
+        _UPSERT_SQL.format(where=f"b.booking_id IN ({', '.join(['%s'] * len(booking_ids))})"),
+        booking_ids,
+    )
+
+
+def refresh_car_summaries(cur, car_id: int):
+    """Recompute every summary row of one car (after its brand/model changed)."""
+    cur.execute(_UPSERT_SQL.format(where="b.car_id = %s"), (car_id,))
+
+
+def rebuild(db: DatabaseConnection | None = None, chunk_size: int = REBUILD_CHUNK):
+    """Recompute the whole projection, one booking_id range per statement."""
+    db = db or DatabaseConnection()
+    with closing(db.get_connection()) as conn:
+        if not conn or not conn.is_connected():
+            return {"success": False, "message": "DB connection failed"}
+        with closing(conn.cursor()) as cur:
+            cur.execute("SELECT MIN(booking_id), MAX(booking_id) FROM bookings")
+            lo, hi = cur.fetchone() or (None, None)
+            rows = 0
+            if lo is not None:
+                for start in range(lo, hi + 1, chunk_size):
+                    cur.execute(_UPSERT_SQL.format(where="b.booking_id BETWEEN %s AND %s"),
+                                (start, start + chunk_size - 1))
+                    conn.commit()
+                    rows += cur.rowcount
+            cur.execute(
+                """
+                DELETE s FROM booking_summaries s
+                LEFT JOIN bookings b ON b.booking_id = s.booking_id
+                WHERE b.booking_id IS NULL
+                """
+            )
+            removed = cur.rowcount
+            conn.commit()
+    return {"success": True, "message": f"Rebuilt booking_summaries ({removed} stale rows removed)",
+            "rows_affected": rows, "removed": removed}
+
+
+def main(argv: list[str] | None = None) -> int:
+    """python -m services.booking_summaries rebuild"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] != ["rebuild"]:
+        print("Usage: python -m services.booking_summaries rebuild")
+        return 2
+    res = rebuild()
+    print(("✅ " if res.get("success") else "❌ ") + res["message"])
+    return 0 if res.get("success") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,13 @@
 # services/car_service.py
 from config.database import DatabaseConnection
+from models.models import Car
+from services.booking_service import BookingService
+from services.booking_summaries import refresh_car_summaries
+from services.search_service import SearchService
+from utils.streaming import DEFAULT_BATCH_SIZE, open_stream
+from utils.profiling import profiled
 
+@profiled
 class CarService:
     def __init__(self, db: DatabaseConnection|None = None):
         self.db = db or DatabaseConnection()
@@ -13,7 +20,7 @@ class CarService:
             conn = self.db.get_connection()
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            cur = conn.cursor(dictionary=True)
+            cur = conn.cursor()
 
             sql = """
             INSERT INTO cars (brand, model, year, mileage, daily_rate, min_period_days, max_period_days, available_now)
@@ -21,6 +28,7 @@ class CarService:
             """
             cur.execute(sql, (brand, model, year, mileage, daily_rate, min_period_days, max_period_days, bool(available_now)))
             conn.commit()
+            SearchService.index_car(cur.lastrowid, brand, model)
             return {"success": True, "message": "Car added successfully", "car_id": cur.lastrowid}
         except Exception as e:
             return {"success": False, "message": f"Add car error: {e}"}
@@ -46,14 +54,19 @@ class CarService:
             conn = self.db.get_connection()
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            cur = conn.cursor(dictionary=True)
+            cur = conn.cursor()
 
             sql = f"UPDATE cars SET {', '.join(sets)} WHERE car_id=%s"
             values.append(car_id)
             cur.execute(sql, tuple(values))
-            conn.commit()
             if cur.rowcount == 0:
+                conn.commit()
                 return {"success": False, "message": "Car not found"}
+            if "brand" in fields or "model" in fields:
+                refresh_car_summaries(cur, car_id)
+            conn.commit()
+            if "brand" in fields or "model" in fields:
+                SearchService.update_car(car_id, brand=fields.get("brand"), model=fields.get("model"))
             return {"success": True, "message": "Car updated successfully"}
         except Exception as e:
             return {"success": False, "message": f"Update car error: {e}"}
@@ -61,6 +74,116 @@ class CarService:
             if cur: cur.close()
             if conn and conn.is_connected(): conn.close()
 
+
+    # ---------------- fleet-wide updates ----------------
+    @staticmethod
+    def _fleet_filter(brand=None, model=None, car_ids=None):
+        """WHERE clause + params for a fleet filter; (None, message) when nothing selects cars."""
+        clauses, params = [], []
+        if brand:
+            clauses.append("brand = %s"); params.append(brand)
+        if model:
+            clauses.append("model = %s"); params.append(model)
+        if car_ids:
+            ids = [int(i) for i in car_ids]
+            clauses.append(f"car_id IN ({', '.join(['%s'] * len(ids))})"); params.extend(ids)
+        if not clauses:
+            return None, "Give a brand, model or car ids (refusing to update the whole fleet)"
+        return " AND ".join(clauses), params
+
+    def _bulk_update(self, set_sql: str, set_params: list, preview_expr: str, preview_params: list,
+                     where: str, params: list, dry_run: bool):
+        """
+        One UPDATE for every matching car, or with dry_run the same WHERE as a
+        SELECT showing each car's current and new value.
+        """
+        conn, cur = None, None
+        try:
+            conn = self.db.get_connection()
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            cur = conn.cursor()
+            if dry_run:
+                cur.execute(
+                    f"SELECT car_id, brand, model, {preview_expr} FROM cars WHERE {where} ORDER BY brand, model, car_id",
+                    (*preview_params, *params),
+                )
+                rows = Car.fetchall(cur)
+                return {"success": True, "dry_run": True, "cars": rows,
+                        "message": f"{len(rows)} car(s) would change"}
+            cur.execute(f"UPDATE cars SET {set_sql} WHERE {where}", (*set_params, *params))
+            affected = cur.rowcount
+            conn.commit()
+            return {"success": True, "dry_run": False, "affected": affected,
+                    "message": f"{affected} car(s) updated"}
+        except Exception as e:
+            return {"success": False, "message": f"Bulk update error: {e}"}
+        finally:
+            if cur: cur.close()
+            if conn and conn.is_connected(): conn.close()
+
+    def bulk_update_rates(self, percent=None, amount=None, brand=None, model=None, car_ids=None,
+                          dry_run: bool = False):
+        """
+        Change daily_rate by `percent` (10 = +10%) or by a fixed `amount` for every
+        car matching the filter. Rates are rounded to cents and never go below 0.
+        """
+        if (percent is None) == (amount is None):
+            return {"success": False, "message": "Give exactly one of percent or amount"}
+        where, params = self._fleet_filter(brand, model, car_ids)
+        if where is None:
+            return {"success": False, "message": params}
+        if percent is not None:
+            expr, value = "GREATEST(0, ROUND(daily_rate * (1 + %s / 100), 2))", str(percent)
+        else:
+            expr, value = "GREATEST(0, daily_rate + %s)", str(amount)
+        # cars already at the new rate (e.g. 0 stays 0) are not "changed"
+        where += f" AND daily_rate <> {expr}"
+        params = [*params, value]
+        return self._bulk_update(f"daily_rate = {expr}", [value],
+                                 f"daily_rate, {expr} AS new_daily_rate", [value],
+                                 where, params, dry_run)
+
+    def bulk_set_period_limits(self, min_days=None, max_days=None, brand=None, model=None, car_ids=None,
+                               dry_run: bool = False):
+        """
+        Set min_period_days and/or max_period_days for every matching car. Cars
+        whose other (unchanged) limit would end up below min / above max are left alone.
+        """
+        if min_days is None and max_days is None:
+            return {"success": False, "message": "Give min_days and/or max_days"}
+        if any(v is not None and v <= 0 for v in (min_days, max_days)):
+            return {"success": False, "message": "Min/Max period must be positive integers"}
+        if min_days is not None and max_days is not None and min_days > max_days:
+            return {"success": False, "message": "Min period cannot be greater than Max period"}
+        where, params = self._fleet_filter(brand, model, car_ids)
+        if where is None:
+            return {"success": False, "message": params}
+        sets, values = [], []
+        if min_days is not None:
+            sets.append("min_period_days = %s"); values.append(min_days)
+            if max_days is None:
+                where += " AND (max_period_days IS NULL OR max_period_days >= %s)"; params.append(min_days)
+        if max_days is not None:
+            sets.append("max_period_days = %s"); values.append(max_days)
+            if min_days is None:
+                where += " AND (min_period_days IS NULL OR min_period_days <= %s)"; params.append(max_days)
+        preview = "min_period_days, max_period_days, " + ", ".join(
+            f"%s AS new_{s.split(' ')[0]}" for s in sets)
+        return self._bulk_update(", ".join(sets), values, preview, values, where, params, dry_run)
+
+    def bulk_set_availability(self, available: bool, brand=None, model=None, car_ids=None,
+                              dry_run: bool = False):
+        """Set available_now on every matching car (cars already in that state are untouched)."""
+        where, params = self._fleet_filter(brand, model, car_ids)
+        if where is None:
+            return {"success": False, "message": params}
+        where += " AND available_now <> %s"
+        params.append(bool(available))
+        return self._bulk_update("available_now = %s", [bool(available)],
+                                 "available_now, %s AS new_available_now", [bool(available)],
+                                 where, params, dry_run)
+
     
     def delete_car(self,car_id):
         conn, cur = None, None
@@ -68,11 +191,12 @@ class CarService:
             conn = self.db.get_connection()
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            cur = conn.cursor(dictionary=True)
+            cur = conn.cursor()
             cur.execute("DELETE FROM cars WHERE car_id=%s", (car_id,))
             conn.commit()
             if cur.rowcount == 0:
                 return {"success": False, "message": "Car not found"}
+            SearchService.remove_car(car_id)
             return {"success": True, "message": "Car deleted"}
         except Exception as e:
             # If a car has bookings (FK RESTRICT), deletion will fail
@@ -85,12 +209,12 @@ class CarService:
     def get_car(self, car_id):
         conn, cur = None, None
         try:
-            conn = self.db.get_connection()
+            conn = self.db.get_read_connection()
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT * FROM cars WHERE car_id=%s", (car_id,))
-            car = cur.fetchone()
+            cur = conn.cursor()
+            cur.execute(f"SELECT {Car.select_list()} FROM cars WHERE car_id=%s", (car_id,))
+            car = Car.fetchone(cur)
             if not car:
                 return {"success": False, "message": "Car not found"}
             return {"success": True, "car": car}
@@ -104,12 +228,12 @@ class CarService:
     def list_cars(self):
         conn, cur = None, None
         try:
-            conn = self.db.get_connection()
+            conn = self.db.get_read_connection()
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT * FROM cars ORDER BY brand, model")
-            rows = cur.fetchall()
+            cur = conn.cursor()
+            cur.execute(f"SELECT {Car.select_list()} FROM cars ORDER BY brand, model")
+            rows = Car.fetchall(cur)
             return {"success": True, "cars": rows}
         except Exception as e:
             return {"success": False, "message": f"List cars error: {e}"}
@@ -118,18 +242,47 @@ class CarService:
             if conn and conn.is_connected(): conn.close()
 
 
-    def list_available_cars(self):
+    def stream_cars(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Like list_cars, but "cars" is a generator fed in batches from an
+        unbuffered cursor (flat memory for large fleets). Consume or close it.
+        """
+        try:
+            conn = self.db.get_read_connection()
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            sql = f"SELECT {Car.select_list()} FROM cars ORDER BY brand, model"
+            return {"success": True, "cars": open_stream(conn, sql, (), Car, batch_size)}
+        except Exception as e:
+            return {"success": False, "message": f"List cars error: {e}"}
+
+
+    def list_available_cars(self, start=None, end=None, user_id=None):
         """
-        Return ONLY currently available cars (no date filtering).
+        Return ONLY currently available cars. With a date range (dates), also
+        leave out cars booked on any of those days (booking_day_slots) or held
+        in checkout by a customer other than `user_id`.
         """
         conn, cur = None, None
         try:
-            conn = self.db.get_connection()
+            conn = self.db.get_read_connection()
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            cur = conn.cursor(dictionary=True)
-            cur.execute("SELECT * FROM cars WHERE available_now = TRUE")
-            rows = cur.fetchall()
+            cur = conn.cursor()
+            if start is None or end is None:
+                cur.execute(f"SELECT {Car.select_list()} FROM cars WHERE available_now = TRUE")
+                return {"success": True, "cars": Car.fetchall(cur)}
+            cur.execute(
+                f"""
+                SELECT {Car.select_list("c")} FROM cars c
+                WHERE c.available_now = TRUE
+                  AND NOT EXISTS (SELECT 1 FROM booking_day_slots s
+                                  WHERE s.car_id = c.car_id AND s.day BETWEEN %s AND %s)
+                """,
+                (start, end),
+            )
+            held = BookingService.holds.held_cars(start, end, user_id=user_id)
+            rows = [c for c in Car.fetchall(cur) if c["car_id"] not in held]
             return {"success": True, "cars": rows}
         except Exception as e:
             return {"success": False, "message": f"List available cars error: {e}"}
@@ -0,0 +1,74 @@
+# services/event_handlers.py
+"""
+Default subscribers for booking events. Each handler may run more than once
+for the same event (at-least-once delivery), so each one is idempotent.
+"""
+import sys
+import time
+from decimal import Decimal
+
+from config.database import DatabaseConnection
+from services.events import BOOKING_APPROVED, EventBus, OutboxDispatcher
+from services.payment_service import PaymentService
+from services.qrcode_service import QRService
+
+
+def register_default_handlers(bus: EventBus, db: DatabaseConnection | None = None) -> EventBus:
+    db = db or DatabaseConnection()
+    payments = PaymentService(db)
+    qr = QRService(db)
+
+    def prepare_payment(event):
+        """BookingApproved -> one pending payment for the booking total (upsert)."""
+        res = payments.create_or_update_pending(event.booking_id, Decimal(str(event.payload["total_cost"])))
+        if not res.get("success"):
+            raise RuntimeError(res.get("message", "payment prepare failed"))
+
+    def issue_qr(event):
+        """BookingApproved -> QR token; an existing, unexpired token is kept on redelivery."""
+        current = qr.get_by_booking(event.booking_id)
+        if current.get("success"):
+            expires_at = current["qr"]["expires_at"]
+            if expires_at is None or expires_at > event.created_at:
+                return
+        res = qr.generate_for_booking(event.booking_id, days_valid=int(event.payload.get("days_valid", 7)),
+                                      show=False)
+        if not res.get("success"):
+            raise RuntimeError(res.get("message", "QR generation failed"))
+
+    bus.subscribe(BOOKING_APPROVED, prepare_payment)
+    bus.subscribe(BOOKING_APPROVED, issue_qr)
+    return bus
+
+
+def build_dispatcher(db: DatabaseConnection | None = None, workers: int = 4) -> OutboxDispatcher:
+    db = db or DatabaseConnection(quiet=True)
+    return OutboxDispatcher(register_default_handlers(EventBus(), db), db, workers=workers)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """python -m services.event_handlers [once|serve] : run the outbox dispatcher as its own worker."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cmd = argv[0] if argv else "serve"
+    dispatcher = build_dispatcher()
+    if cmd == "once":
+        res = dispatcher.dispatch_once()
+        print(("✅ " if res.get("success") else "❌ ") + str(res))
+        return 0 if res.get("success") else 1
+    if cmd == "serve":
+        dispatcher.start()
+        print("Outbox dispatcher running (Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(30)
+                for name, m in dispatcher.metrics().items():
+                    print(f"  {name}: {m}")
+        except KeyboardInterrupt:
+            dispatcher.stop()
+            return 0
+    print("Usage: python -m services.event_handlers [once|serve]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+# services/events.py
+"""
+Booking lifecycle events: transactional outbox + in-process event bus.
+
+Write side: the code that changes state calls record_event(cur, ...) with its
+own cursor, inside its own transaction, so an event is stored if and only if
+the change commits (migration 0005, table outbox_events).
+
+Read side: OutboxDispatcher claims due events, runs the handlers subscribed on
+an EventBus on a small worker pool, and marks them done. Delivery is at least
+once: a claim is a lease (available_at pushed LEASE_SECONDS ahead), so events
+of a crashed worker are picked up again, and failed events are retried with
+backoff until MAX_ATTEMPTS. Handlers must therefore be idempotent.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from typing import NamedTuple
+
+from config.database import DatabaseConnection
+
+BOOKING_CREATED = "BookingCreated"
+BOOKING_APPROVED = "BookingApproved"
+BOOKING_REJECTED = "BookingRejected"
+BOOKING_PICKED_UP = "BookingPickedUp"
+BOOKING_RETURNED = "BookingReturned"
+PAYMENT_MARKED_PAID = "PaymentMarkedPaid"
+
+EVENT_TYPES = (BOOKING_CREATED, BOOKING_APPROVED, BOOKING_REJECTED,
+               BOOKING_PICKED_UP, BOOKING_RETURNED, PAYMENT_MARKED_PAID)
+
+
+def record_event(cur, event_type: str, booking_id: int, payload: dict | None = None):
+    """Append an event to the outbox on the caller's cursor (commits with the caller's transaction)."""
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type: {event_type}")
+    cur.execute(
+        "INSERT INTO outbox_events (event_type, aggregate_id, payload) VALUES (%s, %s, %s)",
+        (event_type, booking_id, json.dumps(payload or {}, default=str)),
+    )
+
+
+class Event(NamedTuple):
+    event_id: int
+    event_type: str
+    booking_id: int
+    payload: dict
+    created_at: datetime
+    attempts: int
+
+
+class EventBus:
+    def __init__(self):
+        self._handlers: dict[str, list[tuple[str, object]]] = {}
+
+    def subscribe(self, event_type: str, handler, name: str | None = None):
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        self._handlers.setdefault(event_type, []).append((name or handler.__name__, handler))
+        return handler
+
+    def handlers_for(self, event_type: str) -> list[tuple[str, object]]:
+        return self._handlers.get(event_type, [])
+
+
+class _HandlerStats:
+    __slots__ = ("delivered", "failed", "last_lag_ms", "max_lag_ms", "total_lag_ms", "total_run_ms")
+
+    def __init__(self):
+        self.delivered = self.failed = 0
+        self.last_lag_ms = self.max_lag_ms = 0.0
+        self.total_lag_ms = self.total_run_ms = 0.0
+
+    def as_dict(self) -> dict:
+        n = self.delivered or 1
+        return {
+            "delivered": self.delivered, "failed": self.failed,
+            "last_lag_ms": round(self.last_lag_ms, 1), "max_lag_ms": round(self.max_lag_ms, 1),
+            "avg_lag_ms": round(self.total_lag_ms / n, 1), "avg_run_ms": round(self.total_run_ms / n, 1),
+        }
+
+
+class OutboxDispatcher:
+    BATCH_SIZE = 100
+    LEASE_SECONDS = 60
+    MAX_ATTEMPTS = 8
+    MAX_BACKOFF_SECONDS = 300
+    MAX_IDLE_SECONDS = 5.0
+
+    def __init__(self, bus: EventBus, db: DatabaseConnection | None = None, workers: int = 4,
+                 batch_size: int = BATCH_SIZE):
+        self.bus = bus
+        self.db = db or DatabaseConnection()
+        self.workers = workers
+        self.batch_size = batch_size
+        self._stats: dict[str, _HandlerStats] = {}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------- claiming / completing ----------------
+    def claim(self, cur, conn) -> list[Event]:
+        """Lease up to batch_size due events (SKIP LOCKED lets several dispatchers share the table)."""
+        conn.start_transaction()
+        try:
+            cur.execute(
+                """
+                SELECT event_id, event_type, aggregate_id, payload, created_at, attempts
+                FROM outbox_events
+                WHERE status = 'pending' AND available_at <= NOW(3)
+                ORDER BY event_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (self.batch_size,),
+            )
+            rows = cur.fetchall()
+            if rows:
+                cur.execute(
+                    f"""
+                    UPDATE outbox_events
+                    SET attempts = attempts + 1, available_at = NOW(3) + INTERVAL %s SECOND
+                    WHERE event_id IN ({", ".join(["%s"] * len(rows))})
+                    """,
+                    (self.LEASE_SECONDS, *[r[0] for r in rows]),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return [Event(eid, etype, agg, json.loads(payload) if isinstance(payload, (str, bytes)) else payload,
+                      created_at, attempts + 1)
+                for eid, etype, agg, payload, created_at, attempts in rows]
+
+    def _complete(self, cur, done: list[int], failed: list[tuple[Event, str]]):
+        if done:
+            cur.execute(
+                f"UPDATE outbox_events SET status = 'done', delivered_at = NOW(3), last_error = NULL "
+                f"WHERE event_id IN ({', '.join(['%s'] * len(done))})",
+                done,
+            )
+        for event, error in failed:
+            backoff = min(2 ** event.attempts, self.MAX_BACKOFF_SECONDS)
+            cur.execute(
+                """
+                UPDATE outbox_events
+                SET status = %s, last_error = %s, available_at = NOW(3) + INTERVAL %s SECOND
+                WHERE event_id = %s
+                """,
+                ("failed" if event.attempts >= self.MAX_ATTEMPTS else "pending", error[:500], backoff,
+                 event.event_id),
+            )
+
+    # ---------------- delivery ----------------
+    def _stat(self, handler_name: str) -> _HandlerStats:
+        """Caller holds _stats_lock."""
+        return self._stats.setdefault(handler_name, _HandlerStats())
+
+    def deliver(self, event: Event) -> str | None:
+        """Run every handler for the event; returns an error message, or None if all succeeded."""
+        errors = []
+        for name, handler in self.bus.handlers_for(event.event_type):
+            started = time.perf_counter()
+            try:
+                handler(event)
+            except Exception as e:
+                with self._stats_lock:
+                    self._stat(name).failed += 1
+                errors.append(f"{name}: {e}")
+                continue
+            run_ms = (time.perf_counter() - started) * 1000
+            lag_ms = (datetime.now() - event.created_at).total_seconds() * 1000
+            with self._stats_lock:
+                st = self._stat(name)
+                st.delivered += 1
+                st.last_lag_ms = lag_ms
+                st.max_lag_ms = max(st.max_lag_ms, lag_ms)
+                st.total_lag_ms += lag_ms
+                st.total_run_ms += run_ms
+        return "; ".join(errors) or None
+
+    def dispatch_once(self, pool: ThreadPoolExecutor | None = None) -> dict:
+        """Claim one batch, deliver it on the worker pool, record the outcome."""
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                events = self.claim(cur, conn)
+                if not events:
+                    return {"success": True, "claimed": 0, "delivered": 0, "failed": 0}
+                # events of one booking run in order; different bookings run in parallel
+                by_booking: dict[int, list[Event]] = {}
+                for e in events:
+                    by_booking.setdefault(e.booking_id, []).append(e)
+                run_group = lambda group: [self.deliver(e) for e in group]
+                groups = list(by_booking.values())
+                results = map(run_group, groups) if pool is None else pool.map(run_group, groups)
+                errors = {e.event_id: err for group, errs in zip(groups, results) for e, err in zip(group, errs)}
+                outcomes = [errors[e.event_id] for e in events]
+                done = [e.event_id for e, err in zip(events, outcomes) if err is None]
+                failed = [(e, err) for e, err in zip(events, outcomes) if err is not None]
+                self._complete(cur, done, failed)
+                conn.commit()
+        return {"success": True, "claimed": len(events), "delivered": len(done), "failed": len(failed)}
+
+    def drain(self, max_batches: int = 1000) -> dict:
+        """
+        Deliver everything due now, batch after batch, until a claim comes back
+        empty; for short-lived processes before they exit. Failed events go back
+        with a backoff, so they are not retried here.
+        """
+        totals = {"success": True, "claimed": 0, "delivered": 0, "failed": 0}
+        for _ in range(max_batches):
+            res = self.dispatch_once()
+            if not res.get("success"):
+                return {**totals, **res}
+            for k in ("claimed", "delivered", "failed"):
+                totals[k] += res[k]
+            if not res["claimed"]:
+                break
+        return totals
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            return {name: st.as_dict() for name, st in self._stats.items()}
+
+    # ---------------- background loop ----------------
+    def _loop(self, poll_interval: float):
+        idle = poll_interval
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbox") as pool:
+            while not self._stop.is_set():
+                try:
+                    res = self.dispatch_once(pool)
+                except Exception:
+                    res = {"success": False}
+                if not res.get("success"):
+                    idle = min(idle * 2, 30.0)        # DB down: back off
+                elif res.get("claimed"):
+                    idle = 0                          # more may be waiting
+                else:                                 # nothing due: poll less often while idle
+                    idle = min(max(idle * 2, poll_interval), self.MAX_IDLE_SECONDS)
+                self._stop.wait(idle)
+
+    def start(self, poll_interval: float = 0.5):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(poll_interval,),
+                                        name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
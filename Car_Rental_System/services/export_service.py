@@ -0,0 +1,211 @@
+# services/export_service.py
+"""
+Bookings export for BI: bookings joined with their customer, car and payment,
+written as NDJSON or CSV, optionally gzip-compressed.
+
+    python -m services.export_service OUT [--format ndjson|csv] [--gzip]
+                                          [--state FILE] [--chunk N] [--full]
+
+Rows are read in keyset chunks ordered by (updated_at, booking_id) (migration
+0009), so memory is one chunk whatever the table size. After each chunk the
+output is flushed and fsynced, then the watermark (last updated_at/booking_id)
+and the output file's size are saved to the state file (default OUT.state.json).
+
+The same state file serves two purposes:
+  - restart: an interrupted export is resumed by running the same command; the
+    output is first truncated to the size saved with the watermark, so no row
+    is written twice or lost;
+  - incremental: a later run exports only rows changed since the watermark,
+    into OUT (appended) or into a new OUT with --state pointing at the old state.
+
+Rows changed within the last SETTLE_SECONDS are left for the next run: a
+transaction that commits late (or a lagging replica) could otherwise surface a
+row below a watermark that has already moved past it.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from config.database import DatabaseConnection
+
+EXPORT_COLUMNS = (
+    "booking_id", "user_id", "user_name", "user_email", "car_id", "brand", "model",
+    "start_date", "end_date", "status", "total_cost", "created_at", "updated_at",
+    "payment_id", "amount", "payment_method", "payment_status", "payment_date",
+)
+
+EXPORT_SQL = """
+    SELECT b.booking_id, b.user_id, u.name, u.email, b.car_id, c.brand, c.model,
+           b.start_date, b.end_date, b.status, b.total_cost, b.created_at, b.updated_at,
+           p.payment_id, p.amount, p.payment_method, p.payment_status, p.payment_date
+    FROM bookings b
+    JOIN users u ON u.user_id = b.user_id
+    JOIN cars  c ON c.car_id = b.car_id
+    LEFT JOIN payments p ON p.booking_id = b.booking_id
+    WHERE (b.updated_at > %s OR (b.updated_at = %s AND b.booking_id > %s))
+      AND b.updated_at <= %s
+    ORDER BY b.updated_at, b.booking_id
+    LIMIT %s
+"""
+
+_UPDATED_AT = EXPORT_COLUMNS.index("updated_at")
+
+CHUNK_SIZE = 5000
+SETTLE_SECONDS = 10
+EPOCH = datetime(1970, 1, 1)
+FORMATS = ("ndjson", "csv")
+
+# type -> text; anything else json/csv already handle (str, int, None)
+_CONVERT = {
+    Decimal: str,
+    date: date.isoformat,
+    datetime: lambda v: v.isoformat(sep=" ", timespec="milliseconds" if v.microsecond else "seconds"),
+}
+
+
+def _convert(row) -> list:
+    out = list(row)
+    for i, v in enumerate(out):
+        conv = _CONVERT.get(type(v))
+        if conv is not None:
+            out[i] = conv(v)
+    return out
+
+
+def encode_ndjson(rows) -> str:
+    dumps = json.dumps
+    return "".join(dumps(dict(zip(EXPORT_COLUMNS, _convert(r))), ensure_ascii=False) + "\n" for r in rows)
+
+
+def encode_csv(rows, header: bool = False) -> str:
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    if header:
+        w.writerow(EXPORT_COLUMNS)
+    w.writerows(_convert(r) for r in rows)
+    return buf.getvalue()
+
+
+class ExportState:
+    """Watermark + output size, saved atomically (write temp, rename)."""
+    def __init__(self, path: str):
+        self.path = path
+        self.updated_at = EPOCH
+        self.booking_id = 0
+        self.output = None
+        self.offset = None        # size of `output` matching the watermark
+        self.rows = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.updated_at = datetime.fromisoformat(data["updated_at"])
+            self.booking_id = data["booking_id"]
+            self.output = data.get("output")
+            self.offset = data.get("offset")
+            self.rows = data.get("rows", 0)
+
+    def save(self):
+        data = {"updated_at": self.updated_at.isoformat(), "booking_id": self.booking_id,
+                "output": self.output, "offset": self.offset, "rows": self.rows}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+
+
+class ExportService:
+    def __init__(self, db: DatabaseConnection | None = None, chunk_size: int = CHUNK_SIZE,
+                 settle_seconds: float = SETTLE_SECONDS):
+        self.db = db or DatabaseConnection()
+        self.chunk_size = chunk_size
+        self.settle_seconds = settle_seconds
+
+    def export_bookings(self, output: str, fmt: str = "ndjson", compress: bool = False,
+                        state_path: str | None = None, full: bool = False):
+        if fmt not in FORMATS:
+            return {"success": False, "message": f"Unknown format '{fmt}' (use {'/'.join(FORMATS)})"}
+        state_path = state_path or output + ".state.json"
+        if full and os.path.exists(state_path):
+            os.remove(state_path)
+        state = ExportState(state_path)
+
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute("SELECT NOW(3)")
+                cutoff = cur.fetchone()[0] - timedelta(seconds=self.settle_seconds)
+
+                with open(output, "ab") as raw:
+                    if full:
+                        raw.truncate(0)
+                    elif state.output == output and state.offset is not None and raw.tell() > state.offset:
+                        # drop whatever an interrupted run wrote after its last saved chunk
+                        raw.truncate(state.offset)
+                    raw.seek(0, os.SEEK_END)
+                    state.output = output
+                    header = fmt == "csv" and raw.tell() == 0
+                    exported = 0
+                    while True:
+                        cur.execute(EXPORT_SQL, (state.updated_at, state.updated_at, state.booking_id,
+                                                 cutoff, self.chunk_size))
+                        rows = cur.fetchall()
+                        if not rows:
+                            break
+                        text = encode_csv(rows, header) if fmt == "csv" else encode_ndjson(rows)
+                        header = False
+                        self._write(raw, text.encode("utf-8"), compress)
+                        last = rows[-1]
+                        state.updated_at, state.booking_id = last[_UPDATED_AT], last[0]
+                        state.offset = raw.tell()
+                        state.rows += len(rows)
+                        state.save()
+                        exported += len(rows)
+                        if len(rows) < self.chunk_size:
+                            break
+                    if not exported:
+                        state.offset = raw.tell()
+                        state.save()
+
+        return {"success": True, "message": f"Exported {exported} rows to {output}",
+                "rows": exported, "watermark": state.updated_at, "state": state_path}
+
+    @staticmethod
+    def _write(raw, data: bytes, compress: bool):
+        if compress:
+            # one complete gzip member per chunk: the file is valid gzip after every chunk
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                gz.write(data)
+        else:
+            raw.write(data)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m services.export_service",
+                                     description="Export bookings (with customer, car, payment) for BI.")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--state", help="watermark file (default: OUTPUT.state.json)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--full", action="store_true", help="ignore the saved watermark and start over")
+    opts = parser.parse_args(argv)
+    res = ExportService(chunk_size=opts.chunk).export_bookings(
+        opts.output, fmt=opts.format, compress=opts.gzip, state_path=opts.state, full=opts.full)
+    print(("✅ " if res.get("success") else "❌ ") + res["message"])
+    return 0 if res.get("success") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# services/housekeeping_service.py
+"""
+Periodic clean-up jobs.
+
+Usage (from the Car_Rental_System folder):
+    python -m services.housekeeping_service once     # run every job once and print a report
+    python -m services.housekeeping_service serve    # keep running on the job intervals
+
+Every DB sweep works in chunks (UPDATE/DELETE ... LIMIT chunk_size, each chunk
+its own autocommit statement) so no sweep holds row locks for long, and runs
+under a MySQL GET_LOCK named after the job so two workers never run the same
+job at the same time.
+"""
+import sys
+import time
+from contextlib import closing, contextmanager
+
+from config.database import DatabaseConnection
+from services.archive_service import ArchiveService
+from services.audit_service import AuditService
+from services.booking_service import BookingService
+from services.booking_summaries import refresh_summaries
+from services.qrcode_service import QRService
+from services.reservations import release_days
+from services.userservice import UserService
+from utils.scheduler import Scheduler
+from utils.sessions import SessionManager
+
+
+class HousekeepingService:
+    CHUNK_SIZE = 500
+    PENDING_MAX_AGE_HOURS = 48
+    OUTBOX_KEEP_DAYS = 7
+
+    # job name -> interval in seconds
+    INTERVALS = {
+        "cancel_stale_pending": 15 * 60,
+        "close_no_shows": 60 * 60,
+        "purge_expired_qr": 60 * 60,
+        "purge_sessions": 5 * 60,
+        "purge_token_cache": 5 * 60,
+        "purge_holds": 60,
+        "purge_delivered_events": 60 * 60,
+        "purge_idempotency_keys": 60 * 60,
+        "purge_login_buckets": 5 * 60,
+        "purge_login_throttle": 60 * 60,
+        "archive_bookings": 24 * 60 * 60,
+    }
+    # per-process state: every worker purges its own, no cross-worker lock
+    LOCAL_JOBS = {"purge_sessions", "purge_token_cache", "purge_holds", "purge_login_buckets"}
+    THROTTLE_IDLE_HOURS = 24
+
+    def __init__(self, db: DatabaseConnection | None = None, chunk_size: int = CHUNK_SIZE,
+                 pause_s: float = 0.0):
+        self.db = db or DatabaseConnection()
+        self.chunk_size = chunk_size
+        self.pause_s = pause_s   # optional breather between chunks
+
+    # ---------------- jobs (each returns rows touched) ----------------
+    def cancel_stale_pending(self, max_age_hours: int = PENDING_MAX_AGE_HOURS) -> int:
+        """Pending bookings nobody approved or rejected within max_age_hours -> cancelled."""
+        return self._cancel_chunks(
+            "pending", "expire",
+            "created_at < NOW() - INTERVAL %s HOUR",
+            (max_age_hours,),
+        )
+
+    def close_no_shows(self) -> int:
+        """Approved bookings whose end_date has passed without a pickup -> cancelled."""
+        # start_date < CURDATE() is implied by end_date, but lets (status, start_date) bound the scan
+        return self._cancel_chunks("approved", "no_show", "start_date < CURDATE() AND end_date < CURDATE()")
+
+    def purge_expired_qr(self) -> int:
+        """Delete expired QR tokens, except for active rentals (returns do not check expiry)."""
+        total = 0
+        with self._cursor() as (_conn, cur):
+            while True:
+                # MySQL cannot DELETE ... LIMIT with a join, so pick ids first
+                cur.execute(
+                    """
+                    SELECT q.qr_id, q.booking_id
+                    FROM booking_qr_codes q
+                    JOIN bookings b ON b.booking_id = q.booking_id
+                    WHERE q.expires_at < NOW() AND b.status <> 'active'
+                    LIMIT %s
+                    """,
+                    (self.chunk_size,),
+                )
+                rows = cur.fetchall()
+                ids = [row[0] for row in rows]
+                if not ids:
+                    break
+                cur.execute(
+                    f"DELETE FROM booking_qr_codes WHERE qr_id IN ({', '.join(['%s'] * len(ids))})", ids
+                )
+                deleted = cur.rowcount
+                refresh_summaries(cur, *(row[1] for row in rows))
+                total += deleted
+                if len(ids) < self.chunk_size:
+                    break
+                self._pause()
+        return total
+
+    def purge_delivered_events(self, keep_days: int = OUTBOX_KEEP_DAYS) -> int:
+        """Delete outbox events delivered more than keep_days ago (failed ones are kept for inspection)."""
+        return self._chunked(
+            "DELETE FROM outbox_events WHERE status = 'done' AND delivered_at < NOW() - INTERVAL %s DAY",
+            (keep_days,),
+        )
+
+    def archive_bookings(self) -> int:
+        """Move finished bookings that ended long ago (and their payment/QR rows) to the archive tables."""
+        return ArchiveService(self.db, self.chunk_size, self.pause_s).archive_bookings()
+
+    def purge_idempotency_keys(self) -> int:
+        """Delete idempotency keys past their expires_at (retries after that run again)."""
+        return self._chunked("DELETE FROM idempotency_keys WHERE expires_at < NOW()")
+
+    def purge_login_throttle(self, idle_hours: int = THROTTLE_IDLE_HOURS) -> int:
+        """Delete shared login buckets idle long enough to be full again (LOGIN_THROTTLE_BACKEND=db)."""
+        return self._chunked("DELETE FROM login_throttle WHERE updated_at < NOW() - INTERVAL %s HOUR",
+                             (idle_hours,))
+
+    @staticmethod
+    def purge_sessions() -> int:
+        return SessionManager.purge_expired()
+
+    @staticmethod
+    def purge_token_cache() -> int:
+        return QRService._token_cache.purge_expired()
+
+    @staticmethod
+    def purge_holds() -> int:
+        return BookingService.holds.purge_expired()
+
+    @staticmethod
+    def purge_login_buckets() -> int:
+        return UserService.throttle.purge_expired()
+
+    # ---------------- scheduling ----------------
+    @contextmanager
+    def db_lock(self, name: str):
+        """Cross-worker guard: yields True if this worker holds GET_LOCK('car_rental:<name>')."""
+        conn = self.db.get_connection()
+        if not conn or not conn.is_connected():
+            yield False
+            return
+        lock_name = f"car_rental:{name}"
+        acquired = False
+        try:
+            with closing(conn.cursor()) as cur:
+                cur.execute("SELECT GET_LOCK(%s, 0)", (lock_name,))
+                acquired = (cur.fetchone() or (0,))[0] == 1
+            yield acquired
+        finally:
+            if acquired:
+                with closing(conn.cursor()) as cur:
+                    cur.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+                    cur.fetchall()
+            conn.close()
+
+    def build_scheduler(self, guard=None) -> Scheduler:
+        sched = Scheduler(guard=self.db_lock if guard is None else guard)
+        for name, interval in self.INTERVALS.items():
+            sched.add(name, interval, getattr(self, name), guarded=name not in self.LOCAL_JOBS)
+        return sched
+
+    def run_once(self):
+        sched = self.build_scheduler()
+        results = sched.run_all()
+        ok = all(r["ran"] and not r.get("error") for r in results)
+        return {"success": ok, "results": results, "report": sched.report()}
+
+    # ---------------- helpers ----------------
+    @contextmanager
+    def _cursor(self):
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                raise ConnectionError("DB connection failed")
+            with closing(conn.cursor()) as cur:
+                yield conn, cur
+
+    def _pause(self):
+        if self.pause_s:
+            time.sleep(self.pause_s)
+
+    def _cancel_chunks(self, from_status: str, action: str, condition: str, params: tuple = ()) -> int:
+        """
+        Cancel bookings in `from_status` matching `condition`, one short transaction
+        per chunk (lock ids, update them, free their day slots), recording each transition in the audit trail.
+        """
+        total = 0
+        with self._cursor() as (conn, cur):
+            while True:
+                conn.start_transaction()
+                try:
+                    cur.execute(
+                        f"""
+                        SELECT booking_id FROM bookings
+                        WHERE status = %s AND {condition}
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                        """,
+                        (from_status, *params, self.chunk_size),
+                    )
+                    ids = [row[0] for row in cur.fetchall()]
+                    if ids:
+                        cur.execute(
+                            f"UPDATE bookings SET status = 'cancelled' "
+                            f"WHERE booking_id IN ({', '.join(['%s'] * len(ids))})",
+                            ids,
+                        )
+                        release_days(cur, *ids)
+                        refresh_summaries(cur, *ids)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                for booking_id in ids:
+                    AuditService.record(booking_id, from_status, "cancelled", action, note="housekeeping")
+                total += len(ids)
+                if len(ids) < self.chunk_size:
+                    break
+                self._pause()
+        return total
+
+    def _chunked(self, sql: str, params: tuple = ()) -> int:
+        """Repeat `sql LIMIT chunk_size` until a chunk touches fewer rows."""
+        total = 0
+        with self._cursor() as (_conn, cur):
+            while True:
+                cur.execute(sql.rstrip() + " LIMIT %s", (*params, self.chunk_size))
+                total += cur.rowcount
+                if cur.rowcount < self.chunk_size:
+                    break
+                self._pause()
+        return total
+
+
+def format_result(r: dict) -> str:
+    if not r["ran"]:
+        return f"⏭  {r['job']}: skipped ({r['reason']})"
+    if r.get("error"):
+        return f"❌ {r['job']}: {r['error']} ({r['duration_ms']} ms)"
+    return f"✅ {r['job']}: {r['rows']} row(s) in {r['duration_ms']} ms"
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cmd = argv[0] if argv else "once"
+    service = HousekeepingService()
+    if cmd == "once":
+        res = service.run_once()
+        for r in res["results"]:
+            print(format_result(r))
+        return 0 if res["success"] else 1
+    if cmd == "serve":
+        sched = service.build_scheduler()
+        print("Housekeeping running (Ctrl+C to stop)...")
+        try:
+            while True:
+                for r in sched.run_pending():
+                    print(format_result(r))
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return 0
+    print("Usage: python -m services.housekeeping_service [once|serve]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
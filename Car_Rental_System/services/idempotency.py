@@ -0,0 +1,113 @@
+# services/idempotency.py
+"""
+Idempotency keys for writes a client may retry (migration 0010, table
+idempotency_keys): create_booking, mark_paid and approve.
+
+A caller that may retry after a timeout sends the same idempotency_key on every
+attempt. The first attempt claims (scope, key) at the start of its transaction
+and stores its result just before the commit, so the key and the write commit or
+roll back together. Any later attempt gets the stored result back, marked
+"replayed", and nothing runs again. If two attempts race, the second one waits on
+the first one's key row, gets a duplicate-key error once it commits, and replays.
+
+Results are kept for IDEMPOTENCY_TTL_SECONDS. Recent ones are also held in a
+per-process TTLCache, so a quick retry needs no query. Only successful results
+are stored. A failed attempt changed nothing, so retrying it simply runs again.
+A key reused with different arguments is refused.
+"""
+import hashlib
+import json
+from contextlib import closing
+
+from config.database import DatabaseConnection
+from services.reservations import DUPLICATE_KEY
+from utils.ttl_cache import TTLCache
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+CACHE_TTL_SECONDS = 10 * 60
+KEY_MISMATCH = "Idempotency key was already used for a different request"
+
+
+class KeyReplayed(Exception):
+    """Another attempt with this key has already committed."""
+
+
+def fingerprint(*args) -> str:
+    """Stable hash of a request's arguments (dates, Decimals etc. by str())."""
+    return hashlib.sha256(json.dumps(args, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyKeys:
+    # (scope, key) -> (fingerprint, result), shared by every instance in this process
+    cache = TTLCache(maxsize=20_000, ttl=CACHE_TTL_SECONDS)
+
+    def __init__(self, db: DatabaseConnection | None = None, ttl: int = IDEMPOTENCY_TTL_SECONDS):
+        self.db = db or DatabaseConnection()
+        self.ttl = ttl
+
+    def replay(self, scope: str, key: str, request: str):
+        """The stored result for this key (marked replayed), a mismatch error, or None."""
+        entry = self.cache.get((scope, key))
+        if entry is None:
+            entry = self._load(scope, key)
+            if entry is not None:
+                self.cache.set((scope, key), entry)
+        if entry is None:
+            return None
+        stored_request, result = entry
+        if stored_request != request:
+            return {"success": False, "message": KEY_MISMATCH}
+        return dict(result, replayed=True)
+
+    def _load(self, scope: str, key: str):
+        # primary, not a replica: a retry must see the attempt that just committed
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return None
+            with closing(conn.cursor()) as cur:
+                cur.execute(
+                    """
+                    SELECT request_hash, response FROM idempotency_keys
+                    WHERE scope=%s AND idem_key=%s AND response IS NOT NULL AND expires_at > NOW()
+                    """,
+                    (scope, key),
+                )
+                row = cur.fetchone()
+        if not row:
+            return None
+        response = row[1]
+        return row[0], json.loads(response) if isinstance(response, (str, bytes)) else response
+
+    def claim(self, cur, scope: str, key: str, request: str):
+        """Take the key inside the caller's transaction; raises KeyReplayed if it is taken."""
+        cur.execute(
+            "DELETE FROM idempotency_keys WHERE scope=%s AND idem_key=%s AND expires_at <= NOW()",
+            (scope, key),
+        )
+        try:
+            cur.execute(
+                """
+                INSERT INTO idempotency_keys (scope, idem_key, request_hash, expires_at)
+                VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+                """,
+                (scope, key, request, self.ttl),
+            )
+        except Exception as e:
+            if getattr(e, "errno", None) == DUPLICATE_KEY:
+                raise KeyReplayed(key) from e
+            raise
+
+    def complete(self, cur, scope: str, key: str, result: dict):
+        """Store the result on the claimed key (same transaction); cache it after the commit."""
+        cur.execute(
+            "UPDATE idempotency_keys SET response=%s WHERE scope=%s AND idem_key=%s",
+            (json.dumps(result, default=str), scope, key),
+        )
+
+    def remember(self, scope: str, key: str, request: str, result: dict):
+        self.cache.set((scope, key), (request, json.loads(json.dumps(result, default=str))))
+
+    def replayed(self, scope: str, key: str, request: str):
+        """After KeyReplayed (and the caller's rollback): the committed attempt's result."""
+        return self.replay(scope, key, request) or {
+            "success": False, "message": "A request with this idempotency key is still in progress"}
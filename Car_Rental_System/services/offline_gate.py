@@ -0,0 +1,200 @@
+# services/offline_gate.py
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from services.qrcode_service import QRService
+from utils.journal import Journal
+from utils.scheduler import Scheduler
+from utils.qr_tokens import is_signed
+
+
+class OfflineGate:
+    """
+    Local-first pickup/return gate.
+
+    Scans are validated against a snapshot of today's approved/active bookings
+    (QRService.gate_snapshot, saved to disk so a restarted kiosk still has it),
+    appended to a durable journal, and acknowledged immediately, so the gate
+    keeps working while the database is slow or unreachable.
+
+    sync() replays pending scans through QRService.scan_batch in batches. Each
+    replayed scan is classified as:
+      - applied:    the conditional UPDATE matched
+      - duplicate:  the booking is already in (or past) the target state,
+                    e.g. the scan was also made online or replayed before a crash
+      - conflict:   the database disagrees (cancelled, token refreshed, expired...)
+    and a reconciliation report is returned and appended to reconciliation.jsonl.
+    """
+    DEFAULT_DIR = "gate"
+    BATCH_SIZE = 200
+    REFRESH_SECONDS = 15 * 60
+
+    # status that means a scan of this kind has already happened
+    _DONE_STATUSES = {"pickup": {"active", "completed"}, "return": {"completed"}}
+
+    def __init__(self, qr_service: QRService | None = None, directory: str = DEFAULT_DIR,
+                 batch_size: int = BATCH_SIZE):
+        self.qr = qr_service or QRService()
+        self.directory = directory
+        self.batch_size = batch_size
+        self.journal = Journal(os.path.join(directory, "journal.jsonl"))
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.report_path = os.path.join(directory, "reconciliation.jsonl")
+        self._snapshot: dict[str, dict] = {}
+        self.snapshot_taken_at = None
+        self._lock = threading.Lock()
+        self._load_snapshot()
+
+    # ---------------- snapshot ----------------
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.snapshot_taken_at = data.get("taken_at")
+        self._snapshot = {r["qr_token"]: r for r in data.get("rows", [])}
+        self._replay_pending_locally()
+
+    def _replay_pending_locally(self):
+        """Scans not yet synced must still count against the snapshot."""
+        for rec in self.journal.pending():
+            entry = self._snapshot.get(rec["token"])
+            if entry is not None:
+                entry["status"] = QRService._SCAN_RULES[rec["kind"]]["to"]
+
+    def refresh_snapshot(self, day=None, qr_service: QRService | None = None):
+        """
+        Take a new snapshot while the database is up, and warm QRService's token
+        cache with the same rows. `qr_service` lets a background refresher use its
+        own connection.
+        """
+        qr = qr_service or self.qr
+        res = qr.gate_snapshot(day)
+        if not res.get("success"):
+            return res
+        qr.prefetch_tokens(rows=res["rows"])
+        rows = [{**r, "expires_at": r["expires_at"].isoformat() if r["expires_at"] else None}
+                for r in res["rows"]]
+        taken_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"taken_at": taken_at, "rows": rows}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+            self._snapshot = {r["qr_token"]: r for r in rows}
+            self.snapshot_taken_at = taken_at
+            self._replay_pending_locally()
+        return {"success": True, "message": f"Gate snapshot refreshed ({len(rows)} bookings)", "count": len(rows)}
+
+    def start_refresher(self, qr_service: QRService | None = None, interval: float | None = None) -> Scheduler:
+        """
+        Refresh the snapshot now and then every GATE_SNAPSHOT_SECONDS (default 15 min)
+        on a background thread, so a kiosk has a recent one before the database
+        drops. A failed refresh keeps the previous snapshot. Returns the scheduler (stop() it).
+        """
+        interval = interval or float(os.getenv("GATE_SNAPSHOT_SECONDS", self.REFRESH_SECONDS))
+        sched = Scheduler()
+        sched.add("refresh_gate_snapshot", interval,
+                  lambda: self.refresh_snapshot(qr_service=qr_service).get("count"))
+        sched.start(tick=5.0)
+        return sched
+
+    # ---------------- scanning ----------------
+    def scan(self, kind: str, token: str, admin_user_id: int):
+        """Validate locally and journal the scan; no database work."""
+        rule = QRService._SCAN_RULES.get(kind)
+        if rule is None:
+            return {"success": False, "message": f"Unknown scan kind '{kind}'"}
+        now = datetime.now().replace(microsecond=0)
+        entry = self._snapshot.get(token)
+
+        if entry is not None:
+            booking_id, status = entry["booking_id"], entry["status"]
+            expires_at = datetime.fromisoformat(entry["expires_at"]) if entry.get("expires_at") else None
+        elif is_signed(token) and self.qr.signer is not None:
+            # not in the snapshot (e.g. approved after it was taken): trust the signature,
+            # the status is checked on replay
+            check = self.qr.signer.verify(token, now=now)
+            if check.reason == "invalid":
+                return {"success": False, "message": "Invalid QR token"}
+            booking_id, status, expires_at = check.booking_id, None, check.expires_at
+        else:
+            return {"success": False, "message": "Invalid QR token"}
+
+        if rule["check_expiry"] and expires_at and now > expires_at:
+            return {"success": False, "message": "QR token has expired"}
+        if status is not None and status != rule["from"]:
+            return {"success": False, "message": f"Cannot {kind}: status is '{status}'"}
+
+        self.journal.append({
+            "id": uuid.uuid4().hex, "kind": kind, "token": token, "booking_id": booking_id,
+            "admin_user_id": admin_user_id, "scanned_at": now.isoformat(),
+        })
+        if entry is not None:
+            entry["status"] = rule["to"]
+        return {"success": True, "message": f"Booking {booking_id} {rule['done']} (offline, pending sync)",
+                "booking_id": booking_id, "offline": True}
+
+    def status(self):
+        return {"pending": len(self.journal.pending()), "snapshot_size": len(self._snapshot),
+                "snapshot_taken_at": self.snapshot_taken_at}
+
+    # ---------------- replay ----------------
+    def _batches(self, records):
+        """Consecutive runs with the same admin (scan_batch takes one admin id), at most batch_size long."""
+        batch = []
+        for rec in records:
+            if batch and (len(batch) == self.batch_size or rec["admin_user_id"] != batch[0]["admin_user_id"]):
+                yield batch
+                batch = []
+            batch.append(rec)
+        if batch:
+            yield batch
+
+    def sync(self):
+        pending = self.journal.pending()
+        report = {"started_at": datetime.now().isoformat(timespec="seconds"), "replayed": 0,
+                  "applied": 0, "duplicates": 0, "conflicts": [], "errors": []}
+
+        for batch in self._batches(pending):
+            scans = [(r["kind"], r["token"], datetime.fromisoformat(r["scanned_at"])) for r in batch]
+            try:
+                res = self.qr.scan_batch(scans, batch[0]["admin_user_id"])
+            except Exception as e:   # connection dropped mid-batch: keep the rest pending
+                report["errors"].append(str(e))
+                break
+            if not res.get("success"):
+                report["errors"].append(res.get("message", "replay failed"))
+                break
+            for rec, result in zip(batch, res["results"]):
+                if result.get("success"):
+                    report["applied"] += 1
+                elif result.get("status") in self._DONE_STATUSES[rec["kind"]]:
+                    report["duplicates"] += 1
+                else:
+                    report["conflicts"].append({
+                        "id": rec["id"], "kind": rec["kind"], "booking_id": rec["booking_id"],
+                        "scanned_at": rec["scanned_at"], "reason": result.get("message"),
+                    })
+            self.journal.ack(r["id"] for r in batch)
+            report["replayed"] += len(batch)
+
+        report["pending"] = len(pending) - report["replayed"]
+        report["success"] = not report["errors"]
+        if report["replayed"]:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report, default=str) + "\n")
+        if report["success"]:
+            self.journal.compact()
+            self.refresh_snapshot()
+        report["message"] = (f"Replayed {report['replayed']} scan(s): {report['applied']} applied, "
+                             f"{report['duplicates']} duplicate(s), {len(report['conflicts'])} conflict(s), "
+                             f"{report['pending']} still pending")
+        return report
@@ -2,44 +2,97 @@
 from contextlib import closing
 from decimal import Decimal
 from config.database import DatabaseConnection
+from services.booking_summaries import refresh_summaries
+from services.events import PAYMENT_MARKED_PAID, record_event
+from services.idempotency import IdempotencyKeys, KeyReplayed, fingerprint
+from utils.metrics import instrumented
+from utils.profiling import profiled
 
+PAYMENT_NOT_READY = "No payment for this booking (not approved, or not prepared yet; try again shortly)"
+
+
+def touch_booking(cur, booking_id: int):
+    """Bump bookings.updated_at so incremental exports pick up the payment change."""
+    cur.execute("UPDATE bookings SET updated_at = CURRENT_TIMESTAMP(3) WHERE booking_id=%s", (booking_id,))
+
+
+@instrumented
+@profiled
 class PaymentService:
     def __init__(self, db: DatabaseConnection|None = None):
         self.db = db or DatabaseConnection()
+        self.idempotency = IdempotencyKeys(self.db)
     
     def create_or_update_pending(self, booking_id: int, amount: Decimal, method: str = "cash"):
         """
-        Ensure a single pending payment exists for the booking with the given amount.
-        If a payment exists, update it; else insert a new one.
+        Ensure the booking's payment exists with the given amount, as one upsert.
+        A payment already marked paid is left alone, so a redelivered
+        BookingApproved cannot turn it back into pending.
         """
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
-                cur.execute("SELECT payment_id FROM payments WHERE booking_id=%s", (booking_id,))
-                row = cur.fetchone()
-                if row:
-                    cur.execute(
-                        "UPDATE payments SET amount=%s, payment_method=%s, payment_status='pending' WHERE payment_id=%s",
-                        (str(amount), method, row["payment_id"]),
-                    )
-                else:
-                    cur.execute(
-                        "INSERT INTO payments (booking_id, amount, payment_method, payment_status) VALUES (%s, %s, %s, 'pending')",
-                        (booking_id, str(amount), method),
-                    )
+            with closing(conn.cursor()) as cur:
+                # assignments run left to right: payment_status must be the last one
+                cur.execute(
+                    """
+                    INSERT INTO payments (booking_id, amount, payment_method, payment_status)
+                    VALUES (%s, %s, %s, 'pending')
+                    ON DUPLICATE KEY UPDATE
+                        amount = IF(payment_status = 'paid', amount, VALUES(amount)),
+                        payment_method = IF(payment_status = 'paid', payment_method, VALUES(payment_method)),
+                        payment_status = IF(payment_status = 'paid', 'paid', 'pending')
+                    """,
+                    (booking_id, str(amount), method),
+                )
+                touch_booking(cur, booking_id)
+                refresh_summaries(cur, booking_id)
                 conn.commit()
                 return {"success": True, "message": "Pending payment ready"}
 
 
-    def mark_paid(self, booking_id: int, method: str = "cash", provider_txn_id: str | None = None):
+    def mark_paid(self, booking_id: int, method: str = "cash", provider_txn_id: str | None = None,
+                  idempotency_key: str | None = None):
+        """
+        Mark the booking's payment paid; a retried idempotency_key replays the first result.
+        A failure is not stored under the key: retrying it runs the update again.
+        """
+        request = fingerprint(booking_id, method, provider_txn_id)
+        if idempotency_key:
+            replay = self.idempotency.replay("mark_paid", idempotency_key, request)
+            if replay:
+                return replay
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
-                cur.execute(
-                    "UPDATE payments SET payment_status='paid', payment_method=%s, provider_txn_id=%s WHERE booking_id=%s",
-                    (method, provider_txn_id, booking_id),
-                )
-                conn.commit()
-                return {"success": True, "message": "Payment marked as PAID"}
+            with closing(conn.cursor()) as cur:
+                conn.start_transaction()
+                try:
+                    if idempotency_key:
+                        self.idempotency.claim(cur, "mark_paid", idempotency_key, request)
+                    cur.execute(
+                        "UPDATE payments SET payment_status='paid', payment_method=%s, provider_txn_id=%s WHERE booking_id=%s",
+                        (method, provider_txn_id, booking_id),
+                    )
+                    if cur.rowcount == 0:
+                        # the pending payment is created after approval, by the outbox dispatcher;
+                        # rolling back also drops the key's claim, so a retry with it can still succeed
+                        conn.rollback()
+                        return {"success": False, "message": PAYMENT_NOT_READY}
+                    touch_booking(cur, booking_id)
+                    refresh_summaries(cur, booking_id)
+                    record_event(cur, PAYMENT_MARKED_PAID, booking_id,
+                                 {"method": method, "provider_txn_id": provider_txn_id})
+                    result = {"success": True, "message": "Payment marked as PAID"}
+                    if idempotency_key:
+                        self.idempotency.complete(cur, "mark_paid", idempotency_key, result)
+                    conn.commit()
+                except KeyReplayed:
+                    conn.rollback()
+                    return self.idempotency.replayed("mark_paid", idempotency_key, request)
+                except Exception:
+                    conn.rollback()
+                    raise
+                if idempotency_key:
+                    self.idempotency.remember("mark_paid", idempotency_key, request, result)
+                return result
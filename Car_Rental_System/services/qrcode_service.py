@@ -3,26 +3,55 @@ from datetime import datetime, timedelta
 import secrets
 from contextlib import closing
 from config.database import DatabaseConnection
+from models.models import QRCode
 from utils.qrcode_utils import print_qr_ascii as make_qr
+from services.audit_service import AuditService
+from services.booking_summaries import refresh_summaries
+from services.events import BOOKING_PICKED_UP, BOOKING_RETURNED, record_event
+from services.reservations import release_days
+from utils.qr_tokens import is_signed, signer_from_env
+from utils.ttl_cache import TTLCache
+from utils.metrics import REGISTRY, instrumented
+from utils.profiling import profiled
+
+_UNSET = object()
+
+QR_RENDER_SECONDS = REGISTRY.histogram("qr_render_seconds", "QR PNG/ASCII rendering time")
 
 def _new_token(n: int = 32) -> str:
     return secrets.token_urlsafe(n)[:n]   # secure, URL-safe
 
+@instrumented
+@profiled
 class QRService:
-    def __init__(self, db: DatabaseConnection|None = None):
+    _env_signer = _UNSET   # QRTokenSigner from the environment, loaded on first use
+
+    def __init__(self, db: DatabaseConnection|None = None, signer=_UNSET):
         self.db = db or DatabaseConnection()
+        self._signer = signer
+
+    @property
+    def signer(self):
+        """Signer for new tokens, or None when QR_SIGNING_KEYS is not set (random legacy tokens)."""
+        if self._signer is _UNSET:
+            if QRService._env_signer is _UNSET:
+                QRService._env_signer = signer_from_env()
+            self._signer = QRService._env_signer
+        return self._signer
 
-    def generate_for_booking(self, booking_id: int, days_valid: int = 7):
+    def generate_for_booking(self, booking_id: int, days_valid: int = 7, show: bool = True):
+        """Create/refresh the booking's QR token; show=False skips the terminal output (background use)."""
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
+            with closing(conn.cursor()) as cur:
                 cur.execute("SELECT booking_id FROM bookings WHERE booking_id=%s", (booking_id,))
                 if not cur.fetchone():
                     return {"success": False, "message": "Booking not found"}
 
-                token = _new_token()
-                expires_at = datetime.now() + timedelta(days=days_valid)
+                expires_at = (datetime.now() + timedelta(days=days_valid)).replace(microsecond=0)
+                signer = self.signer
+                token = signer.sign(booking_id, expires_at) if signer else _new_token()
 
                 cur.execute(
                     """
@@ -32,11 +61,14 @@ class QRService:
                     """,
                     (booking_id, token, expires_at),
                 )
+                refresh_summaries(cur, booking_id)
                 conn.commit()
 
-                png_path = make_qr(token, filename=f"booking_{booking_id}.png", show_ascii=True)
-                print(f"\nSaved PNG: {png_path}")
-                print(f"QR Token:  {token}  (valid until {expires_at:%Y-%m-%d %H:%M})")
+                with QR_RENDER_SECONDS.time():
+                    png_path = make_qr(token, filename=f"booking_{booking_id}.png", show_ascii=show)
+                if show:
+                    print(f"\nSaved PNG: {png_path}")
+                    print(f"QR Token:  {token}  (valid until {expires_at:%Y-%m-%d %H:%M})")
                 return {"success": True, "token": token, "png_path": png_path, "expires_at": expires_at}
 
 
@@ -44,63 +76,196 @@ class QRService:
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
-                cur.execute("SELECT * FROM booking_qr_codes WHERE booking_id=%s", (booking_id,))
-                row = cur.fetchone()
+            with closing(conn.cursor()) as cur:
+                cur.execute(f"SELECT {QRCode.select_list()} FROM booking_qr_codes WHERE booking_id=%s", (booking_id,))
+                row = QRCode.fetchone(cur)
                 return {"success": bool(row), "qr": row} if row else {"success": False, "message": "No QR token for this booking"}
 
     
+    # ---------------- gate scanning ----------------
+    # Each scan is ONE conditional UPDATE (booking status + car availability in a
+    # single multi-table statement). The status predicate makes it atomic: if
+    # two gates scan the same token, InnoDB serializes the row and only one sees
+    # rowcount > 0; the PickedUp/Returned outbox event is written in the same
+    # transaction, and only when the transition happened. Signed tokens (utils/qr_tokens) carry booking id and expiry
+    # and are verified locally; for random legacy tokens the lookup
+    # token -> (booking_id, car_id, expires_at) is cached so a hot token costs a
+    # single round-trip.
+
+    _token_cache = TTLCache(maxsize=20_000, ttl=15 * 60)
+
+    _SCAN_RULES = {
+        "pickup": {"from": "approved", "to": "active", "stamp": "pickup_at", "event": BOOKING_PICKED_UP,
+                   "car_available": False, "check_expiry": True, "release": False, "done": "picked up (active)"},
+        "return": {"from": "active", "to": "completed", "stamp": "return_at", "event": BOOKING_RETURNED,
+                   "car_available": True, "check_expiry": False, "release": True, "done": "returned (completed)"},
+    }
+
     def scan_pickup(self, token: str, admin_user_id: int):
+        return self._scan("pickup", token, admin_user_id)
+
+    def scan_return(self, token: str, admin_user_id: int):
+        return self._scan("return", token, admin_user_id)
+
+    def scan_batch(self, scans, admin_user_id: int):
+        """
+        Process many gate scans on one connection: [(kind, token), ...] with kind
+        'pickup' or 'return', optionally (kind, token, scanned_at) when replaying
+        scans recorded earlier (the stamp and expiry check use scanned_at). Cache misses are resolved with a single IN (...)
+        lookup, then each scan is its own atomic conditional UPDATE, so lanes
+        never wait on each other's locks. Returns per-scan results in order.
+        """
+        scans = list(scans)
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
-                cur.execute(
-                    """
-                    SELECT b.*, q.expires_at
-                    FROM booking_qr_codes q
-                    JOIN bookings b ON b.booking_id = q.booking_id
-                    WHERE q.qr_token=%s
-                    """,
-                    (token,),
-                )
-                b = cur.fetchone()
-                if not b:
-                    return {"success": False, "message": "Invalid QR token"}
-                if b["expires_at"] and datetime.now() > b["expires_at"]:
-                    return {"success": False, "message": "QR token has expired"}
-                if b["status"] != "approved":
-                    return {"success": False, "message": f"Cannot pickup: status is '{b['status']}'"}
-
-                cur.execute("UPDATE bookings SET status='active', approved_by=%s, pickup_at=NOW() WHERE booking_id=%s",
-                            (admin_user_id, b["booking_id"]))
-                cur.execute("UPDATE cars SET available_now=FALSE WHERE car_id=%s", (b["car_id"],))
-                conn.commit()
-                return {"success": True, "message": f"Booking {b['booking_id']} picked up (active)"}
+            with closing(conn.cursor()) as cur:
+                self._resolve_tokens(cur, [s[1] for s in scans
+                                           if not is_signed(s[1]) and self._token_cache.get(s[1]) is None])
+                results = [self._apply_scan(conn, cur, kind, token, admin_user_id, at[0] if at else None)
+                           for kind, token, *at in scans]
+        ok = sum(1 for r in results if r.get("success"))
+        return {"success": True, "message": f"{ok}/{len(results)} scans applied",
+                "processed": len(results), "applied": ok, "results": results}
 
+    def prefetch_tokens(self, day=None, rows=None):
+        """
+        Warm the token cache with the day's expected traffic: approved bookings
+        starting on or before `day` (pickups) and all active ones (returns).
+        `rows` reuses a gate_snapshot the caller already has.
+        """
+        if rows is None:
+            res = self.gate_snapshot(day)
+            if not res["success"]:
+                return res
+            rows = res["rows"]
+        legacy = [r for r in rows if not is_signed(r["qr_token"])]
+        for r in legacy:
+            self._token_cache.set(r["qr_token"], (r["booking_id"], r["car_id"], r["expires_at"]))
+        return {"success": True, "cached": len(legacy)}
 
-    def scan_return(self, token: str, admin_user_id: int):
+    SNAPSHOT_COLUMNS = ("q.qr_token", "b.booking_id", "b.car_id", "b.status", "q.expires_at")
+    SNAPSHOT_KEYS = tuple(c.split(".")[1] for c in SNAPSHOT_COLUMNS)
+
+    def gate_snapshot(self, day=None):
+        """Tokens a gate can expect on `day`: approved bookings starting by then, and active ones."""
+        day = day or datetime.now().date()
         with closing(self.db.get_connection()) as conn:
             if not conn or not conn.is_connected():
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
+            with closing(conn.cursor()) as cur:
                 cur.execute(
-                    """
-                    SELECT b.*, q.expires_at
-                    FROM booking_qr_codes q
-                    JOIN bookings b ON b.booking_id = q.booking_id
-                    WHERE q.qr_token=%s
+                    f"""
+                    SELECT {", ".join(self.SNAPSHOT_COLUMNS)}
+                    FROM bookings b
+                    JOIN booking_qr_codes q ON q.booking_id = b.booking_id
+                    WHERE (b.status = 'approved' AND b.start_date <= %s) OR b.status = 'active'
                     """,
-                    (token,),
+                    (day,),
                 )
-                b = cur.fetchone()
-                if not b:
+                return {"success": True,
+                        "rows": [dict(zip(self.SNAPSHOT_KEYS, row)) for row in cur.fetchall()]}
+
+    def _scan(self, kind: str, token: str, admin_user_id: int):
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                return self._apply_scan(conn, cur, kind, token, admin_user_id)
+
+    def _resolve_tokens(self, cur, tokens):
+        """Load token -> booking info for cache misses (one query)."""
+        tokens = list(dict.fromkeys(t for t in tokens if t))
+        if not tokens:
+            return
+        cur.execute(
+            f"""
+            SELECT q.qr_token, b.booking_id, b.car_id, q.expires_at
+            FROM booking_qr_codes q
+            JOIN bookings b ON b.booking_id = q.booking_id
+            WHERE q.qr_token IN ({", ".join(["%s"] * len(tokens))})
+            """,
+            tokens,
+        )
+        for token, booking_id, car_id, expires_at in cur.fetchall():
+            self._token_cache.set(token, (booking_id, car_id, expires_at))
+
+    def _apply_scan(self, conn, cur, kind: str, token: str, admin_user_id: int, scanned_at=None):
+        rule = self._SCAN_RULES[kind]
+        now = scanned_at or datetime.now()
+        if is_signed(token):
+            # Signed token: booking id and expiry are in the token itself
+            if self.signer is None:
+                return {"success": False, "message": "Invalid QR token"}
+            check = self.signer.verify(token, now=now)
+            if check.reason == "invalid":
+                return {"success": False, "message": "Invalid QR token"}
+            booking_id, expires_at = check.booking_id, check.expires_at
+        else:
+            info = self._token_cache.get(token)
+            if info is None:
+                self._resolve_tokens(cur, [token])
+                info = self._token_cache.get(token)
+                if info is None:
                     return {"success": False, "message": "Invalid QR token"}
-                if b["status"] != "active":
-                    return {"success": False, "message": f"Cannot return: status is '{b['status']}'"}
+            booking_id, _car_id, expires_at = info
 
-                cur.execute("UPDATE bookings SET status='completed', approved_by=%s, return_at=NOW() WHERE booking_id=%s",
-                            (admin_user_id, b["booking_id"]))
-                cur.execute("UPDATE cars SET available_now=TRUE WHERE car_id=%s", (b["car_id"],))
-                conn.commit()
-                return {"success": True, "message": f"Booking {b['booking_id']} returned (completed)"}
+        # Reject expired tokens locally, before touching any row
+        if rule["check_expiry"] and expires_at and now > expires_at:
+            return {"success": False, "message": "QR token has expired"}
+
+        params = [rule["to"], scanned_at, rule["car_available"], booking_id, token, rule["from"]]
+        expiry_clause = ""
+        if rule["check_expiry"]:
+            expiry_clause = "AND (q.expires_at IS NULL OR q.expires_at >= COALESCE(%s, NOW()))"
+            params.append(scanned_at)
+        # the transition and its outbox event commit together
+        conn.start_transaction()
+        try:
+            cur.execute(
+                f"""
+                UPDATE bookings b
+                JOIN booking_qr_codes q ON q.booking_id = b.booking_id
+                JOIN cars c ON c.car_id = b.car_id
+                SET b.status = %s, b.{rule["stamp"]} = COALESCE(%s, NOW()),
+                    c.available_now = %s
+                WHERE b.booking_id = %s AND q.qr_token = %s AND b.status = %s
+                {expiry_clause}
+                """,
+                params,
+            )
+            applied = cur.rowcount > 0
+            if applied and rule["release"]:
+                release_days(cur, booking_id)      # a returned car is free from today on
+            if applied:
+                refresh_summaries(cur, booking_id)
+                record_event(cur, rule["event"], booking_id,
+                             {"admin_user_id": admin_user_id, "at": now.isoformat(timespec="seconds")})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if applied:
+            # approved_by is left alone; the scanning admin goes to the audit trail
+            AuditService.record(booking_id, rule["from"], rule["to"], kind, admin_user_id, at=now)
+            return {"success": True, "message": f"Booking {booking_id} {rule['done']}", "booking_id": booking_id}
+
+        # Cold path: explain why nothing matched
+        cur.execute(
+            """
+            SELECT b.status, q.expires_at
+            FROM booking_qr_codes q
+            JOIN bookings b ON b.booking_id = q.booking_id
+            WHERE q.qr_token = %s
+            """,
+            (token,),
+        )
+        row = cur.fetchone()
+        if not row:
+            self._token_cache.pop(token)   # token was refreshed or removed
+            return {"success": False, "message": "Invalid QR token"}
+        status, expires_at = row
+        if rule["check_expiry"] and expires_at and now > expires_at:
+            return {"success": False, "message": "QR token has expired"}
+        return {"success": False, "message": f"Cannot {kind}: status is '{status}'",
+                "booking_id": booking_id, "status": status}
@@ -0,0 +1,58 @@
+# services/reservations.py
+"""
+Per-day car reservations (migration 0007, table booking_day_slots).
+
+A booking owns one row per rented day; the primary key (car_id, day) lets
+the database refuse a second booking for any of those days. Slots are taken
+with one multi-row INSERT on the caller's cursor, inside the caller's
+transaction, so they commit or roll back with the booking itself. Two
+overlapping bookings only ever wait on each other's rows (days are inserted in
+ascending order, so they cannot deadlock); unrelated bookings never wait.
+"""
+from datetime import date, timedelta
+
+DUPLICATE_KEY = 1062    # ER_DUP_ENTRY
+
+
+class SlotConflict(Exception):
+    """Some of the requested days are already held by another booking."""
+
+
+def booking_days(start: date, end: date) -> list[date]:
+    """Every rented day, inclusive of both ends (same count as pricing.rental_days)."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def reserve_days(cur, booking_id: int, car_id: int, start: date, end: date):
+    """Take the booking's day slots; raises SlotConflict if any day is taken."""
+    reserve_bookings(cur, [(booking_id, car_id, start, end)])
+
+
+def reserve_bookings(cur, bookings):
+    """
+    Take the day slots of several (booking_id, car_id, start, end) at once, in
+    one INSERT; raises SlotConflict if any of them is taken. Rows go in
+    (car_id, day) order, so two overlapping groups cannot deadlock.
+    """
+    rows = sorted((car_id, day, booking_id)
+                  for booking_id, car_id, start, end in bookings
+                  for day in booking_days(start, end))
+    values = ", ".join(["(%s, %s, %s)"] * len(rows))
+    params = [v for row in rows for v in row]
+    try:
+        cur.execute(f"INSERT INTO booking_day_slots (car_id, day, booking_id) VALUES {values}", params)
+    except Exception as e:
+        if getattr(e, "errno", None) == DUPLICATE_KEY:
+            raise SlotConflict("Car is already booked for some of these dates") from e
+        raise
+
+
+def release_days(cur, *booking_ids: int) -> int:
+    """Free every slot held by the given bookings; returns rows deleted."""
+    if not booking_ids:
+        return 0
+    cur.execute(
+        f"DELETE FROM booking_day_slots WHERE booking_id IN ({', '.join(['%s'] * len(booking_ids))})",
+        booking_ids,
+    )
+    return cur.rowcount
@@ -0,0 +1,167 @@
+# services/search_service.py
+import time
+from contextlib import closing
+
+from config.database import DatabaseConnection
+from models.models import Car, User
+from utils.search_index import SearchIndex, tokenize
+
+
+class SearchService:
+    """
+    Ranked search over customers (name, email) and cars (brand, model).
+
+    Two paths:
+      - in-memory: process-wide SearchIndex per entity, warmed from the DB on the
+        first search and kept current by UserService/CarService writes
+        (register/delete, add/update/delete car). Re-warmed after REWARM_SECONDS
+        to pick up writes made by other processes.
+      - database: MySQL FULLTEXT (migration 0003) in boolean prefix mode, used
+        while the index is cold or when use_index=False.
+    Matching rows are then read by primary key, in rank order.
+    """
+    REWARM_SECONDS = 300
+
+    _users = SearchIndex()
+    _cars = SearchIndex()
+    _warmed_at: dict[str, float] = {}
+
+    def __init__(self, db: DatabaseConnection | None = None):
+        self.db = db or DatabaseConnection()
+
+    # ---------- index maintenance hooks (called by the write paths) ----------
+    @classmethod
+    def index_user(cls, user_id: int, name: str, email: str, role: str = "customer"):
+        cls._users.add(user_id, name, email, payload=role)
+
+    @classmethod
+    def remove_user(cls, user_id: int):
+        cls._users.remove(user_id)
+
+    @classmethod
+    def index_car(cls, car_id: int, brand: str, model: str):
+        cls._cars.add(car_id, brand, model, payload=(brand, model))
+
+    @classmethod
+    def update_car(cls, car_id: int, brand: str | None = None, model: str | None = None):
+        """Apply a partial brand/model change; cars not in the index are left for the next warm-up."""
+        entry = cls._cars.get(car_id)
+        if entry is None:
+            return
+        old_brand, old_model = entry[1]
+        cls.index_car(car_id, brand if brand is not None else old_brand,
+                      model if model is not None else old_model)
+
+    @classmethod
+    def remove_car(cls, car_id: int):
+        cls._cars.remove(car_id)
+
+    @classmethod
+    def reset(cls):
+        cls._users.clear()
+        cls._cars.clear()
+        cls._warmed_at.clear()
+
+    # ---------- warm-up ----------
+    def _is_warm(self, name: str) -> bool:
+        warmed = self._warmed_at.get(name)
+        return warmed is not None and time.monotonic() - warmed < self.REWARM_SECONDS
+
+    def warm(self):
+        """(Re)build both indexes from the database."""
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute("SELECT user_id, name, email, role FROM users")
+                users = SearchIndex()
+                users.add_many((uid, (name, email), role) for uid, name, email, role in cur.fetchall())
+                cur.execute("SELECT car_id, brand, model FROM cars")
+                cars = SearchIndex()
+                cars.add_many((cid, (brand, model), (brand, model)) for cid, brand, model in cur.fetchall())
+        # swap in whole indexes so concurrent searches never see a half-built one
+        type(self)._users, type(self)._cars = users, cars
+        now = time.monotonic()
+        self._warmed_at.update(users=now, cars=now)
+        return {"success": True, "users": len(users), "cars": len(cars)}
+
+    # ---------- search ----------
+    def search_customers(self, term: str, k: int = 20, use_index: bool = True):
+        if not tokenize(term):
+            return {"success": True, "customers": [], "source": "none"}
+        if use_index and not self._is_warm("users"):
+            self.warm()
+        if use_index and self._is_warm("users"):
+            hits = self._users.search(term, k, where=lambda role: role == "customer")
+            rows = self._fetch_by_ids(
+                "SELECT user_id, name, email, role, created_at FROM users WHERE user_id IN ({ids})",
+                [doc_id for doc_id, _ in hits], "user_id", User,
+            )
+            return self._result("customers", rows, "index")
+        return self._fulltext(
+            """
+            SELECT user_id, name, email, role, created_at,
+                   MATCH(name, email) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM users
+            WHERE role = 'customer' AND MATCH(name, email) AGAINST (%s IN BOOLEAN MODE)
+            ORDER BY score DESC, user_id
+            LIMIT %s
+            """, term, k, "customers", User,
+        )
+
+    def search_cars(self, term: str, k: int = 20, use_index: bool = True):
+        if not tokenize(term):
+            return {"success": True, "cars": [], "source": "none"}
+        if use_index and not self._is_warm("cars"):
+            self.warm()
+        if use_index and self._is_warm("cars"):
+            hits = self._cars.search(term, k)
+            rows = self._fetch_by_ids(
+                f"SELECT {Car.select_list()} FROM cars WHERE car_id IN ({{ids}})",
+                [doc_id for doc_id, _ in hits], "car_id", Car,
+            )
+            return self._result("cars", rows, "index")
+        return self._fulltext(
+            f"""
+            SELECT {Car.select_list()},
+                   MATCH(brand, model) AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM cars
+            WHERE MATCH(brand, model) AGAINST (%s IN BOOLEAN MODE)
+            ORDER BY score DESC, car_id
+            LIMIT %s
+            """, term, k, "cars", Car,
+        )
+
+    # ---------- helpers ----------
+    @staticmethod
+    def _result(key, rows, source):
+        if rows is None:
+            return {"success": False, "message": "DB connection failed"}
+        return {"success": True, key: rows, "source": source}
+
+    @staticmethod
+    def boolean_query(term: str) -> str:
+        """'carl exa' -> '+carl* +exa*' (every word required, prefix match)."""
+        return " ".join(f"+{t}*" for t in tokenize(term))
+
+    def _fetch_by_ids(self, sql_template: str, ids: list[int], key: str, record_cls):
+        if not ids:
+            return []
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return None
+            with closing(conn.cursor()) as cur:
+                cur.execute(sql_template.format(ids=", ".join(["%s"] * len(ids))), ids)
+                by_id = {r[key]: r for r in record_cls.fetchall(cur)}
+        return [by_id[i] for i in ids if i in by_id]   # keep rank order
+
+    def _fulltext(self, sql: str, term: str, k: int, key: str, record_cls):
+        query = self.boolean_query(term)
+        if not query:
+            return {"success": True, key: [], "source": "fulltext"}
+        with closing(self.db.get_read_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                cur.execute(sql, (query, query, int(k)))
+                return {"success": True, key: record_cls.fetchall(cur), "source": "fulltext"}
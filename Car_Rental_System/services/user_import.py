@@ -0,0 +1,200 @@
+# services/user_import.py
+"""
+Bulk customer import from CSV, e.g. a corporate client's drivers.
+
+    python -m services.user_import drivers.csv [--report report.csv] [--chunk N] [--workers N]
+
+The CSV has a header with name, email, password and, optionally, role. Only
+customers are imported; admins are still created one at a time. The import
+runs in four steps:
+
+  1. every row is validated with utils.validators, and repeated emails within
+     the file are refused;
+  2. emails already registered are found with one `email IN (...)` query per
+     chunk instead of one SELECT per row;
+  3. passwords are bcrypt-hashed on a process pool, one worker per core by
+     default, because hashing is where the time goes;
+  4. rows are inserted with executemany, one transaction per chunk. If someone
+     registers one of the emails mid-import, that chunk is retried row by row
+     so only the clashing row fails.
+
+Every input line ends up in the report: imported, or error with a reason.
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+from config.database import DatabaseConnection
+from services.reservations import DUPLICATE_KEY
+from services.search_service import SearchService
+from utils.auth import hash_password
+from utils.validators import validate_email, validate_password, validate_username
+
+CHUNK_SIZE = 500
+REQUIRED_COLUMNS = ("name", "email", "password")
+REPORT_COLUMNS = ("line", "email", "status", "message")
+# below this many passwords a pool costs more to start than it saves
+POOL_MIN_ROWS = 8
+
+
+def _row_error(name: str, email: str, password: str, role: str) -> str | None:
+    if not validate_username(name):
+        return "Name must be at least 3 characters"
+    if not validate_email(email):
+        return "Invalid email format"
+    if not validate_password(password):
+        return "Password needs 6+ characters, an uppercase letter and a digit"
+    if role != "customer":
+        return "Only customers can be bulk-imported"
+    return None
+
+
+def hash_all(passwords: list[str], workers: int | None = None) -> list[str]:
+    """bcrypt every password, across `workers` processes (default: all cores)."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < POOL_MIN_ROWS:
+        return [hash_password(p) for p in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+class UserImportService:
+    def __init__(self, db: DatabaseConnection | None = None, chunk_size: int = CHUNK_SIZE,
+                 workers: int | None = None):
+        self.db = db or DatabaseConnection()
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def import_csv(self, path: str):
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as fh:
+                return self.import_rows(csv.DictReader(fh))
+        except OSError as e:
+            return {"success": False, "message": f"Cannot read {path}: {e.strerror}"}
+
+    def import_rows(self, reader):
+        """Import csv.DictReader-style rows; returns counts plus a per-row report."""
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or ())]
+        if missing:
+            return {"success": False, "message": f"Missing column(s): {', '.join(missing)}"}
+
+        report, candidates, seen = [], [], {}
+        for line, raw in enumerate(reader, 2):          # line 1 is the header
+            name = (raw.get("name") or "").strip()
+            email = (raw.get("email") or "").strip()
+            password = raw.get("password") or ""
+            role = (raw.get("role") or "customer").strip().lower()
+            entry = {"line": line, "email": email, "status": "error", "message": ""}
+            report.append(entry)
+            error = _row_error(name, email, password, role)
+            if not error and email.lower() in seen:
+                error = f"Duplicate of line {seen[email.lower()]}"
+            if error:
+                entry["message"] = error
+                continue
+            seen[email.lower()] = line
+            candidates.append((entry, name, email, password))
+
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                candidates = self._drop_registered(cur, candidates)
+
+        # no connection is held while hashing, which is most of the run
+        hashes = hash_all([c[3] for c in candidates], self.workers)
+        rows = [(entry, name, email, hashed) for (entry, name, email, _), hashed in zip(candidates, hashes)]
+
+        with closing(self.db.get_connection()) as conn:
+            if not conn or not conn.is_connected():
+                return {"success": False, "message": "DB connection failed"}
+            with closing(conn.cursor()) as cur:
+                for i in range(0, len(rows), self.chunk_size):
+                    self._insert_chunk(conn, cur, rows[i:i + self.chunk_size])
+
+        imported = sum(1 for e in report if e["status"] == "imported")
+        failed = len(report) - imported
+        return {"success": True, "message": f"Imported {imported} user(s), {failed} error(s)",
+                "imported": imported, "failed": failed, "report": report}
+
+    def _drop_registered(self, cur, candidates: list) -> list:
+        """Mark rows whose email already exists; one IN query per chunk."""
+        taken = set()
+        emails = [c[2] for c in candidates]
+        for i in range(0, len(emails), self.chunk_size):
+            chunk = emails[i:i + self.chunk_size]
+            cur.execute(f"SELECT email FROM users WHERE email IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            taken.update(row[0].lower() for row in cur.fetchall())
+        kept = []
+        for c in candidates:
+            if c[2].lower() in taken:
+                c[0]["message"] = "Email already registered"
+            else:
+                kept.append(c)
+        return kept
+
+    def _insert_chunk(self, conn, cur, rows: list):
+        sql = "INSERT INTO users (name, email, password, role) VALUES (%s, %s, %s, 'customer')"
+        conn.start_transaction()
+        try:
+            cur.executemany(sql, [(name, email, hashed) for _, name, email, hashed in rows])
+            conn.commit()
+            done = rows
+        except Exception as e:
+            conn.rollback()
+            if getattr(e, "errno", None) != DUPLICATE_KEY:
+                raise
+            # someone registered one of these meanwhile: retry one by one
+            done = []
+            for row in rows:
+                entry, name, email, hashed = row
+                try:
+                    cur.execute(sql, (name, email, hashed))
+                    conn.commit()
+                    done.append(row)
+                except Exception as e:
+                    conn.rollback()
+                    if getattr(e, "errno", None) != DUPLICATE_KEY:
+                        raise
+                    entry["message"] = "Email already registered"
+        if not done:
+            return
+        cur.execute(f"SELECT user_id, email FROM users WHERE email IN ({', '.join(['%s'] * len(done))})",
+                    [email for _, _, email, _ in done])
+        ids = {email.lower(): user_id for user_id, email in cur.fetchall()}
+        for entry, name, email, _ in done:
+            entry["status"], entry["message"] = "imported", ""
+            if email.lower() in ids:
+                SearchService.index_user(ids[email.lower()], name, email, "customer")
+
+
+def write_report(report: list[dict], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=REPORT_COLUMNS)
+        w.writeheader()
+        w.writerows(report)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m services.user_import",
+                                     description="Import customers from a CSV (name,email,password[,role]).")
+    parser.add_argument("csv")
+    parser.add_argument("--report", help="write the per-row report to this CSV")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, help="hashing processes (default: all cores)")
+    opts = parser.parse_args(argv)
+    res = UserImportService(chunk_size=opts.chunk, workers=opts.workers).import_csv(opts.csv)
+    print(("✅ " if res.get("success") else "❌ ") + res["message"])
+    for entry in res.get("report", []):
+        if entry["status"] == "error":
+            print(f"   line {entry['line']}: {entry['email'] or '-'}: {entry['message']}")
+    if opts.report and res.get("report") is not None:
+        write_report(res["report"], opts.report)
+    return 0 if res.get("success") and not res.get("failed") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,36 @@
+import os
 from contextlib import closing
 from config.database import DatabaseConnection
-from utils.auth import hash_password, verify_password
+from models.models import User
+from services.search_service import SearchService
+from utils.streaming import DEFAULT_BATCH_SIZE, open_stream
+from utils.auth import dummy_verify, hash_password, prepare_dummy_hash, verify_password
 from utils.validators import validate_email, validate_password
+from utils.metrics import REGISTRY, instrumented
+from utils.profiling import profiled
+from utils.throttle import DBBuckets, LoginThrottle, terminal_client_id
 
+LOGIN_FAILED = "Invalid email or password"
+
+LOGIN_ATTEMPTS = REGISTRY.counter(
+    "login_attempts_total", "Login attempts by outcome (success/invalid/throttled)", ("outcome",))
+LOGIN_THROTTLED = REGISTRY.counter(
+    "login_throttled_total", "Login attempts refused by a token bucket", ("scope",))
+
+@instrumented
+@profiled
 class UserService:
-    def __init__(self, db: DatabaseConnection | None = None):
+    # Login token buckets, shared by every instance in this process
+    throttle = LoginThrottle()
+
+    def __init__(self, db: DatabaseConnection | None = None, throttle: LoginThrottle | None = None):
         self.db = db or DatabaseConnection()
+        if throttle is not None:
+            self.throttle = throttle
+        elif os.getenv("LOGIN_THROTTLE_BACKEND") == "db":
+            # buckets shared by every process (login_throttle table)
+            self.throttle = LoginThrottle(DBBuckets(self.db))
+        prepare_dummy_hash()   # in the background: the first unknown-email login costs no extra bcrypt
 
     def register_user(self, name, email, password, role="customer"):
         # Basic validation
@@ -23,7 +48,7 @@ class UserService:
         with closing(self.db.get_connection()) as conn:
             if not conn or (hasattr(conn, "is_connected") and not conn.is_connected()):
                 return {"success": False, "message": "Database connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cursor:
+            with closing(conn.cursor()) as cursor:
                 # Uniqueness check
                 cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
                 if cursor.fetchone():
@@ -36,23 +61,46 @@ class UserService:
                     (name, email, hashed_pw, role)
                 )
                 conn.commit()
+                SearchService.index_user(cursor.lastrowid, name, email, role)
 
                 return {"success": True, "message": f"User {role} registered successfully"}
 
-    def login_user(self, email, password):
+    def login_user(self, email, password, client: str | None = None):
+        """
+        Throttled per account and per client (terminal/address) before any bcrypt
+        work. Unknown emails cost the same bcrypt check as a wrong password and get
+        the same message, so neither timing nor wording tells whether an account exists.
+        """
+        refused = self.throttle.check(email, client or terminal_client_id())
+        if refused:
+            scope, retry_after = refused
+            LOGIN_THROTTLED.inc(scope=scope)
+            LOGIN_ATTEMPTS.inc(outcome="throttled")
+            return {"success": False, "retry_after": round(retry_after, 1),
+                    "message": f"Too many login attempts. Try again in {max(1, round(retry_after))} s"}
+
         with closing(self.db.get_connection()) as conn:
             if not conn or (hasattr(conn, "is_connected") and not conn.is_connected()):
                 return {"success": False, "message": "Database connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cursor:
-                cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-                user = cursor.fetchone()
-                if not user:
-                    return {"success": False, "message": "User not found"}
+            with closing(conn.cursor()) as cursor:
+                cursor.execute(
+                    f"SELECT {User.select_list()}, password FROM users WHERE email = %s", (email,)
+                )
+                row = cursor.fetchone()
+                if not row:
+                    dummy_verify(password)
+                    LOGIN_ATTEMPTS.inc(outcome="invalid")
+                    return {"success": False, "message": LOGIN_FAILED}
 
-                if not verify_password(password, user["password"]):
-                    return {"success": False, "message": "Invalid password"}
+                # password hash is the last column; the returned User never carries it
+                *fields, hashed = row
+                if not verify_password(password, hashed):
+                    LOGIN_ATTEMPTS.inc(outcome="invalid")
+                    return {"success": False, "message": LOGIN_FAILED}
 
-                role = user.get("role", "customer")
+                LOGIN_ATTEMPTS.inc(outcome="success")
+                user = User.from_values(fields)
+                role = user.get("role") or "customer"
                 return {
                     "success": True,
                     "message": "Admin login successful" if role == "admin" else "Customer login successful",
@@ -61,30 +109,49 @@ class UserService:
                 }
 
     def list_customers(self, search: str | None = None, limit: int = 200, offset: int = 0):
-        where = ["role = 'customer'"]
-        params: list = []
         if search:
-            where.append("(name LIKE %s OR email LIKE %s)")
-            like = f"%{search}%"
-            params.extend([like, like])
+            # ranked top-k from the search index instead of LIKE '%term%' scans
+            res = SearchService(self.db).search_customers(search, k=int(limit) + int(offset))
+            if res.get("success"):
+                res["customers"] = res["customers"][int(offset):]
+            return res
 
-        sql = f"""
-            SELECT user_id, name, email, role, created_at
-            FROM users
-            WHERE {' AND '.join(where)}
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-        """
+        sql, params = self._customers_query()
+        sql += " LIMIT %s OFFSET %s"
         params.extend([int(limit), int(offset)])
 
-        with closing(self.db.get_connection()) as conn:
+        with closing(self.db.get_read_connection()) as conn:
             if not conn or (hasattr(conn, "is_connected") and not conn.is_connected()):
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
+            with closing(conn.cursor()) as cur:
                 cur.execute(sql, params)
-                rows = cur.fetchall() or []
+                rows = User.fetchall(cur)
         return {"success": True, "customers": rows}
 
+    def stream_customers(self, search: str | None = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        """All matching customers as a batched generator in "customers" (consume or close it)."""
+        if search:
+            res = self.list_customers(search=search)
+            if res.get("success"):
+                res["customers"] = (r for r in res["customers"])   # closable, like open_stream
+            return res
+
+        sql, params = self._customers_query()
+        conn = self.db.get_read_connection()
+        if not conn or (hasattr(conn, "is_connected") and not conn.is_connected()):
+            return {"success": False, "message": "DB connection failed"}
+        return {"success": True, "customers": open_stream(conn, sql, params, User, batch_size)}
+
+    @staticmethod
+    def _customers_query():
+        sql = """
+            SELECT user_id, name, email, role, created_at
+            FROM users
+            WHERE role = 'customer'
+            ORDER BY created_at DESC
+        """
+        return sql, []
+
     def delete_user(self, admin_role: str, user_id: int):
         if admin_role != "admin":
             return {"success": False, "message": "Forbidden: admin only"}
@@ -92,16 +159,17 @@ class UserService:
         with closing(self.db.get_connection()) as conn:
             if not conn or (hasattr(conn, "is_connected") and not conn.is_connected()):
                 return {"success": False, "message": "DB connection failed"}
-            with closing(conn.cursor(dictionary=True)) as cur:
+            with closing(conn.cursor()) as cur:
                 cur.execute("SELECT role FROM users WHERE user_id=%s", (user_id,))
                 row = cur.fetchone()
                 if not row:
                     return {"success": False, "message": "User not found"}
-                if row["role"] == "admin":
+                if row[0] == "admin":
                     return {"success": False, "message": "Refusing to delete an admin"}
 
                 cur.execute("DELETE FROM users WHERE user_id=%s", (user_id,))
                 conn.commit()
                 if cur.rowcount == 0:
                     return {"success": False, "message": "User not found / not deleted"}
+                SearchService.remove_user(user_id)
                 return {"success": True, "message": "User deleted"}
@@ -1,11 +1,45 @@
-import bcrypt
+# bcrypt is imported on first use so the CLI menu does not wait for it.
+import threading
 
 def hash_password(password: str) -> str:
     """Generate a bcrypt hash of the password"""
+    import bcrypt
     salt = bcrypt.gensalt()
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against a hashed password"""
+    import bcrypt
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+_dummy_hash = None
+_dummy_thread = None
+_dummy_lock = threading.Lock()
+
+def _build_dummy_hash():
+    global _dummy_hash
+    import secrets
+    _dummy_hash = hash_password(secrets.token_urlsafe(16))
+
+def prepare_dummy_hash():
+    """
+    Start building dummy_verify's throwaway hash (once per process, on a daemon
+    thread so the menu does not wait for bcrypt). Called when the login service
+    is constructed, so the first unknown-email login is not slower than later ones.
+    """
+    global _dummy_thread
+    with _dummy_lock:
+        if _dummy_thread is None:
+            _dummy_thread = threading.Thread(target=_build_dummy_hash, name="dummy-hash", daemon=True)
+            _dummy_thread.start()
+        return _dummy_thread
+
+def dummy_verify(password: str) -> bool:
+    """
+    Same bcrypt work as verify_password, against a throwaway hash: run for
+    unknown emails so they take as long as a wrong password. Always False.
+    """
+    prepare_dummy_hash().join()
+    verify_password(password, _dummy_hash)
+    return False
@@ -0,0 +1,137 @@
+# utils/holds.py
+import heapq
+import secrets
+import threading
+import time
+from datetime import date
+from typing import NamedTuple
+
+
+class Hold(NamedTuple):
+    hold_id: str
+    user_id: int
+    car_id: int
+    start: date
+    end: date
+    expires_at: float
+
+
+class HoldStore:
+    """
+    In-memory, time-limited holds on (car, date range) during checkout.
+
+    Nothing is written to the database: a hold simply stops existing once its
+    TTL passes. Expired holds are dropped lazily from a min-heap ordered by
+    expiry, so each call only pops what has actually expired. Holds live in
+    this process only; the day-slot key on the database remains the guard
+    against double booking across processes.
+    """
+    def __init__(self, ttl: float = 600.0, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._holds: dict[str, Hold] = {}
+        self._by_car: dict[int, set[str]] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return len(self._holds)
+
+    def place(self, user_id: int, car_id: int, start: date, end: date, ttl: float | None = None) -> Hold | None:
+        """
+        Hold the car for [start, end]; None if another user holds an overlapping range.
+        The user's own overlapping holds on the car are replaced.
+        """
+        with self._lock:
+            self._expire()
+            mine = []
+            for h in self._overlapping(car_id, start, end):
+                if h.user_id != user_id:
+                    return None
+                mine.append(h)
+            for h in mine:
+                self._drop(h.hold_id)
+            hold = Hold(secrets.token_urlsafe(12), user_id, car_id, start, end,
+                        self._clock() + (self.ttl if ttl is None else ttl))
+            self._add(hold)
+            return hold
+
+    def get(self, hold_id: str) -> Hold | None:
+        with self._lock:
+            self._expire()
+            return self._holds.get(hold_id)
+
+    def take(self, hold_id: str, user_id: int) -> Hold | None:
+        """Remove and return the user's live hold, so it can be confirmed exactly once."""
+        with self._lock:
+            self._expire()
+            hold = self._holds.get(hold_id)
+            if hold is None or hold.user_id != user_id:
+                return None
+            self._drop(hold_id)
+            return hold
+
+    def restore(self, hold: Hold) -> bool:
+        """Put back a taken hold (e.g. its booking failed) unless it has expired or been overtaken."""
+        with self._lock:
+            self._expire()
+            if hold.expires_at <= self._clock() or any(
+                    h.user_id != hold.user_id for h in self._overlapping(hold.car_id, hold.start, hold.end)):
+                return False
+            self._add(hold)
+            return True
+
+    def release(self, hold_id: str) -> bool:
+        with self._lock:
+            return self._drop(hold_id) is not None
+
+    def is_held(self, car_id: int, start: date, end: date, user_id: int | None = None) -> bool:
+        """True if someone other than `user_id` holds the car on any of these days."""
+        with self._lock:
+            self._expire()
+            return any(h.user_id != user_id for h in self._overlapping(car_id, start, end))
+
+    def held_cars(self, start: date, end: date, user_id: int | None = None) -> set[int]:
+        """Cars held by someone other than `user_id` on any day of [start, end]."""
+        with self._lock:
+            self._expire()
+            return {car_id for car_id in self._by_car
+                    if any(h.user_id != user_id for h in self._overlapping(car_id, start, end))}
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._expire()
+
+    # ---------------- internals (lock held) ----------------
+    def _overlapping(self, car_id: int, start: date, end: date):
+        for hold_id in self._by_car.get(car_id, ()):
+            h = self._holds[hold_id]
+            if h.start <= end and start <= h.end:
+                yield h
+
+    def _add(self, hold: Hold):
+        self._holds[hold.hold_id] = hold
+        self._by_car.setdefault(hold.car_id, set()).add(hold.hold_id)
+        heapq.heappush(self._heap, (hold.expires_at, hold.hold_id))
+
+    def _drop(self, hold_id: str) -> Hold | None:
+        # the heap entry stays behind and is skipped when it surfaces
+        hold = self._holds.pop(hold_id, None)
+        if hold is not None:
+            ids = self._by_car[hold.car_id]
+            ids.discard(hold_id)
+            if not ids:
+                del self._by_car[hold.car_id]
+        return hold
+
+    def _expire(self) -> int:
+        now, removed = self._clock(), 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, hold_id = heapq.heappop(self._heap)
+            hold = self._holds.get(hold_id)
+            if hold is not None and hold.expires_at == expires_at:
+                self._drop(hold_id)
+                removed += 1
+        return removed
@@ -0,0 +1,114 @@
+# utils/journal.py
+import json
+import os
+import threading
+
+
+class Journal:
+    """
+    Append-only JSON-lines journal. Every append is flushed and fsync'ed before
+    it returns, so an accepted record survives a crash or power loss.
+
+    Records carry an "id"; processed ids are appended to a sidecar
+    "<path>.acked" file instead of rewriting the journal, and compact()
+    drops acknowledged records once nothing is in flight.
+    A torn last line (crash mid-write) is ignored on read, and the next append
+    starts on a fresh line so it is not lost with it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.ack_path = path + ".acked"
+        self._lock = threading.Lock()
+        self._fh = None
+
+    @staticmethod
+    def _torn(path: str) -> bool:
+        """True if the file ends without a newline (a write cut short by a crash)."""
+        try:
+            with open(path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except FileNotFoundError:
+            return False
+
+    def _append_line(self, path: str, line: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        prefix = "\n" if self._torn(path) else ""      # never glue a record onto a torn line
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(prefix + line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, record: dict):
+        line = json.dumps(record, default=str, separators=(",", ":"))
+        with self._lock:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                torn = self._torn(self.path)
+                self._fh = open(self.path, "a", encoding="utf-8")
+                if torn:
+                    self._fh.write("\n")           # end the torn line; it stays unparseable on its own
+            self._fh.write(line + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def ack(self, ids):
+        ids = list(ids)
+        if ids:
+            with self._lock:
+                self._append_line(self.ack_path, "\n".join(ids))
+
+    @staticmethod
+    def _read(path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+    def records(self) -> list[dict]:
+        out = []
+        for line in self._read(self.path):
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue   # torn write
+        return out
+
+    def acked(self) -> set[str]:
+        return set(self._read(self.ack_path))
+
+    def pending(self) -> list[dict]:
+        """Records not yet acknowledged, in append order."""
+        done = self.acked()
+        return [r for r in self.records() if r.get("id") not in done]
+
+    def compact(self):
+        """Rewrite the journal with only pending records and reset the ack file."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            done = self.acked()
+            keep = [r for r in self.records() if r.get("id") not in done]
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for r in keep:
+                    f.write(json.dumps(r, default=str, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            if os.path.exists(self.ack_path):
+                os.remove(self.ack_path)
+        return len(keep)
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
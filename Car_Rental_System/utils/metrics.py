@@ -0,0 +1,280 @@
+# utils/metrics.py
+"""
+In-process metrics: counters, gauges and fixed-bucket histograms, safe to
+update from any thread, rendered in the Prometheus text format.
+
+    from utils.metrics import REGISTRY
+    LOGINS = REGISTRY.counter("logins_total", "Login attempts", ("outcome",))
+    LOGINS.inc(outcome="success")
+
+Export (see start_exporter): METRICS_PORT serves GET /metrics on 127.0.0.1
+(METRICS_HOST to change), METRICS_FILE rewrites a textfile every
+METRICS_FILE_INTERVAL seconds (default 15) and at exit, e.g. for the
+node_exporter textfile collector.
+"""
+import atexit
+import functools
+import os
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: tuple, extra: tuple = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _render_samples(self):
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        lines = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{self._labels(key, (('le', _fmt(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._labels(key, (('le', '+Inf'),))} {n}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._writer: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+    # ---------------- exporters ----------------
+    def write_textfile(self, path: str):
+        """Write render() to `path` atomically (temp file + rename)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Serve GET /metrics from a daemon thread; returns the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def start_textfile_writer(self, path: str, interval: float = 15.0):
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.write_textfile(path)
+                except OSError:
+                    pass
+        self._writer = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+        self._writer.start()
+        atexit.register(self.write_textfile, path)
+
+    def start_exporter(self):
+        """Start whatever METRICS_PORT / METRICS_FILE ask for (no-op when neither is set)."""
+        port = os.getenv("METRICS_PORT")
+        if port and self._server is None:
+            self.serve(int(port), os.getenv("METRICS_HOST", "127.0.0.1"))
+        path = os.getenv("METRICS_FILE")
+        if path and self._writer is None:
+            self.start_textfile_writer(path, float(os.getenv("METRICS_FILE_INTERVAL", 15)))
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+REGISTRY = Registry()
+
+SERVICE_CALLS = REGISTRY.counter(
+    "service_calls_total", "Service method calls by outcome (success/failure/error)",
+    ("service", "method", "outcome"))
+SERVICE_SECONDS = REGISTRY.histogram(
+    "service_call_seconds", "Service method latency", ("service", "method"))
+
+
+def instrumented(cls):
+    """
+    Class decorator: count each public method call by outcome and time it.
+    A dict result with success=False is a "failure"; an exception is an "error".
+    """
+    service = cls.__name__
+    for attr, fn in list(vars(cls).items()):
+        if attr.startswith("_") or not isinstance(fn, types.FunctionType):
+            continue
+        setattr(cls, attr, _timed(service, attr, fn))
+    return cls
+
+
+def _timed(service: str, method: str, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            res = fn(*args, **kwargs)
+            outcome = "failure" if isinstance(res, dict) and res.get("success") is False else "success"
+            return res
+        finally:
+            SERVICE_SECONDS.observe(time.perf_counter() - started, service=service, method=method)
+            SERVICE_CALLS.inc(service=service, method=method, outcome=outcome)
+    return wrapper
@@ -0,0 +1,29 @@
+# utils/pager.py
+from typing import Callable, Iterable
+
+MORE_PROMPT = "-- more (Enter = next page, q = quit) -- "
+
+
+def page(lines: Iterable[str], page_size: int = 20,
+         input_fn: Callable[[str], str] = input, out: Callable[[str], None] = print) -> int:
+    """
+    Print lines as they arrive and pause after every `page_size` lines, but only
+    if more lines follow. Quitting closes the source iterator (which releases a
+    streaming DB cursor). Returns the number of lines printed.
+    """
+    it = iter(lines)
+    shown = 0
+    try:
+        nxt = next(it, None)
+        while nxt is not None:
+            out(nxt)
+            shown += 1
+            nxt = next(it, None)
+            if nxt is not None and page_size and shown % page_size == 0:
+                if input_fn(MORE_PROMPT).strip().lower() == "q":
+                    break
+    finally:
+        close = getattr(it, "close", None)
+        if close:
+            close()
+    return shown
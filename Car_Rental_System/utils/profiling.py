@@ -0,0 +1,257 @@
+# utils/profiling.py
+"""
+Opt-in profiling of menu actions and service calls.
+
+Off by default. Turn it on with CAR_RENTAL_PROFILE=full|sample (or
+`python main.py --profile[=sample]`); output goes to CAR_RENTAL_PROFILE_DIR
+(default ./profiles).
+
+  full    every top-level action runs under cProfile with tracemalloc
+          snapshots around it; each one writes <stamp>-<action>.pstats (open
+          with `python -m pstats`) and <stamp>-<action>.txt: wall time, top
+          functions by cumulative time, and top allocations by line.
+  sample  a background thread looks at the stacks of threads inside an action
+          every CAR_RENTAL_PROFILE_INTERVAL_MS (default 10) ms. The cost does not
+          grow with the code being profiled, so it can stay on in production.
+          Per-action call counts, wall time and the hottest frames go to
+          sample_summary.txt, and flamegraph-ready stacks to samples.folded,
+          at exit or on dump().
+
+Only the outermost action of a thread is profiled: a service call made from
+a controller method shows up inside the controller's profile.
+"""
+import atexit
+import functools
+import io
+import os
+import sys
+import threading
+import time
+import types
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+TOP_N = 25
+MAX_STACK_DEPTH = 64
+
+
+class Profiler:
+    MODES = ("off", "full", "sample")
+
+    def __init__(self):
+        self.mode = "off"
+        self.directory = "profiles"
+        self.interval = 0.01
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._active: dict[int, str] = {}                 # thread id -> action (sample mode)
+        self._samples: dict[str, Counter] = {}            # action -> Counter(stack tuple)
+        self._timings: dict[str, list] = {}               # action -> [calls, total seconds]
+        self._sampler: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._atexit = False
+
+    def configure(self, mode: str | None = None, directory: str | None = None,
+                  interval_ms: float | None = None):
+        mode = (mode or os.getenv("CAR_RENTAL_PROFILE") or "off").lower()
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.directory = directory or os.getenv("CAR_RENTAL_PROFILE_DIR", "profiles")
+        self.interval = float(interval_ms or os.getenv("CAR_RENTAL_PROFILE_INTERVAL_MS", 10)) / 1000
+        with self._lock:                      # a new configuration starts a new profile
+            self._samples.clear()
+            self._timings.clear()
+        if mode != "sample":
+            self._stop.set()                  # an idle sampler from an earlier mode exits
+        elif not self._atexit:
+            atexit.register(self.shutdown)
+            self._atexit = True
+        return self
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @contextmanager
+    def action(self, name: str):
+        if self.mode == "off" or getattr(self._local, "depth", 0):
+            yield
+            return
+        self._local.depth = 1
+        try:
+            if self.mode == "full":
+                with self._full(name):
+                    yield
+            else:
+                with self._sampled(name):
+                    yield
+        finally:
+            self._local.depth = 0
+
+    # ---------------- full mode ----------------
+    @contextmanager
+    def _full(self, name: str):
+        import cProfile
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        before = tracemalloc.take_snapshot()
+        prof = cProfile.Profile()
+        started = time.perf_counter()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            elapsed = time.perf_counter() - started
+            after = tracemalloc.take_snapshot()
+            self._dump_full(name, prof, before, after, elapsed)
+
+    def _dump_full(self, name: str, prof, before, after, elapsed: float):
+        import pstats
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._seq += 1
+            stem = os.path.join(self.directory, f"{datetime.now():%Y%m%d-%H%M%S}-{self._seq:04d}-{_safe(name)}")
+        prof.dump_stats(stem + ".pstats")
+
+        buf = io.StringIO()
+        buf.write(f"action: {name}\nwall: {elapsed * 1000:.1f} ms\n\n")
+        pstats.Stats(prof, stream=buf).strip_dirs().sort_stats("cumulative").print_stats(TOP_N)
+        buf.write("top allocations (net, by line):\n")
+        for stat in after.compare_to(before, "lineno")[:TOP_N]:
+            buf.write(f"  {stat}\n")
+        with open(stem + ".txt", "w", encoding="utf-8") as fh:
+            fh.write(buf.getvalue())
+
+    # ---------------- sample mode ----------------
+    @contextmanager
+    def _sampled(self, name: str):
+        tid = threading.get_ident()
+        self._ensure_sampler()
+        with self._lock:
+            self._active[tid] = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._active.pop(tid, None)
+                timing = self._timings.setdefault(name, [0, 0.0])
+                timing[0] += 1
+                timing[1] += elapsed
+
+    def _running(self) -> bool:
+        return self._sampler is not None and self._sampler.is_alive() and not self._stop.is_set()
+
+    def _ensure_sampler(self):
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            if self._sampler is not None:
+                self._sampler.join(timeout=1)     # stopping after a mode change
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for tid, name in active.items():
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                with self._lock:
+                    self._samples.setdefault(name, Counter())[tuple(stack)] += 1
+
+    def dump(self) -> str | None:
+        """Write sample_summary.txt and samples.folded; returns the summary path."""
+        with self._lock:
+            samples = {k: Counter(v) for k, v in self._samples.items()}
+            timings = {k: list(v) for k, v in self._timings.items()}
+        if not timings:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        buf = io.StringIO()
+        buf.write(f"sampling every {self.interval * 1000:.0f} ms\n")
+        for name, (calls, total) in sorted(timings.items(), key=lambda kv: -kv[1][1]):
+            counter = samples.get(name, Counter())
+            n = sum(counter.values())
+            buf.write(f"\n== {name}: {calls} calls, {total * 1000:.1f} ms total, "
+                      f"{total * 1000 / calls:.1f} ms avg, {n} samples\n")
+            leaf, inclusive = Counter(), Counter()
+            for stack, count in counter.items():
+                if stack:
+                    leaf[stack[-1]] += count
+                for frame in set(stack):
+                    inclusive[frame] += count
+            buf.write("  self:\n")
+            for frame, count in leaf.most_common(10):
+                buf.write(f"    {100 * count / n:5.1f}%  {frame}\n")
+            buf.write("  inclusive:\n")
+            for frame, count in inclusive.most_common(10):
+                buf.write(f"    {100 * count / n:5.1f}%  {frame}\n")
+        path = os.path.join(self.directory, "sample_summary.txt")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(buf.getvalue())
+        with open(os.path.join(self.directory, "samples.folded"), "w", encoding="utf-8") as fh:
+            for name, counter in samples.items():
+                for stack, count in counter.items():
+                    fh.write(";".join((name, *stack)) + f" {count}\n")
+        return path
+
+    def shutdown(self):
+        """Stop the sampler; write the summary if sampling is still on and sampled anything."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+            self._sampler = None
+        if self.mode == "sample":
+            self.dump()
+
+
+def _safe(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)[:80]
+
+
+profiler = Profiler().configure()
+
+
+def profiled(cls):
+    """
+    Class decorator: run each public method as a profiler action named
+    Class.method. When profiling is off the wrapper is a single attribute check.
+    """
+    for attr, fn in list(vars(cls).items()):
+        if attr.startswith("_") or not isinstance(fn, types.FunctionType):
+            continue
+        setattr(cls, attr, _wrap(f"{cls.__name__}.{attr}", fn))
+    return cls
+
+
+def _wrap(name: str, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if profiler.mode == "off":
+            return fn(*args, **kwargs)
+        with profiler.action(name):
+            return fn(*args, **kwargs)
+    return wrapper
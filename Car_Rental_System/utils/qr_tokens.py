@@ -0,0 +1,103 @@
+# utils/qr_tokens.py
+"""
+Signed, self-describing QR tokens:
+
+    v1.<kid>.<booking_id>.<expires_unix>.<sig>
+
+sig = first 16 bytes of HMAC-SHA256(key[kid], "v1.<kid>.<booking_id>.<expires_unix>"),
+base64url without padding. A gate can therefore reject forged, tampered or
+expired tokens without a database lookup; the DB row is still the source of
+truth for whether a token is the *current* one for its booking.
+
+Keys come from the environment (see signer_from_env):
+    QR_SIGNING_KEYS=k2:new-secret,k1:old-secret
+    QR_ACTIVE_KID=k2
+New tokens are signed with the active kid; every listed kid still verifies,
+so keys can be rotated by adding a new kid, switching QR_ACTIVE_KID, and
+dropping the old kid once its tokens have expired.
+Random legacy tokens (no "v1." prefix) are not handled here.
+"""
+import base64
+import hashlib
+import hmac
+import os
+from datetime import datetime
+from typing import NamedTuple
+
+VERSION = "v1"
+SIG_BYTES = 16
+
+
+class TokenCheck(NamedTuple):
+    ok: bool
+    reason: str               # "ok" | "invalid" | "expired"
+    booking_id: int | None = None
+    expires_at: datetime | None = None
+
+
+def is_signed(token: str) -> bool:
+    return bool(token) and token.startswith(VERSION + ".")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+class QRTokenSigner:
+    def __init__(self, keys: dict[str, str | bytes], active_kid: str | None = None):
+        if not keys:
+            raise ValueError("at least one signing key is required")
+        self._keys = {kid: k.encode() if isinstance(k, str) else k for kid, k in keys.items()}
+        for kid in self._keys:
+            if not kid or "." in kid:
+                raise ValueError(f"invalid key id: {kid!r}")
+        self.active_kid = active_kid or next(iter(self._keys))
+        if self.active_kid not in self._keys:
+            raise ValueError(f"active key id {self.active_kid!r} is not configured")
+
+    def _sig(self, key: bytes, payload: str) -> str:
+        return _b64(hmac.new(key, payload.encode("ascii"), hashlib.sha256).digest()[:SIG_BYTES])
+
+    def sign(self, booking_id: int, expires_at: datetime) -> str:
+        payload = f"{VERSION}.{self.active_kid}.{int(booking_id)}.{int(expires_at.timestamp())}"
+        return f"{payload}.{self._sig(self._keys[self.active_kid], payload)}"
+
+    def verify(self, token: str, now: datetime | None = None) -> TokenCheck:
+        """Check signature and expiry; never touches the database."""
+        parts = token.split(".") if token else []
+        if len(parts) != 5 or parts[0] != VERSION:
+            return TokenCheck(False, "invalid")
+        _, kid, booking_id, expires, sig = parts
+        key = self._keys.get(kid)
+        if key is None or not booking_id.isdigit() or not expires.isdigit():
+            return TokenCheck(False, "invalid")
+        if not hmac.compare_digest(sig, self._sig(key, token[: -len(sig) - 1])):
+            return TokenCheck(False, "invalid")
+        expires_at = datetime.fromtimestamp(int(expires))
+        if (now or datetime.now()) > expires_at:
+            return TokenCheck(False, "expired", int(booking_id), expires_at)
+        return TokenCheck(True, "ok", int(booking_id), expires_at)
+
+
+def parse_keys(spec: str) -> dict[str, str]:
+    """'k2:secret,k1:old' -> {'k2': 'secret', 'k1': 'old'}"""
+    keys = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, sep, secret = item.partition(":")
+        if not sep or not secret:
+            raise ValueError(f"QR_SIGNING_KEYS entry must be kid:secret, got {item!r}")
+        keys[kid.strip()] = secret.strip()
+    return keys
+
+
+def signer_from_env() -> QRTokenSigner | None:
+    """Signer configured from QR_SIGNING_KEYS / QR_ACTIVE_KID, or None if unset (legacy random tokens)."""
+    from config.database import load_env
+    load_env()
+    keys = parse_keys(os.getenv("QR_SIGNING_KEYS", ""))
+    if not keys:
+        return None
+    return QRTokenSigner(keys, os.getenv("QR_ACTIVE_KID") or None)
@@ -1,5 +1,5 @@
 # utils/qrcode_utils.py
-import os, re, qrcode, qrcode_terminal
+import os, re
 
 def _safe(name: str) -> str:
     return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
@@ -7,11 +7,14 @@ def _safe(name: str) -> str:
 def print_qr_ascii(token: str, outdir: str = "qrcodes", filename: str | None = None, show_ascii: bool = True) -> str:
     """
     Save a QR PNG and (optionally) print ASCII in terminal.
+    qrcode (and PIL behind it) is only imported when a QR is actually rendered.
     """
+    import qrcode
     os.makedirs(outdir, exist_ok=True)
     filename = filename or _safe(f"{token}.png")
     path = os.path.join(outdir, filename)
     qrcode.make(token).save(path)     # PNG generation
     if show_ascii:
+        import qrcode_terminal
         qrcode_terminal.draw(token)   # ASCII in one call
     return path
@@ -0,0 +1,125 @@
+# utils/scheduler.py
+"""
+Minimal in-process periodic job scheduler.
+
+    sched = Scheduler()
+    sched.add("purge_sessions", 60, SessionManager.purge_expired)
+    sched.start()            # daemon thread; or call run_pending() from your own loop
+
+A job returns the number of rows/items it touched (or None). Per job the
+scheduler records runs, last duration, last/total rows, skips and errors.
+
+Overlap protection is two-level:
+  - in-process: a non-blocking per-job lock, so a slow run is never started again
+    while still in progress (it is counted as skipped instead);
+  - across workers: an optional `guard(name)` context manager that yields True when
+    this worker may run the job (e.g. MySQL GET_LOCK, see HousekeepingService.db_lock).
+"""
+import threading
+import time
+from contextlib import nullcontext
+
+
+class Job:
+    __slots__ = ("name", "interval", "fn", "guarded", "next_run", "lock",
+                 "runs", "skipped", "errors", "last_duration_ms", "last_rows",
+                 "total_rows", "last_error", "last_run_at")
+
+    def __init__(self, name: str, interval: float, fn, guarded: bool = True):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.guarded = guarded
+        self.next_run = 0.0
+        self.lock = threading.Lock()
+        self.runs = self.skipped = self.errors = 0
+        self.last_duration_ms = None
+        self.last_rows = None
+        self.total_rows = 0
+        self.last_error = None
+        self.last_run_at = None
+
+    def stats(self) -> dict:
+        return {
+            "job": self.name, "interval_s": self.interval, "runs": self.runs,
+            "skipped": self.skipped, "errors": self.errors,
+            "last_duration_ms": self.last_duration_ms, "last_rows": self.last_rows,
+            "total_rows": self.total_rows, "last_error": self.last_error,
+            "last_run_at": self.last_run_at,
+        }
+
+
+class Scheduler:
+    def __init__(self, guard=None, clock=time.monotonic):
+        self._jobs: dict[str, Job] = {}
+        self._guard = guard
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, name: str, interval: float, fn, run_now: bool = True, guarded: bool = True):
+        """guarded=False skips the cross-worker guard (jobs on per-process state)."""
+        job = Job(name, interval, fn, guarded)
+        job.next_run = self._clock() if run_now else self._clock() + interval
+        self._jobs[name] = job
+        return job
+
+    def run_job(self, name: str) -> dict:
+        """Run one job now (if not already running here or on another worker)."""
+        job = self._jobs[name]
+        if not job.lock.acquire(blocking=False):
+            job.skipped += 1
+            return {"job": name, "ran": False, "reason": "already running"}
+        try:
+            guard = self._guard(name) if self._guard and job.guarded else nullcontext(True)
+            with guard as acquired:
+                if not acquired:
+                    job.skipped += 1
+                    return {"job": name, "ran": False, "reason": "locked by another worker"}
+                started = time.perf_counter()
+                job.last_run_at = time.strftime("%Y-%m-%d %H:%M:%S")
+                try:
+                    rows = job.fn()
+                    job.last_error = None
+                except Exception as e:
+                    rows = None
+                    job.errors += 1
+                    job.last_error = str(e)
+                job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                job.runs += 1
+                job.last_rows = rows
+                job.total_rows += rows or 0
+                return {"job": name, "ran": True, "rows": rows,
+                        "duration_ms": job.last_duration_ms, "error": job.last_error}
+        finally:
+            job.next_run = self._clock() + job.interval
+            job.lock.release()
+
+    def run_pending(self) -> list[dict]:
+        now = self._clock()
+        return [self.run_job(job.name) for job in list(self._jobs.values()) if job.next_run <= now]
+
+    def run_all(self) -> list[dict]:
+        return [self.run_job(name) for name in list(self._jobs)]
+
+    def report(self) -> list[dict]:
+        return [job.stats() for job in self._jobs.values()]
+
+    # ---------- background thread ----------
+    def _loop(self, tick: float):
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(tick)
+
+    def start(self, tick: float = 1.0):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(tick,), name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
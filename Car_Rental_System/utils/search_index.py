@@ -0,0 +1,198 @@
+# utils/search_index.py
+"""
+Small in-memory text index used for admin/customer search.
+
+Documents are tokenized into lowercase runs of letters or of digits
+("carl.smith42@example.com" -> carl, smith, 42, example, com). The index is built over the token *vocabulary*,
+which is much smaller than the number of documents:
+  - postings:   token -> {doc_id}
+  - sorted vocabulary for prefix lookups (bisect)
+  - trigrams:   gram  -> {token} for substring / typo-tolerant matches
+
+Scoring per query token is the best match among a document's tokens
+(exact 3.0, prefix 2.0, trigram 1.5 * overlap); every query token must match,
+results are ranked by the sum and the top-k is taken with a heap.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+_WORDS = re.compile(r"[a-z]+|[0-9]+")
+
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+TRIGRAM_SCORE = 1.5
+TRIGRAM_MIN_OVERLAP = 0.6
+
+
+def tokenize(*fields) -> tuple[str, ...]:
+    tokens = []
+    for field in fields:
+        if not field:
+            continue
+        tokens.extend(_WORDS.findall(str(field).lower()))
+    return tuple(dict.fromkeys(tokens))   # unique, order kept
+
+
+def trigrams(token: str) -> set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: dict[int, tuple[tuple[str, ...], object]] = {}   # id -> (tokens, payload)
+        self._postings: dict[str, set[int]] = {}
+        self._vocab: list[str] = []
+        self._grams: dict[str, set[str]] = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- maintenance ----------
+    def add(self, doc_id: int, *fields, payload=None):
+        """Insert or replace a document."""
+        with self._lock:
+            for tok in self._add_locked(doc_id, tokenize(*fields), payload):
+                insort(self._vocab, tok)
+
+    def add_many(self, docs):
+        """Bulk load [(doc_id, (field, ...), payload), ...]; sorts the vocabulary once."""
+        with self._lock:
+            new_tokens = []
+            for doc_id, fields, payload in docs:
+                new_tokens.extend(self._add_locked(doc_id, tokenize(*fields), payload))
+            if new_tokens:
+                self._vocab.extend(new_tokens)
+                self._vocab.sort()
+
+    def _add_locked(self, doc_id, tokens, payload) -> list[str]:
+        """Index one document; returns tokens new to the vocabulary (not yet in _vocab)."""
+        if doc_id in self._docs:
+            self._remove_tokens(doc_id, self._docs[doc_id][0])
+        self._docs[doc_id] = (tokens, payload)
+        new_tokens = []
+        for tok in tokens:
+            docs = self._postings.get(tok)
+            if docs is None:
+                self._postings[tok] = {doc_id}
+                new_tokens.append(tok)
+                for g in trigrams(tok):
+                    self._grams.setdefault(g, set()).add(tok)
+            else:
+                docs.add(doc_id)
+        return new_tokens
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            entry = self._docs.pop(doc_id, None)
+            if entry:
+                self._remove_tokens(doc_id, entry[0])
+
+    def get(self, doc_id: int):
+        """(tokens, payload) for a document, or None."""
+        return self._docs.get(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._vocab.clear()
+            self._grams.clear()
+
+    def _remove_tokens(self, doc_id, tokens):
+        for tok in tokens:
+            docs = self._postings.get(tok)
+            if docs is None:
+                continue
+            docs.discard(doc_id)
+            if not docs:
+                del self._postings[tok]
+                i = bisect_left(self._vocab, tok)
+                if i < len(self._vocab) and self._vocab[i] == tok:
+                    del self._vocab[i]
+                for g in trigrams(tok):
+                    toks = self._grams.get(g)
+                    if toks is not None:
+                        toks.discard(tok)
+                        if not toks:
+                            del self._grams[g]
+
+    # ---------- querying ----------
+    def _token_matches(self, qt: str) -> dict[str, float]:
+        """Vocabulary tokens matching one query token, with their score."""
+        matches: dict[str, float] = {}
+        i = bisect_left(self._vocab, qt)
+        while i < len(self._vocab) and self._vocab[i].startswith(qt):
+            tok = self._vocab[i]
+            matches[tok] = EXACT_SCORE if tok == qt else PREFIX_SCORE
+            i += 1
+        grams = trigrams(qt)
+        if grams:
+            counts = Counter()
+            for g in grams:
+                counts.update(self._grams.get(g, ()))
+            for tok, hit in counts.items():
+                overlap = hit / len(grams)
+                if overlap >= TRIGRAM_MIN_OVERLAP and tok not in matches:
+                    matches[tok] = TRIGRAM_SCORE * overlap
+        return matches
+
+    def _score_groups(self, qt: str) -> dict[float, set[int]]:
+        """{score: {doc_id}} for one query token; each doc only under its best score."""
+        groups: dict[float, set[int]] = {}
+        seen: set[int] = set()
+        for tok, score in sorted(self._token_matches(qt).items(), key=lambda m: -m[1]):
+            new = self._postings[tok] - seen
+            if new:
+                seen |= new
+                groups.setdefault(score, set()).update(new)
+        return groups
+
+    def search(self, query: str, k: int = 20, where=None) -> list[tuple[int, float]]:
+        """
+        Top-k [(doc_id, score)] for the query, best first (ties by doc_id).
+        `where(payload) -> bool` filters documents (e.g. role == 'customer');
+        it is only evaluated on candidates in rank order until k are found.
+        """
+        q_tokens = tokenize(query)
+        if not q_tokens or k <= 0:
+            return []
+        with self._lock:
+            per_token = [self._score_groups(qt) for qt in q_tokens]
+            if len(per_token) == 1:
+                groups = per_token[0]
+            else:
+                # every query token must match: intersect, summing scores
+                scored = []
+                for groups_qt in per_token:
+                    d: dict[int, float] = {}
+                    for score, ids in groups_qt.items():
+                        d.update(dict.fromkeys(ids, score))
+                    scored.append(d)
+                scored.sort(key=len)
+                totals = scored[0]
+                for other in scored[1:]:
+                    totals = {doc: s + other[doc] for doc, s in totals.items() if doc in other}
+                groups = {}
+                for doc, s in totals.items():
+                    groups.setdefault(s, set()).add(doc)
+
+            top: list[tuple[int, float]] = []
+            docs = self._docs
+            for score in sorted(groups, reverse=True):
+                ids = groups[score]
+                need = k - len(top)
+                if where is None:
+                    top.extend((doc, score) for doc in heapq.nsmallest(need, ids))
+                else:
+                    for doc in sorted(ids):
+                        if where(docs[doc][1]):
+                            top.append((doc, score))
+                            if len(top) == k:
+                                break
+                if len(top) >= k:
+                    break
+        return top
@@ -25,3 +25,12 @@ class SessionManager:
     @classmethod
     def invalidate(cls, token: str) -> None:
         cls._sessions.pop(token, None)
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        """Drop expired sessions; returns how many were removed."""
+        now = time.time()
+        expired = [t for t, data in list(cls._sessions.items()) if now > data["exp"]]
+        for t in expired:
+            cls._sessions.pop(t, None)
+        return len(expired)
@@ -0,0 +1,61 @@
+# utils/streaming.py
+"""
+Row streaming for large listings.
+
+open_stream() runs the query immediately (so SQL/connection errors surface at
+call time) and returns a generator that pulls rows in fixed-size batches with
+cursor.fetchmany(). mysql.connector's default cursor is unbuffered, so rows stay
+on the server socket until fetched and peak memory is one batch, whatever the
+result size. The generator owns the connection and closes it when exhausted,
+when .close() is called, or when it is garbage collected. Callers that may stop
+early (a pager) should close() it themselves rather than wait for GC; any
+unread rows are then discarded before the connection is released.
+"""
+DEFAULT_BATCH_SIZE = 500
+
+
+def open_stream(conn, sql: str, params=(), record_cls=None, batch_size: int = DEFAULT_BATCH_SIZE):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+    except Exception:
+        _release(conn, cur)
+        raise
+    return _rows(conn, cur, record_cls, batch_size)
+
+
+def _rows(conn, cur, record_cls, batch_size):
+    try:
+        index = None
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            if record_cls is None:
+                yield from batch
+                continue
+            if index is None:
+                index = record_cls.index_for(cur)
+            for row in batch:
+                yield record_cls(row, index)
+    finally:
+        _release(conn, cur)
+
+
+def _release(conn, cur):
+    try:
+        cur.close()
+    except Exception:
+        # unbuffered cursor stopped early ("Unread result found"): read and drop
+        # the rest, so a pooled connection goes back without a pending result
+        consume = getattr(conn, "consume_results", None)
+        try:
+            if consume is not None:
+                consume()
+            cur.close()
+        except Exception:
+            pass
+    try:
+        conn.close()
+    except Exception:
+        pass
@@ -0,0 +1,163 @@
+# utils/throttle.py
+"""
+Token-bucket throttling for login attempts.
+
+A bucket holds up to `capacity` tokens and refills at `per_second`. Each
+attempt takes one token, and an attempt that finds the bucket empty is refused
+with a retry-after. LoginThrottle keeps two buckets: one per account (the
+normalised email, whether or not the account exists) and one per client (a
+terminal or address, see terminal_client_id). A refused attempt never reaches bcrypt.
+
+Backends:
+  MemoryBuckets  per process. Buckets live in a bounded TTLCache and drop out
+                 once they would be full again, so an idle key costs nothing.
+                 Under memory pressure the least recently used bucket is
+                 evicted, which only ever forgives, never blocks.
+  DBBuckets      shared by every process through the login_throttle table
+                 (migration 0011). One row lock per attempt. If the database
+                 cannot be reached it falls back to the memory buckets.
+"""
+import hashlib
+import os
+import socket
+import threading
+import time
+from contextlib import closing
+from typing import NamedTuple
+
+from utils.ttl_cache import TTLCache
+
+
+class TokenBucket(NamedTuple):
+    capacity: float
+    per_second: float
+
+    @property
+    def full_after(self) -> float:
+        """Seconds for an empty bucket to refill completely."""
+        return self.capacity / self.per_second
+
+
+class MemoryBuckets:
+    def __init__(self, maxsize: int = 100_000, clock=time.monotonic):
+        self._clock = clock
+        self._buckets = TTLCache(maxsize=maxsize, clock=clock)   # key -> (tokens, stamp)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, bucket: TokenBucket, cost: float = 1.0) -> float:
+        """Take `cost` tokens: 0.0 if allowed, else seconds until they are available."""
+        with self._lock:
+            now = self._clock()
+            tokens, stamp = self._buckets.get(key, (bucket.capacity, now))
+            tokens = min(bucket.capacity, tokens + (now - stamp) * bucket.per_second)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / bucket.per_second
+            # a bucket that has had time to refill is the same as no bucket
+            self._buckets.set(key, (tokens, now), ttl=(bucket.capacity - tokens) / bucket.per_second)
+            return wait
+
+    def purge_expired(self) -> int:
+        return self._buckets.purge_expired()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class DBBuckets:
+    def __init__(self, db, fallback: MemoryBuckets | None = None):
+        self.db = db
+        self.fallback = fallback or MemoryBuckets()
+
+    def take(self, key: str, bucket: TokenBucket, cost: float = 1.0) -> float:
+        # keys are hashed: emails are caller-supplied and may be arbitrarily long
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        try:
+            conn = self.db.get_connection()
+        except Exception:
+            conn = None
+        if not conn or not conn.is_connected():
+            return self.fallback.take(key, bucket, cost)
+        try:
+            with closing(conn), closing(conn.cursor()) as cur:
+                conn.start_transaction()
+                try:
+                    cur.execute(
+                        """
+                        SELECT tokens, TIMESTAMPDIFF(MICROSECOND, updated_at, NOW(3))
+                        FROM login_throttle WHERE bucket_key=%s FOR UPDATE
+                        """,
+                        (digest,),
+                    )
+                    row = cur.fetchone()
+                    tokens = bucket.capacity if row is None else \
+                        min(bucket.capacity, float(row[0]) + row[1] / 1e6 * bucket.per_second)
+                    wait = 0.0
+                    if tokens >= cost:
+                        tokens -= cost
+                    else:
+                        wait = (cost - tokens) / bucket.per_second
+                    cur.execute(
+                        """
+                        INSERT INTO login_throttle (bucket_key, tokens, updated_at)
+                        VALUES (%s, %s, NOW(3))
+                        ON DUPLICATE KEY UPDATE tokens=VALUES(tokens), updated_at=VALUES(updated_at)
+                        """,
+                        (digest, tokens),
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                return wait
+        except Exception:
+            return self.fallback.take(key, bucket, cost)
+
+    def purge_expired(self) -> int:
+        return self.fallback.purge_expired()
+
+
+def terminal_client_id() -> str | None:
+    """
+    CAR_RENTAL_CLIENT_ID, else host:tty of the terminal on stdin, so each
+    terminal gets its own client bucket (also across processes with DBBuckets).
+    None when there is neither, e.g. stdin is a pipe or on Windows.
+    """
+    explicit = os.getenv("CAR_RENTAL_CLIENT_ID")
+    if explicit:
+        return explicit
+    try:
+        if os.isatty(0):
+            return f"{socket.gethostname()}:{os.ttyname(0)}"
+    except (AttributeError, OSError):        # no os.ttyname on Windows
+        pass
+    return None
+
+
+class LoginThrottle:
+    ACCOUNT = TokenBucket(capacity=5, per_second=1 / 30)   # 5 quick tries, then one per 30 s
+    CLIENT = TokenBucket(capacity=30, per_second=1.0)      # a burst of 30, then one per second
+
+    def __init__(self, backend=None, account: TokenBucket = ACCOUNT, client: TokenBucket = CLIENT):
+        self.backend = backend or MemoryBuckets()
+        self.account = account
+        self.client = client
+
+    def check(self, email: str, client: str | None) -> tuple[str, float] | None:
+        """
+        None if the attempt may proceed, else (scope, retry_after seconds).
+        Without a client id only the account bucket applies.
+        """
+        if client:
+            wait = self.backend.take(f"client:{client}", self.client)
+            if wait:
+                return "client", wait
+        wait = self.backend.take(f"account:{(email or '').strip().lower()}", self.account)
+        if wait:
+            return "account", wait
+        return None
+
+    def purge_expired(self) -> int:
+        return self.backend.purge_expired()
@@ -0,0 +1,100 @@
+import pytest
+
+try:
+    from services.archive_service import ARCHIVE_TABLES, ArchiveService
+    from services.booking_service import BookingService
+except Exception as e:
+    pytest.skip(f"services.archive_service not importable: {e}", allow_module_level=True)
+
+class _ArchiveDB:
+    """Fake connection: hands out `batches` of candidate ids and records every statement."""
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.statements = []
+        self.commits = 0
+
+    def get_connection(self):
+        db = self
+
+        class _Cur:
+            rowcount = 0
+            description = [("booking_id",)]
+
+            def __init__(self):
+                self._rows = []
+
+            def execute(self, sql, params=()):
+                sql = " ".join(sql.split())
+                db.statements.append((sql, tuple(params)))
+                if "information_schema.columns" in sql:
+                    self._rows = [("booking_id",), ("status",)]
+                elif sql.startswith("SELECT booking_id FROM bookings"):
+                    self._rows = [(i,) for i in (db.batches.pop(0) if db.batches else [])]
+                else:
+                    self._rows = []
+
+            def fetchall(self):
+                return self._rows
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def start_transaction(self):
+                pass
+
+            def commit(self):
+                db.commits += 1
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+        return _Conn()
+
+    get_read_connection = get_connection
+
+def test_archiver_moves_each_chunk_in_one_transaction():
+    db = _ArchiveDB([[1, 2], [3]])
+    assert ArchiveService(db, chunk_size=2).archive_bookings(older_than_days=90) == 3
+    assert db.commits == 2
+    select = next(p for s, p in db.statements if s.startswith("SELECT booking_id FROM bookings"))
+    assert select == ("completed", "rejected", "cancelled", 90, 90, 2)
+    first_chunk = [s for s, p in db.statements if p == (1, 2)]
+    assert [s.split(" (")[0] for s in first_chunk] == [
+        *(f"INSERT INTO {cold}" for _, cold in ARCHIVE_TABLES),
+        "DELETE FROM booking_qr_codes WHERE booking_id IN",
+        "DELETE FROM payments WHERE booking_id IN",
+        "DELETE FROM booking_day_slots WHERE booking_id IN",
+        "DELETE FROM bookings WHERE booking_id IN",
+    ]
+    assert "INSERT INTO bookings_archive (`booking_id`, `status`) SELECT `booking_id`, `status` FROM bookings" \
+        in first_chunk[0]
+
+def test_nothing_to_archive_is_one_empty_chunk():
+    db = _ArchiveDB([])
+    assert ArchiveService(db).archive_bookings() == 0
+    assert not any(s.startswith(("INSERT", "DELETE")) for s, _ in db.statements)
+
+def _user_query(status):
+    db = _ArchiveDB([])
+    BookingService(db).list_user_bookings(2, status=status)
+    return db.statements[-1]
+
+def test_user_history_reads_hot_and_archived_summaries():
+    sql, params = _user_query(None)
+    assert "FROM booking_summaries b" in sql and "FROM booking_summaries_archive b" in sql
+    assert "UNION ALL" in sql and sql.endswith("ORDER BY created_at DESC") and params == (2, 2)
+    sql, params = _user_query("completed")
+    assert "booking_summaries_archive" in sql and params == (2, "completed", 2, "completed")
+
+def test_live_statuses_skip_the_archive():
+    sql, params = _user_query("approved")
+    assert "archive" not in sql and params == (2, "approved")
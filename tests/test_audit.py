@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+try:
+    from services.audit_service import AuditService
+except Exception as e:
+    pytest.skip(f"services.audit_service not importable: {e}", allow_module_level=True)
+
+class _HistoryDB:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def get_connection(self):
+        db = self
+
+        class _Cur:
+            def executemany(self, sql, rows):
+                if db.fail:
+                    raise RuntimeError("lost connection")
+                db.batches.append(list(rows))
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+        return _Conn()
+
+@pytest.fixture
+def history():
+    db = _HistoryDB()
+    AuditService.shutdown()
+    AuditService._buffer.clear()
+    AuditService.configure(db, flush_rows=1000, flush_interval_ms=60_000)
+    yield db
+    AuditService.shutdown()
+    AuditService._buffer.clear()
+    AuditService.configure(None, flush_rows=200, flush_interval_ms=500)
+
+def test_records_are_buffered_and_flushed_in_one_batch(history):
+    for booking_id in range(5):
+        AuditService.record(booking_id, "approved", "active", "pickup", 7)
+    assert history.batches == [] and AuditService.pending() == 5    # no round-trip per record
+    assert AuditService.flush() == 5
+    assert len(history.batches) == 1 and history.batches[0][2][:5] == (2, "approved", "active", "pickup", 7)
+
+def test_failed_flush_keeps_rows_in_order(history):
+    AuditService.record(1, None, "pending", "create", 3)
+    history.fail = True
+    assert AuditService.flush() == 0
+    AuditService.record(1, "pending", "approved", "approve", 1)
+    history.fail = False
+    AuditService.flush()
+    assert [r[3] for r in history.batches[0]] == ["create", "approve"]
+
+def test_row_threshold_wakes_flusher_and_shutdown_drains(history):
+    AuditService.configure(history, flush_rows=3, flush_interval_ms=60_000)
+    for i in range(3):
+        AuditService.record(i, "active", "completed", "return", 7)
+    deadline = time.monotonic() + 2
+    while sum(len(b) for b in history.batches) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sum(len(b) for b in history.batches) == 3
+    AuditService.record(9, "pending", "cancelled", "expire")
+    AuditService.shutdown()
+    assert sum(len(b) for b in history.batches) == 4
@@ -0,0 +1,141 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+try:
+    from controllers.batch_controller import BatchController
+except Exception as e:
+    pytest.skip(f"controllers.batch_controller not importable: {e}", allow_module_level=True)
+
+class _Bookings:
+    def __init__(self):
+        self.calls = []
+        self.keys = []
+
+    def approve_booking(self, admin_id, booking_id, approve=True, idempotency_key=None):
+        print("noise from a service")                      # must not reach the JSON stream
+        self.calls.append((admin_id, booking_id, approve))
+        self.keys.append(idempotency_key)
+        if booking_id == 404:
+            return {"success": False, "message": "Booking not found"}
+        return {"success": True, "message": "Booking approved", "total_cost": Decimal("90.00")}
+
+class _Cars:
+    def add_car(self, **fields):
+        return {"success": True, "message": "Car added", "fields": fields}
+
+def _controller():
+    ctl = BatchController(db=None, user={"user_id": 1, "role": "admin"})
+    ctl.booking_service, ctl.car_service = _Bookings(), _Cars()
+    return ctl
+
+SCRIPT = """
+# morning queue
+approve 41 42
+reject 404
+add-car brand=Toyota "model=Corolla Cross" daily_rate=45 year=2021 available_now=y
+frobnicate 1
+"""
+
+def test_batch_emits_one_json_line_per_command(capsys):
+    ctl, out = _controller(), io.StringIO()
+    summary = ctl.run(SCRIPT.splitlines(), out=out)
+    lines = [json.loads(l) for l in out.getvalue().splitlines()]
+    assert summary == {"commands": 4, "failed": 2}
+    assert [l["line"] for l in lines] == [3, 4, 5, 6]
+    assert lines[0]["success"] and lines[0]["message"] == "2/2 done"
+    assert lines[0]["results"][0]["total_cost"] == "90.00"
+    assert lines[1] == {**lines[1], "success": False, "message": "Booking not found", "booking_id": 404}
+    assert lines[2]["fields"] == {"brand": "Toyota", "model": "Corolla Cross", "daily_rate": 45.0,
+                                  "year": 2021, "available_now": True}
+    assert lines[3]["message"] == "Unknown command 'frobnicate'"
+    assert all(l["ms"] >= 0 for l in lines)
+    assert "noise" in capsys.readouterr().err
+    assert ctl.booking_service.calls == [(1, 41, True), (1, 42, True), (1, 404, False)]
+
+def test_stop_on_error_and_bad_arguments():
+    ctl, out = _controller(), io.StringIO()
+    summary = ctl.run(["approve x", "approve 41"], out=out, stop_on_error=True)
+    assert summary == {"commands": 1, "failed": 1}
+    assert "invalid literal" in json.loads(out.getvalue())["message"]
+
+def test_key_option_becomes_per_booking_idempotency_key():
+    ctl, out = _controller(), io.StringIO()
+    ctl.run(["approve 41 42 key=run-7", "approve 43"], out=out)
+    assert ctl.booking_service.keys == ["run-7:41", "run-7:42", None]
+
+class _QuietOutbox:
+    """A primary that is always up and whose outbox is always empty; flags each poll."""
+    def __init__(self, polled):
+        self.polled = polled
+
+    def is_connected(self):
+        return True
+
+    def cursor(self):
+        polled = self.polled
+
+        class _Cur:
+            def execute(self, sql, params=()):
+                if "outbox_events" in sql:
+                    polled.set()
+
+            def fetchall(self):
+                return []
+
+            def close(self):
+                pass
+        return _Cur()
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_run_batch_stdout_stays_json_with_dispatcher_live(monkeypatch, capsys):
+    import threading
+
+    from config.database import DatabaseConnection
+    from controllers import batch_controller
+    from services.events import OutboxDispatcher
+
+    polled = threading.Event()
+
+    def script():
+        for line in ("approve 41", "approve 42", "reject 404"):
+            polled.clear()
+            assert polled.wait(2)              # the dispatcher polls (and connects) between commands
+            yield line
+
+    monkeypatch.setattr(batch_controller, "DatabaseConnection",
+                        lambda **kw: DatabaseConnection(connect=lambda dsn: _QuietOutbox(polled), **kw))
+    monkeypatch.setattr(batch_controller, "BatchController", lambda db, user: _controller())
+    monkeypatch.setattr(batch_controller.UserService, "login_user",
+                        lambda self, email, password: {"success": True, "role": "admin", "user": {"user_id": 1}})
+    monkeypatch.setattr(batch_controller.AuditService, "configure", classmethod(lambda cls, db=None: None))
+    monkeypatch.setattr(OutboxDispatcher, "MAX_IDLE_SECONDS", 0.01)
+    monkeypatch.setenv("CAR_RENTAL_PASSWORD", "pw")
+    monkeypatch.setattr("sys.stdin", script())
+
+    assert batch_controller.run_batch(["-", "--email", "admin@example.com"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(l)["cmd"] for l in lines] == ["approve", "approve", "reject"]
+
+def test_run_batch_reports_a_missing_file_as_json(monkeypatch, capsys, tmp_path):
+    from controllers import batch_controller
+
+    monkeypatch.setattr(batch_controller.UserService, "login_user",
+                        lambda self, email, password: {"success": True, "role": "admin", "user": {"user_id": 1}})
+    monkeypatch.setenv("CAR_RENTAL_PASSWORD", "pw")
+    assert batch_controller.run_batch([str(tmp_path / "nope.txt"), "--email", "admin@example.com"]) == 2
+    line = json.loads(capsys.readouterr().out)
+    assert not line["success"] and line["message"].startswith("Cannot read")
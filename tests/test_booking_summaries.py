@@ -0,0 +1,72 @@
+import pytest
+
+try:
+    from services.booking_service import BookingService
+    from services.booking_summaries import SUMMARY_COLUMNS, rebuild, refresh_summaries
+except Exception as e:
+    pytest.skip(f"services.booking_summaries not importable: {e}", allow_module_level=True)
+
+class _RecordingDB:
+    """Fake connection that records statements; SELECT MIN/MAX answers `bounds`."""
+    def __init__(self, bounds=(None, None)):
+        self.bounds = bounds
+        self.statements = []
+
+    def get_connection(self):
+        db = self
+
+        class _Cur:
+            rowcount = 0
+            description = [(c,) for c in SUMMARY_COLUMNS]
+
+            def execute(self, sql, params=()):
+                db.statements.append((" ".join(sql.split()), tuple(params)))
+
+            def fetchone(self):
+                return db.bounds
+
+            def fetchall(self):
+                return []
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+        return _Conn()
+
+    get_read_connection = get_connection
+
+def test_refresh_is_one_upsert_for_many_bookings():
+    db = _RecordingDB()
+    refresh_summaries(db.get_connection().cursor(), 3, 5)
+    refresh_summaries(db.get_connection().cursor())                 # nothing to do
+    (sql, params), = db.statements
+    assert sql.startswith("INSERT INTO booking_summaries") and "ON DUPLICATE KEY UPDATE" in sql
+    assert "b.booking_id IN (%s, %s)" in sql and params == (3, 5)
+
+def test_views_read_the_projection_only():
+    db = _RecordingDB()
+    svc = BookingService(db)
+    svc.list_user_bookings(2, status="pending")
+    svc.list_admin_bookings(status="approved")
+    selects = [sql for sql, _ in db.statements]
+    assert all("FROM booking_summaries" in sql and "JOIN" not in sql for sql in selects)
+    assert "has_qr" in selects[0] and "ORDER BY b.created_at DESC" in selects[0]
+
+def test_rebuild_walks_booking_id_ranges():
+    db = _RecordingDB(bounds=(1, 12))
+    assert rebuild(db, chunk_size=5)["success"]
+    ranges = [params for sql, params in db.statements if "BETWEEN" in sql]
+    assert ranges == [(1, 5), (6, 10), (11, 15)]
+    assert db.statements[-1][0].startswith("DELETE s FROM booking_summaries")
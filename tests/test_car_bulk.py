@@ -0,0 +1,90 @@
+import pytest
+
+try:
+    from services.car_service import CarService
+except Exception as e:
+    pytest.skip(f"services.car_service not importable: {e}", allow_module_level=True)
+
+class _RecordingDB:
+    """Fake connection: records statements, UPDATE reports `rowcount` changed rows."""
+    def __init__(self, rowcount=3, preview=()):
+        self.statements = []
+        self.commits = 0
+        self.rowcount = rowcount
+        self.preview = list(preview)
+
+    def get_connection(self):
+        db = self
+
+        class _Cur:
+            rowcount = 0
+            description = [("car_id",), ("brand",), ("model",), ("daily_rate",), ("new_daily_rate",)]
+
+            def execute(self, sql, params=()):
+                db.statements.append((" ".join(sql.split()), tuple(params)))
+                self.rowcount = db.rowcount
+
+            def fetchall(self):
+                return db.preview
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def commit(self):
+                db.commits += 1
+
+            def close(self):
+                pass
+        return _Conn()
+
+def test_reprice_is_one_update_with_change_guard():
+    db = _RecordingDB(rowcount=4)
+    res = CarService(db).bulk_update_rates(percent=10, brand="Toyota", model="RAV4")
+    assert res == {"success": True, "dry_run": False, "affected": 4, "message": "4 car(s) updated"}
+    (sql, params), = db.statements
+    assert sql == ("UPDATE cars SET daily_rate = GREATEST(0, ROUND(daily_rate * (1 + %s / 100), 2)) "
+                   "WHERE brand = %s AND model = %s "
+                   "AND daily_rate <> GREATEST(0, ROUND(daily_rate * (1 + %s / 100), 2))")
+    assert params == ("10", "Toyota", "RAV4", "10") and db.commits == 1
+
+def test_dry_run_previews_with_the_same_filter_and_writes_nothing():
+    db = _RecordingDB(preview=[(7, "Toyota", "RAV4", 50, 55)])
+    res = CarService(db).bulk_update_rates(amount=5, car_ids=[7, 8], dry_run=True)
+    assert res["dry_run"] and res["message"] == "1 car(s) would change"
+    assert dict(res["cars"][0]) == {"car_id": 7, "brand": "Toyota", "model": "RAV4",
+                                    "daily_rate": 50, "new_daily_rate": 55}
+    (sql, params), = db.statements
+    assert sql.startswith("SELECT car_id, brand, model, daily_rate, GREATEST(0, daily_rate + %s) AS new_daily_rate")
+    assert "car_id IN (%s, %s)" in sql and params == ("5", 7, 8, "5")
+    assert db.commits == 0
+
+def test_period_limits_keep_min_below_max():
+    db = _RecordingDB()
+    CarService(db).bulk_set_period_limits(min_days=3, brand="Kia")
+    (sql, params), = db.statements
+    assert sql == ("UPDATE cars SET min_period_days = %s WHERE brand = %s "
+                   "AND (max_period_days IS NULL OR max_period_days >= %s)")
+    assert params == (3, "Kia", 3)
+    assert not CarService(db).bulk_set_period_limits(min_days=5, max_days=2, brand="Kia")["success"]
+
+def test_availability_only_touches_cars_that_change():
+    db = _RecordingDB()
+    CarService(db).bulk_set_availability(False, model="Civic")
+    (sql, params), = db.statements
+    assert sql == "UPDATE cars SET available_now = %s WHERE model = %s AND available_now <> %s"
+    assert params == (False, "Civic", False)
+
+def test_refuses_without_a_filter_or_with_both_amounts():
+    db = _RecordingDB()
+    svc = CarService(db)
+    assert svc.bulk_set_availability(True)["message"].startswith("Give a brand, model or car ids")
+    assert svc.bulk_update_rates(percent=5, amount=1, brand="Kia")["message"] == \
+        "Give exactly one of percent or amount"
+    assert db.statements == []
@@ -0,0 +1,203 @@
+import json
+from datetime import datetime
+
+import pytest
+
+try:
+    from services.events import BOOKING_APPROVED, BOOKING_CREATED, EventBus, OutboxDispatcher, record_event
+except Exception as e:
+    pytest.skip(f"services.events not importable: {e}", allow_module_level=True)
+
+class _Outbox:
+    """In-memory outbox_events table understanding the dispatcher's statements."""
+    def __init__(self):
+        self.rows = {}      # event_id -> dict
+
+    def get_connection(self):
+        outbox = self
+
+        class _Cur:
+            def execute(self, sql, params=()):
+                sql = " ".join(sql.split())
+                if sql.startswith("INSERT INTO outbox_events"):
+                    eid = len(outbox.rows) + 1
+                    outbox.rows[eid] = {"type": params[0], "agg": params[1], "payload": params[2],
+                                        "status": "pending", "attempts": 0, "due": True}
+                elif sql.startswith("SELECT event_id"):
+                    self._rows = [(eid, r["type"], r["agg"], r["payload"], datetime.now(), r["attempts"])
+                                  for eid, r in outbox.rows.items() if r["status"] == "pending" and r["due"]]
+                elif "attempts = attempts + 1" in sql:
+                    for eid in params[1:]:
+                        outbox.rows[eid]["attempts"] += 1
+                        outbox.rows[eid]["due"] = False          # leased
+                elif "status = 'done'" in sql:
+                    for eid in params:
+                        outbox.rows[eid]["status"] = "done"
+                else:                                             # failure: back to pending, later
+                    status, error, _backoff, eid = params
+                    outbox.rows[eid].update(status=status, error=error)
+
+            def fetchall(self):
+                return self._rows
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def start_transaction(self):
+                pass
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+        return _Conn()
+
+def test_record_event_rejects_unknown_types():
+    outbox = _Outbox()
+    cur = outbox.get_connection().cursor()
+    record_event(cur, BOOKING_CREATED, 5, {"total_cost": "10.00"})
+    assert json.loads(outbox.rows[1]["payload"]) == {"total_cost": "10.00"}
+    with pytest.raises(ValueError):
+        record_event(cur, "SomethingElse", 5)
+
+def test_dispatch_delivers_in_order_per_booking_and_retries_failures():
+    outbox = _Outbox()
+    cur = outbox.get_connection().cursor()
+    for booking_id in (1, 2, 1):
+        record_event(cur, BOOKING_APPROVED, booking_id, {"n": len(outbox.rows) + 1})
+
+    seen, flaky_calls = [], []
+    bus = EventBus()
+    bus.subscribe(BOOKING_APPROVED, lambda e: seen.append((e.booking_id, e.payload["n"])), name="log")
+
+    def flaky(e):
+        flaky_calls.append(e.event_id)
+        if e.booking_id == 2:
+            raise RuntimeError("downstream unavailable")
+    bus.subscribe(BOOKING_APPROVED, flaky)
+
+    res = OutboxDispatcher(bus, outbox).dispatch_once()
+    assert (res["claimed"], res["delivered"], res["failed"]) == (3, 2, 1)
+    assert [n for b, n in seen if b == 1] == [1, 3]            # booking order preserved
+    assert outbox.rows[2]["status"] == "pending" and "downstream" in outbox.rows[2]["error"]
+    assert outbox.rows[1]["status"] == outbox.rows[3]["status"] == "done"
+
+    outbox.rows[2]["due"] = True                               # backoff elapsed
+    dispatcher = OutboxDispatcher(bus, outbox)
+    dispatcher.dispatch_once()
+    assert flaky_calls.count(2) == 2                           # redelivered (at least once)
+    metrics = dispatcher.metrics()
+    assert metrics["flaky"]["failed"] == 1 and metrics["log"]["delivered"] == 1
+    assert metrics["log"]["max_lag_ms"] >= 0
+
+def test_drain_delivers_everything_due_then_stops():
+    outbox = _Outbox()
+    cur = outbox.get_connection().cursor()
+    for booking_id in range(1, 6):
+        record_event(cur, BOOKING_APPROVED, booking_id, {})
+    bus = EventBus()
+    bus.subscribe(BOOKING_APPROVED, lambda e: None, name="ok")
+    res = OutboxDispatcher(bus, outbox, batch_size=2).drain()
+    assert (res["claimed"], res["delivered"], res["failed"]) == (5, 5, 0)
+    assert {r["status"] for r in outbox.rows.values()} == {"done"}
+
+def test_idle_loop_backs_off_to_max_idle():
+    class _Stop:
+        """Records each wait; stops the loop after a few."""
+        def __init__(self):
+            self.waits = []
+
+        def is_set(self):
+            return len(self.waits) >= 6
+
+        def wait(self, seconds):
+            self.waits.append(seconds)
+
+    dispatcher = OutboxDispatcher(EventBus(), _Outbox(), workers=1)
+    dispatcher._stop = _Stop()
+    dispatcher._loop(0.5)
+    assert dispatcher._stop.waits == [1.0, 2.0, 4.0, 5.0, 5.0, 5.0]
+
+class _Payments:
+    """payments table (one row per booking) for the payment handler and mark_paid; QR lookups fail."""
+    def __init__(self):
+        self.rows = {}      # booking_id -> {"amount", "status"}
+
+    def get_connection(self):
+        payments = self
+
+        class _Cur:
+            rowcount = 0
+
+            def execute(self, sql, params=()):
+                sql = " ".join(sql.split())
+                self._row = None
+                if sql.startswith("INSERT INTO payments"):
+                    booking_id, amount, _method = params
+                    row = payments.rows.get(booking_id)
+                    if row is None:
+                        payments.rows[booking_id] = {"amount": amount, "status": "pending"}
+                    elif "IF(payment_status = 'paid'" in sql and row["status"] != "paid":
+                        row.update(amount=amount)
+                elif sql.startswith("SELECT payment_id FROM payments"):
+                    self._row = (params[0],) if params[0] in payments.rows else None
+                elif sql.startswith("UPDATE payments SET amount"):        # unconditional update
+                    payments.rows[params[-1]].update(amount=params[0], status="pending")
+                elif sql.startswith("UPDATE payments SET payment_status='paid'"):
+                    row = payments.rows.get(params[-1])
+                    self.rowcount = int(row is not None)
+                    if row:
+                        row["status"] = "paid"
+                elif "FROM booking_qr_codes WHERE" in sql:
+                    raise RuntimeError("QR store unavailable")
+
+            def fetchone(self):
+                return self._row
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def start_transaction(self):
+                pass
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+        return _Conn()
+
+def test_redelivered_approval_keeps_a_paid_payment_paid():
+    from services.event_handlers import register_default_handlers
+    from services.events import Event
+    from services.payment_service import PaymentService
+
+    db = _Payments()
+    dispatcher = OutboxDispatcher(register_default_handlers(EventBus(), db), db)
+    approved = Event(1, BOOKING_APPROVED, 41, {"total_cost": "90.00"}, datetime.now(), 1)
+    assert "issue_qr" in dispatcher.deliver(approved)          # QR failed: the event will be retried
+    assert db.rows[41] == {"amount": "90.00", "status": "pending"}
+    assert PaymentService(db).mark_paid(41)["success"]
+    dispatcher.deliver(approved._replace(attempts=2))          # redelivery runs prepare_payment again
+    assert db.rows[41] == {"amount": "90.00", "status": "paid"}
@@ -0,0 +1,97 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+try:
+    from services.export_service import EXPORT_COLUMNS, ExportService, encode_csv
+except Exception as e:
+    pytest.skip(f"services.export_service not importable: {e}", allow_module_level=True)
+
+NOW = datetime(2025, 9, 6, 12, 0, 0)
+
+def _row(booking_id, updated_at):
+    return (booking_id, 2, "Carl", "carl@example.com", 7, "Toyota", "Corolla",
+            date(2025, 9, 1), date(2025, 9, 3), "approved", Decimal("135.00"),
+            datetime(2025, 9, 1, 9, 0), updated_at,
+            None, None, None, None, None)
+
+class _Bookings:
+    """Fake read connection: answers NOW(3) and the keyset-chunk query from `rows`."""
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def get_read_connection(self):
+        db = self
+
+        class _Cur:
+            def execute(self, sql, params=()):
+                if "NOW(3)" in sql:
+                    self._rows = [(NOW,)]
+                    return
+                db.queries += 1
+                after_ts, _, after_id, cutoff, limit = params
+                key = lambda r: (r[12], r[0])
+                self._rows = sorted((r for r in db.rows
+                                     if key(r) > (after_ts, after_id) and r[12] <= cutoff), key=key)[:limit]
+
+            def fetchone(self):
+                return self._rows[0]
+
+            def fetchall(self):
+                return self._rows
+
+            def close(self):
+                pass
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cur()
+
+            def close(self):
+                pass
+        return _Conn()
+
+def _rows(n, start=NOW - timedelta(hours=1)):
+    # pairs share a timestamp so the booking_id tie-break matters
+    return [_row(i, start + timedelta(seconds=i // 2)) for i in range(1, n + 1)]
+
+def test_serializers_handle_decimal_and_dates():
+    line = encode_csv([_row(1, datetime(2025, 9, 2, 8, 30, 0, 250000))], header=True).splitlines()
+    assert line[0].split(",") == list(EXPORT_COLUMNS)
+    assert "2025-09-01,2025-09-03,approved,135.00,2025-09-01 09:00:00,2025-09-02 08:30:00.250" in line[1]
+
+def test_chunked_gzip_export_then_incremental(tmp_path):
+    db = _Bookings(_rows(7))
+    out = str(tmp_path / "bookings.ndjson.gz")
+    svc = ExportService(db, chunk_size=3)
+    assert svc.export_bookings(out, compress=True)["rows"] == 7
+    assert db.queries == 3                                   # 3 + 3 + 1
+    with gzip.open(out, "rt") as fh:                         # one gzip member per chunk
+        ids = [json.loads(l)["booking_id"] for l in fh]
+    assert ids == list(range(1, 8))
+
+    db.rows[0] = _row(1, NOW - timedelta(minutes=1))         # booking 1 changed
+    db.rows.append(_row(8, NOW - timedelta(seconds=2)))      # too recent: next run
+    assert svc.export_bookings(out, compress=True)["rows"] == 1
+    with gzip.open(out, "rt") as fh:
+        assert [json.loads(l)["booking_id"] for l in fh][-1] == 1
+
+def test_restart_truncates_partial_chunk(tmp_path):
+    db = _Bookings(_rows(5))
+    out = tmp_path / "bookings.csv"
+    svc = ExportService(db, chunk_size=2)
+    svc.export_bookings(str(out), fmt="csv")
+    with open(out, "a") as fh:
+        fh.write("9999,torn")                                # crash mid-chunk
+    db.rows += _rows(6)[5:]                                  # booking 6 arrives
+    svc.export_bookings(str(out), fmt="csv")
+    lines = out.read_text().splitlines()
+    assert lines[0].startswith("booking_id,")
+    assert [int(l.split(",")[0]) for l in lines[1:]] == [1, 2, 3, 4, 5, 6]
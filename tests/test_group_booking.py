@@ -0,0 +1,219 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+try:
+    from services.audit_service import AuditService
+    from services.booking_service import BookingService
+    from services.idempotency import IdempotencyKeys
+    from utils.holds import HoldStore
+except Exception as e:
+    pytest.skip(f"services.booking_service not importable: {e}", allow_module_level=True)
+
+class _DuplicateKey(Exception):
+    errno = 1062
+
+class _GroupCursor:
+    """Fake cursor: cars, bookings (with group_id), day slots and idempotency keys; writes are undone on rollback."""
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self.rowcount = 0
+        self.description = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        db = self.db
+        db.log.append(sql)
+        if sql.startswith("SELECT car_id, daily_rate"):
+            self.description = [("car_id",), ("daily_rate",), ("min_period_days",), ("max_period_days",)]
+            self._rows = [(c, db.cars[c], 1, 30) for c in params if c in db.cars]
+        elif sql.startswith("SELECT DISTINCT car_id FROM booking_day_slots"):
+            cars, (start, end) = params[:-2], params[-2:]
+            self._rows = list({(c,) for c, d in db.slots if c in cars and start <= d <= end})
+            if db.race:                                             # someone books right after the check
+                db.slots.update(db.race)
+                db.race = {}
+        elif sql.startswith("INSERT INTO booking_groups"):
+            db.groups += 1
+            self.lastrowid = db.groups
+        elif sql.startswith("SELECT car_id, booking_id FROM bookings"):
+            self._rows = [(b["car_id"], bid) for bid, b in db.bookings.items() if b["group_id"] == params[0]]
+        elif sql.startswith("INSERT INTO booking_day_slots"):
+            rows = [tuple(params[i:i + 3]) for i in range(0, len(params), 3)]
+            assert rows == sorted(rows)                             # (car_id, day) order
+            if any((car, day) in db.slots for car, day, _ in rows):
+                raise _DuplicateKey("Duplicate entry")
+            for car, day, booking_id in rows:
+                db.slots[(car, day)] = booking_id
+                db.tx.append(("slot", (car, day)))
+        elif sql.startswith("SELECT booking_id, status, total_cost"):
+            self.description = [(c,) for c in ("booking_id", "status", "total_cost", "user_id", "car_id",
+                                               "start_date", "end_date")]
+            self._rows = [(bid, b["status"], b["total_cost"], b["user_id"], b["car_id"], b["start"], b["end"])
+                          for bid, b in sorted(db.bookings.items()) if b["group_id"] == params[0]]
+        elif sql.startswith("UPDATE bookings SET status='approved'"):
+            db.tx.append(("status", (params[1], db.bookings[params[1]]["status"])))
+            db.bookings[params[1]]["status"] = "approved"
+            db.approvals += 1
+        elif sql.startswith("INSERT INTO idempotency_keys"):
+            scope, key, request, _ttl = params
+            if (scope, key) in db.keys:
+                raise _DuplicateKey("Duplicate entry")
+            db.keys[(scope, key)] = [request, None]
+            db.tx.append(("key", (scope, key)))
+        elif sql.startswith("UPDATE idempotency_keys"):
+            response, scope, key = params
+            db.keys[(scope, key)][1] = response
+        elif sql.startswith("SELECT request_hash"):
+            row = db.keys.get(tuple(params))
+            self._rows = [tuple(row)] if row and row[1] is not None else []
+
+    def executemany(self, sql, seq):
+        db = self.db
+        db.log.append("executemany")
+        for user_id, car_id, group_id, start, end, total in seq:
+            bid = len(db.bookings) + 100
+            db.bookings[bid] = {"user_id": user_id, "car_id": car_id, "group_id": group_id, "start": start,
+                                "end": end, "status": "pending", "total_cost": Decimal(total)}
+            db.tx.append(("booking", bid))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+class _GroupDB:
+    def __init__(self, cars):
+        self.cars = cars
+        self.bookings, self.slots = {}, {}
+        self.groups = 0
+        self.race = {}
+        self.keys = {}
+        self.approvals = 0
+        self.tx, self.log = [], []
+
+    def get_connection(self):
+        db = self
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _GroupCursor(db)
+
+            def start_transaction(self):
+                db.tx = []
+
+            def commit(self):
+                db.tx = []
+
+            def rollback(self):
+                for kind, key in reversed(db.tx):
+                    if kind == "booking":
+                        db.bookings.pop(key, None)
+                    elif kind == "slot":
+                        db.slots.pop(key, None)
+                    elif kind == "key":
+                        db.keys.pop(key, None)
+                    else:
+                        db.bookings[key[0]]["status"] = key[1]
+                db.tx = []
+
+            def close(self):
+                pass
+        return _Conn()
+
+    get_read_connection = get_connection
+
+@pytest.fixture(autouse=True)
+def no_audit(monkeypatch):
+    monkeypatch.setattr(AuditService, "record", classmethod(lambda cls, *a, **kw: None))
+    monkeypatch.setattr(BookingService, "holds", HoldStore(ttl=60))
+    IdempotencyKeys.cache.clear()
+
+CARS = {1: Decimal("40.00"), 2: Decimal("50.00"), 3: Decimal("60.00")}
+
+def test_group_is_priced_in_one_query_and_inserted_together():
+    db = _GroupDB(CARS)
+    res = BookingService(db).create_group_booking(9, [1, 2, 3, 2], "2025-09-01", "2025-09-02")
+    assert res["success"] and res["group_id"] == 1
+    assert [b["car_id"] for b in res["bookings"]] == [1, 2, 3]     # duplicates dropped
+    assert Decimal(res["total_cost"]) == sum(Decimal(b["total_cost"]) for b in res["bookings"])
+    assert {b["group_id"] for b in db.bookings.values()} == {1} and len(db.slots) == 6
+    assert sum(q.startswith("SELECT car_id, daily_rate") for q in db.log) == 1
+    assert db.log.count("executemany") == 1
+    assert sum(q.startswith("INSERT INTO booking_day_slots") for q in db.log) == 1
+
+def test_one_unavailable_car_fails_the_whole_group_up_front():
+    db = _GroupDB(CARS)
+    db.slots[(2, date(2025, 9, 2))] = 1
+    res = BookingService(db).create_group_booking(9, [1, 2, 3], "2025-09-01", "2025-09-03")
+    assert not res["success"] and res["unavailable"] == [2]
+    assert db.bookings == {} and db.groups == 0
+
+def test_conflict_at_insert_rolls_back_every_booking():
+    db = _GroupDB(CARS)
+    db.race = {(3, date(2025, 9, 1)): 55}
+    res = BookingService(db).create_group_booking(9, [1, 2, 3], "2025-09-01", "2025-09-01")
+    assert res == {"success": False, "message": "Car is already booked for some of these dates"}
+    assert db.bookings == {} and set(db.slots) == {(3, date(2025, 9, 1))}
+
+def test_missing_car_and_size_limit():
+    svc = BookingService(_GroupDB(CARS))
+    assert svc.create_group_booking(9, [1, 7], "2025-09-01", "2025-09-01")["message"] == "Car(s) not found: 7"
+    assert svc.create_group_booking(9, range(100), "2025-09-01", "2025-09-01")["message"].startswith("At most")
+
+def test_non_numeric_car_ids_fail_without_touching_the_db():
+    db = _GroupDB(CARS)
+    res = BookingService(db).create_group_booking(9, [1, "two"], "2025-09-01", "2025-09-01")
+    assert res == {"success": False, "message": "Car ids must be whole numbers"}
+    assert db.log == []
+
+def test_approve_group_is_all_or_nothing():
+    db = _GroupDB(CARS)
+    svc = BookingService(db)
+    gid = svc.create_group_booking(9, [1, 2, 3], "2025-09-01", "2025-09-01")["group_id"]
+    last = max(db.bookings)
+    db.bookings[last]["status"] = "completed"
+    res = svc.approve_group(1, gid)
+    assert res == {"success": False, "message": f"Booking #{last}: Cannot change booking in status: completed"}
+    assert [b["status"] for b in db.bookings.values()] == ["pending", "pending", "completed"]
+
+    db.bookings[last]["status"] = "pending"
+    res = svc.approve_group(1, gid)
+    assert res["success"] and res["booking_ids"] == sorted(db.bookings)
+    assert {b["status"] for b in db.bookings.values()} == {"approved"}
+    assert Decimal(res["total_cost"]) == Decimal("150.00")
+
+def test_retried_group_approval_with_a_key_replays_the_first_result():
+    db = _GroupDB(CARS)
+    svc = BookingService(db)
+    gid = svc.create_group_booking(9, [1, 2], "2025-09-01", "2025-09-01")["group_id"]
+    first = svc.approve_group(1, gid, idempotency_key="g-1")
+    assert first["success"] and db.approvals == 2
+
+    IdempotencyKeys.cache.clear()                                   # the retry lands on another process
+    again = svc.approve_group(1, gid, idempotency_key="g-1")
+    assert again == dict(first, replayed=True) and db.approvals == 2
+    assert svc.approve_group(1, gid + 1, idempotency_key="g-1")["success"] is False
+
+def test_failed_group_approval_leaves_its_key_free_for_a_retry():
+    db = _GroupDB(CARS)
+    svc = BookingService(db)
+    gid = svc.create_group_booking(9, [1, 2], "2025-09-01", "2025-09-01")["group_id"]
+    last = max(db.bookings)
+    db.bookings[last]["status"] = "completed"
+    assert not svc.approve_group(1, gid, idempotency_key="g-2")["success"]
+    assert db.keys == {}
+
+    db.bookings[last]["status"] = "pending"
+    res = svc.approve_group(1, gid, idempotency_key="g-2")
+    assert res["success"] and "replayed" not in res
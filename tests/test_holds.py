@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+try:
+    from utils.holds import HoldStore
+except Exception as e:
+    pytest.skip(f"utils.holds not importable: {e}", allow_module_level=True)
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+D = date(2025, 9, 1)
+LATER = date(2025, 9, 5)
+
+def test_overlapping_hold_by_someone_else_is_refused():
+    store = HoldStore(ttl=60, clock=_Clock())
+    assert store.place(1, 7, D, date(2025, 9, 3))
+    assert store.place(2, 7, date(2025, 9, 3), LATER) is None
+    assert store.place(2, 7, date(2025, 9, 4), LATER)          # touching, not overlapping
+    assert store.place(2, 8, D, LATER)                          # other car
+    assert store.is_held(7, D, D) and not store.is_held(7, D, D, user_id=1)
+    assert store.held_cars(D, LATER, user_id=2) == {7}
+
+def test_own_hold_is_replaced_and_taken_once():
+    store = HoldStore(ttl=60, clock=_Clock())
+    first = store.place(1, 7, D, LATER)
+    second = store.place(1, 7, D, date(2025, 9, 2))
+    assert store.get(first.hold_id) is None and len(store) == 1
+    assert store.take(second.hold_id, user_id=2) is None        # not yours
+    assert store.take(second.hold_id, user_id=1) == second
+    assert store.take(second.hold_id, user_id=1) is None
+
+def test_holds_expire_from_the_heap():
+    clock = _Clock()
+    store = HoldStore(ttl=60, clock=clock)
+    short = store.place(1, 7, D, D, ttl=10)
+    store.place(2, 8, D, D)
+    clock.now = 10
+    assert store.get(short.hold_id) is None
+    assert store.place(3, 7, D, D)                               # free again
+    clock.now = 61
+    assert store.purge_expired() == 1 and len(store) == 1        # car 8's hold; car 7's lasts until 70
+
+def test_release_hold_only_releases_your_own(monkeypatch):
+    from services.booking_service import BookingService
+
+    store = HoldStore(ttl=60, clock=_Clock())
+    monkeypatch.setattr(BookingService, "holds", store)
+    hold = store.place(1, 7, D, LATER)
+    svc = BookingService(db=object())
+    assert svc.release_hold(2, hold.hold_id) == {"success": False, "message": "Hold not found or expired"}
+    assert store.get(hold.hold_id) == hold
+    assert svc.release_hold(1, hold.hold_id) == {"success": True, "message": "Hold released"}
+    assert store.get(hold.hold_id) is None
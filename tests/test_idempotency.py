@@ -0,0 +1,151 @@
+import pytest
+
+try:
+    from services.idempotency import IdempotencyKeys, KEY_MISMATCH
+    from services.payment_service import PAYMENT_NOT_READY, PaymentService
+except Exception as e:
+    pytest.skip(f"services.idempotency not importable: {e}", allow_module_level=True)
+
+class _DuplicateKey(Exception):
+    errno = 1062
+
+class _Cursor:
+    """Fake cursor: payments updates plus an idempotency_keys table, staged until commit."""
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        db = self.db
+        self.db.statements.append(sql.split(" ")[0])
+        if sql.startswith("INSERT INTO idempotency_keys"):
+            scope, key, request, _ttl = params
+            if (scope, key) in db.keys or (scope, key) in db.staged:
+                raise _DuplicateKey("Duplicate entry")
+            db.staged[(scope, key)] = [request, None]
+        elif sql.startswith("UPDATE idempotency_keys"):
+            response, scope, key = params
+            db.staged[(scope, key)][1] = response
+        elif sql.startswith("SELECT request_hash"):
+            row = db.keys.get(tuple(params))
+            self._rows = [tuple(row)] if row and row[1] is not None else []
+        elif sql.startswith("UPDATE payments"):
+            self.rowcount = int(params[-1] not in db.unprepared)
+            db.pending_paid += self.rowcount
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+class _DB:
+    def __init__(self):
+        self.keys, self.staged = {}, {}
+        self.paid = self.pending_paid = 0
+        self.statements = []
+        self.unprepared = set()             # bookings whose payment row does not exist yet
+
+    def get_connection(self):
+        db = self
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cursor(db)
+
+            def start_transaction(self):
+                db.staged, db.pending_paid = {}, 0
+
+            def commit(self):
+                db.keys.update(db.staged)
+                db.paid += db.pending_paid
+                db.staged, db.pending_paid = {}, 0
+
+            def rollback(self):
+                db.staged, db.pending_paid = {}, 0
+
+            def close(self):
+                pass
+        return _Conn()
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    IdempotencyKeys.cache.clear()
+    yield
+    IdempotencyKeys.cache.clear()
+
+def test_retry_replays_without_running_again():
+    db = _DB()
+    svc = PaymentService(db)
+    first = svc.mark_paid(41, "card", "TXN-1", idempotency_key="till-7-0001")
+    assert first == {"success": True, "message": "Payment marked as PAID"}
+    assert db.paid == 1 and ("mark_paid", "till-7-0001") in db.keys
+    db.statements.clear()
+    again = svc.mark_paid(41, "card", "TXN-1", idempotency_key="till-7-0001")
+    assert again == {**first, "replayed": True}
+    assert db.paid == 1 and db.statements == []                    # served from the cache
+
+def test_replay_survives_a_cold_cache():
+    db = _DB()
+    PaymentService(db).mark_paid(41, idempotency_key="k")
+    IdempotencyKeys.cache.clear()                                   # e.g. another process
+    again = PaymentService(db).mark_paid(41, idempotency_key="k")
+    assert again["replayed"] and db.paid == 1
+    assert db.statements[-1] == "SELECT"
+
+def test_concurrent_attempt_that_loses_the_claim_replays():
+    db = _DB()
+    svc = PaymentService(db)
+    # the first attempt committed between this attempt's lookup and its claim
+    db.keys[("mark_paid", "k")] = [None, None]
+    original_replay = svc.idempotency.replay
+    calls = []
+
+    def replay(scope, key, request):
+        calls.append(key)
+        if len(calls) == 1:
+            db.keys[("mark_paid", "k")] = [request, '{"success": true, "message": "Payment marked as PAID"}']
+            return None
+        return original_replay(scope, key, request)
+
+    svc.idempotency.replay = replay
+    res = svc.mark_paid(41, idempotency_key="k")
+    assert res == {"success": True, "message": "Payment marked as PAID", "replayed": True}
+    assert db.paid == 0                                             # rolled back, not applied twice
+
+def test_key_reused_for_another_request_is_refused():
+    db = _DB()
+    svc = PaymentService(db)
+    svc.mark_paid(41, idempotency_key="k")
+    res = svc.mark_paid(42, idempotency_key="k")
+    assert res == {"success": False, "message": KEY_MISMATCH}
+    assert db.paid == 1
+
+def test_without_a_key_nothing_is_stored():
+    db = _DB()
+    svc = PaymentService(db)
+    svc.mark_paid(41)
+    svc.mark_paid(41)
+    assert db.paid == 2 and db.keys == {}
+
+def test_mark_paid_without_a_payment_row_fails():
+    db = _DB()
+    db.unprepared.add(41)
+    res = PaymentService(db).mark_paid(41, "card", "TXN-1")
+    assert res == {"success": False, "message": PAYMENT_NOT_READY}
+    assert db.paid == 0 and "INSERT" not in db.statements         # no event, no summary refresh
+
+def test_key_of_a_mark_paid_that_found_no_payment_can_be_retried():
+    db = _DB()
+    db.unprepared.add(41)
+    svc = PaymentService(db)
+    assert not svc.mark_paid(41, idempotency_key="till-7-0002")["success"]
+    assert ("mark_paid", "till-7-0002") not in db.keys
+    db.unprepared.clear()                                           # the dispatcher prepared it
+    res = svc.mark_paid(41, idempotency_key="till-7-0002")
+    assert res == {"success": True, "message": "Payment marked as PAID"} and db.paid == 1
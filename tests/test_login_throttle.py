@@ -0,0 +1,130 @@
+import pytest
+
+try:
+    import services.userservice as userservice
+    from services.userservice import LOGIN_FAILED, UserService
+    from utils.throttle import LoginThrottle, MemoryBuckets, TokenBucket
+except Exception as e:
+    pytest.skip(f"utils.throttle not importable: {e}", allow_module_level=True)
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_bucket_allows_burst_then_refills():
+    clock = _Clock()
+    buckets = MemoryBuckets(clock=clock)
+    bucket = TokenBucket(capacity=3, per_second=0.5)
+    assert [buckets.take("k", bucket) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("k", bucket) == pytest.approx(2.0)          # one token every 2 s
+    clock.now += 2.0
+    assert buckets.take("k", bucket) == 0.0
+    assert buckets.take("other", bucket) == 0.0                     # keys are independent
+
+def test_idle_buckets_expire_once_full_again():
+    clock = _Clock()
+    buckets = MemoryBuckets(clock=clock)
+    bucket = TokenBucket(capacity=2, per_second=1.0)
+    buckets.take("a", bucket)
+    buckets.take("b", bucket)
+    buckets.take("b", bucket)
+    clock.now += 1.0                                                # "a" is full, "b" is not
+    assert buckets.purge_expired() == 1 and len(buckets) == 1
+
+def test_memory_is_bounded():
+    buckets = MemoryBuckets(maxsize=10)
+    for i in range(100):
+        buckets.take(f"k{i}", TokenBucket(5, 1.0))
+    assert len(buckets) == 10
+
+def test_login_throttle_checks_client_then_account():
+    throttle = LoginThrottle(MemoryBuckets(clock=_Clock()),
+                             account=TokenBucket(2, 0.1), client=TokenBucket(3, 0.1))
+    assert throttle.check("A@x.com", "till-1") is None
+    assert throttle.check("a@x.com ", "till-2") is None             # same account, normalised
+    scope, wait = throttle.check("a@x.com", "till-3")
+    assert scope == "account" and wait > 0
+    assert throttle.check("b@x.com", "till-1") is None
+    assert throttle.check("c@x.com", "till-1") is None
+    assert throttle.check("d@x.com", "till-1")[0] == "client"
+
+def test_no_client_id_means_account_bucket_only():
+    throttle = LoginThrottle(MemoryBuckets(clock=_Clock()),
+                             account=TokenBucket(2, 0.1), client=TokenBucket(1, 0.1))
+    for email in ("a@x.com", "b@x.com", "c@x.com"):
+        assert throttle.check(email, None) is None                 # no shared "local" client bucket
+    assert throttle.check("a@x.com", None) is None
+    assert throttle.check("a@x.com", None)[0] == "account"
+
+def test_terminal_client_id(monkeypatch):
+    from utils import throttle as throttle_mod
+    monkeypatch.setenv("CAR_RENTAL_CLIENT_ID", "till-9")
+    assert throttle_mod.terminal_client_id() == "till-9"
+    monkeypatch.delenv("CAR_RENTAL_CLIENT_ID")
+    monkeypatch.setattr(throttle_mod.os, "isatty", lambda fd: False)
+    assert throttle_mod.terminal_client_id() is None
+    monkeypatch.setattr(throttle_mod.os, "isatty", lambda fd: True)
+    monkeypatch.setattr(throttle_mod.os, "ttyname", lambda fd: "/dev/pts/3", raising=False)
+    assert throttle_mod.terminal_client_id().endswith(":/dev/pts/3")
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=()):
+        self.db.queries += 1
+
+    def fetchone(self):
+        return None                                                 # no such user
+
+    def close(self):
+        pass
+
+class _DB:
+    queries = 0
+
+    def get_connection(self):
+        db = self
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cursor(db)
+
+            def close(self):
+                pass
+        return _Conn()
+
+def test_unknown_email_costs_a_bcrypt_check_and_gets_the_generic_message(monkeypatch):
+    checked = []
+    monkeypatch.setattr(userservice, "dummy_verify", lambda pw: checked.append(pw) or False)
+    svc = UserService(_DB(), throttle=LoginThrottle(MemoryBuckets()))
+    res = svc.login_user("ghost@x.com", "hunter22")
+    assert res == {"success": False, "message": LOGIN_FAILED}
+    assert checked == ["hunter22"]
+
+def test_throttled_attempts_never_reach_the_database(monkeypatch):
+    monkeypatch.setattr(userservice, "dummy_verify", lambda pw: False)
+    db = _DB()
+    svc = UserService(db, throttle=LoginThrottle(MemoryBuckets(), account=TokenBucket(2, 0.01)))
+    before = userservice.LOGIN_THROTTLED.value(scope="account")
+    for _ in range(2):
+        svc.login_user("victim@x.com", "guess")
+    res = svc.login_user("victim@x.com", "guess")
+    assert not res["success"] and res["retry_after"] > 0
+    assert res["message"].startswith("Too many login attempts")
+    assert db.queries == 2
+    assert userservice.LOGIN_THROTTLED.value(scope="account") == before + 1
+
+def test_dummy_hash_is_built_when_the_service_is_constructed(monkeypatch):
+    from utils import auth
+    UserService(_DB(), throttle=LoginThrottle(MemoryBuckets()))
+    auth.prepare_dummy_hash().join()
+    assert auth._dummy_hash
+    monkeypatch.setattr(auth, "hash_password", lambda pw: pytest.fail("dummy hash built at login"))
+    assert auth.dummy_verify("hunter22") is False
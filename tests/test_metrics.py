@@ -0,0 +1,99 @@
+import threading
+import urllib.request
+
+import pytest
+
+try:
+    from utils.metrics import Registry, SERVICE_CALLS, instrumented
+except Exception as e:
+    pytest.skip(f"utils.metrics not importable: {e}", allow_module_level=True)
+
+@instrumented
+class _MetricsProbe:
+    def ok(self):
+        return {"success": True}
+
+    def refused(self):
+        return {"success": False, "message": "no"}
+
+    def boom(self):
+        raise RuntimeError("boom")
+
+def test_counter_and_gauge_render_prometheus_text():
+    reg = Registry()
+    c = reg.counter("logins_total", "Login attempts", ("outcome",))
+    c.inc(outcome="success")
+    c.inc(2, outcome="failure")
+    g = reg.gauge("pool_in_use", "In use")
+    g.inc(); g.inc(); g.dec()
+    text = reg.render()
+    assert "# TYPE logins_total counter" in text
+    assert 'logins_total{outcome="success"} 1' in text
+    assert 'logins_total{outcome="failure"} 2' in text
+    assert "pool_in_use 1" in text
+
+def test_histogram_buckets_are_cumulative():
+    reg = Registry()
+    h = reg.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v, op="x")
+    text = reg.render()
+    assert 'op_seconds_bucket{op="x",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="x",le="1"} 3' in text
+    assert 'op_seconds_bucket{op="x",le="+Inf"} 4' in text
+    assert 'op_seconds_count{op="x"} 4' in text
+    assert 'op_seconds_sum{op="x"} 4.05' in text
+
+def test_labels_must_match_and_kinds_cannot_clash():
+    reg = Registry()
+    c = reg.counter("a_total", "A", ("x",))
+    with pytest.raises(ValueError):
+        c.inc(y="1")
+    assert reg.counter("a_total", "A", ("x",)) is c
+    with pytest.raises(ValueError):
+        reg.gauge("a_total", "A")
+
+def test_concurrent_increments_are_not_lost():
+    reg = Registry()
+    c = reg.counter("hits_total", "Hits")
+    h = reg.histogram("hit_seconds", "Hit latency")
+
+    def work():
+        for _ in range(5000):
+            c.inc()
+            h.observe(0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert c.value() == 40000
+    assert h.count() == 40000
+
+def test_instrumented_counts_outcomes():
+    probe = _MetricsProbe()
+    before = {o: SERVICE_CALLS.value(service="_MetricsProbe", method=m, outcome=o)
+              for m, o in (("ok", "success"), ("refused", "failure"), ("boom", "error"))}
+    probe.ok()
+    probe.refused()
+    with pytest.raises(RuntimeError):
+        probe.boom()
+    assert SERVICE_CALLS.value(service="_MetricsProbe", method="ok", outcome="success") == before["success"] + 1
+    assert SERVICE_CALLS.value(service="_MetricsProbe", method="refused", outcome="failure") == before["failure"] + 1
+    assert SERVICE_CALLS.value(service="_MetricsProbe", method="boom", outcome="error") == before["error"] + 1
+
+def test_textfile_and_http_exporters(tmp_path):
+    reg = Registry()
+    reg.counter("up_total", "Up").inc()
+    path = tmp_path / "car_rental.prom"
+    reg.write_textfile(str(path))
+    assert "up_total 1" in path.read_text()
+
+    server = reg.serve(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "up_total 1" in body
+    finally:
+        reg.stop()
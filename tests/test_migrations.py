@@ -0,0 +1,38 @@
+import pytest
+
+try:
+    from config.migrate import (
+        MigrationError, load_migrations, pending_migrations, split_statements,
+    )
+except Exception as e:
+    pytest.skip(f"config.migrate not importable: {e}", allow_module_level=True)
+
+def test_split_statements_skips_comments():
+    sql = """
+    -- header
+    -- @explain idx_a: SELECT 1
+    CREATE INDEX idx_a ON t(a);
+
+    ALTER TABLE t
+        ADD INDEX idx_b (b);
+    """
+    stmts = split_statements(sql)
+    assert len(stmts) == 2
+    assert stmts[0] == "CREATE INDEX idx_a ON t(a)"
+    assert stmts[1].startswith("ALTER TABLE t")
+
+def test_shipped_migrations_are_ordered_and_checked():
+    migrations = load_migrations()
+    versions = [m.version for m in migrations]
+    assert versions == sorted(versions) and len(set(versions)) == len(versions)
+    for m in migrations:
+        assert m.statements
+        assert len(m.checksum) == 64
+
+def test_pending_migrations_detects_edited_file():
+    migrations = load_migrations()
+    first = migrations[0]
+    assert pending_migrations({}, migrations) == migrations
+    assert first not in pending_migrations({first.version: first.checksum}, migrations)
+    with pytest.raises(MigrationError):
+        pending_migrations({first.version: "0" * 64}, migrations)
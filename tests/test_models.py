@@ -0,0 +1,44 @@
+import sys
+import pytest
+
+try:
+    from models.models import Booking, Car, User
+except Exception as e:
+    pytest.skip(f"models.models not importable: {e}", allow_module_level=True)
+
+class _Cursor:
+    def __init__(self, columns, rows):
+        self.description = [(c,) for c in columns]
+        self._rows = list(rows)
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+def test_record_keeps_dict_style_access():
+    cur = _Cursor(("car_id", "brand", "model"), [(1, "Toyota", "Corolla"), (2, "Honda", "Civic")])
+    cars = Car.fetchall(cur)
+    assert [c["brand"] for c in cars] == ["Toyota", "Honda"]
+    assert cars[0].model == "Corolla"
+    assert cars[0].get("daily_rate") is None and cars[0].get("daily_rate", 0) == 0
+    assert "brand" in cars[0] and "year" not in cars[0]
+    assert dict(cars[1]) == {"car_id": 2, "brand": "Honda", "model": "Civic"}
+    assert cars[1] == {"car_id": 2, "brand": "Honda", "model": "Civic"}
+    with pytest.raises(KeyError):
+        cars[0]["year"]
+    with pytest.raises(AttributeError):
+        cars[0].year
+
+def test_rows_share_one_index():
+    rows = Booking.fetchall(_Cursor(("booking_id", "status"), [(1, "pending"), (2, "approved")]))
+    assert rows[0]._index is rows[1]._index
+    assert sys.getsizeof(rows[0]) < sys.getsizeof(rows[0].to_dict())
+
+def test_from_values_and_empty_results():
+    user = User.from_values((7, "Carl", "carl@example.com", "customer"))
+    assert user["role"] == "customer" and "password" not in user
+    assert User.fetchone(_Cursor(User.COLUMNS, [])) is None
+    assert User.fetchall(_Cursor(User.COLUMNS, [])) == []
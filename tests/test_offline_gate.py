@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+try:
+    from services.offline_gate import OfflineGate
+    from utils.journal import Journal
+except Exception as e:
+    pytest.skip(f"services.offline_gate not importable: {e}", allow_module_level=True)
+
+class _FakeQR:
+    """Stands in for QRService: a tiny 'database' of booking statuses by token."""
+    signer = None
+
+    def __init__(self):
+        tomorrow = datetime.now() + timedelta(days=1)
+        self.db = {"a": ["approved", 1, tomorrow], "b": ["approved", 2, tomorrow], "c": ["active", 3, tomorrow]}
+        self.online = True
+        self.batches = []
+
+    def gate_snapshot(self, day=None):
+        if not self.online:
+            return {"success": False, "message": "DB connection failed"}
+        return {"success": True, "rows": [
+            {"qr_token": t, "booking_id": bid, "car_id": 10 + bid, "status": st, "expires_at": exp}
+            for t, (st, bid, exp) in self.db.items() if st in ("approved", "active")]}
+
+    def prefetch_tokens(self, day=None, rows=None):
+        self.prefetched = [r["qr_token"] for r in rows]
+        return {"success": True, "cached": len(rows)}
+
+    def scan_batch(self, scans, admin_user_id):
+        if not self.online:
+            return {"success": False, "message": "DB connection failed"}
+        self.batches.append(len(scans))
+        results = []
+        for kind, token, _at in scans:
+            row = self.db[token]
+            want, to = ("approved", "active") if kind == "pickup" else ("active", "completed")
+            if row[0] == want:
+                row[0] = to
+                results.append({"success": True})
+            else:
+                results.append({"success": False, "message": f"Cannot {kind}: status is '{row[0]}'", "status": row[0]})
+        return {"success": True, "results": results}
+
+def test_journal_survives_torn_write_and_compacts(tmp_path):
+    j = Journal(str(tmp_path / "j.jsonl"))
+    j.append({"id": "1"})
+    j.append({"id": "2"})
+    j.close()
+    with open(j.path, "a") as f:
+        f.write('{"id": "3", "kin')          # crash mid-write
+    j.ack(["1"])
+    assert [r["id"] for r in j.pending()] == ["2"]
+    assert j.compact() == 1 and [r["id"] for r in Journal(j.path).records()] == ["2"]
+
+def test_append_after_a_torn_tail_starts_a_new_line(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    with open(path, "w") as f:
+        f.write('{"id":"1"}\n{"id": "2", "kin')            # previous process died mid-write
+    with open(path + ".acked", "w") as f:
+        f.write("1\nx")                                     # torn ack too
+    j = Journal(path)
+    j.append({"id": "3"})
+    j.ack(["3"])
+    j.close()
+    assert [r["id"] for r in j.records()] == ["1", "3"]
+    assert j.acked() == {"1", "x", "3"}
+
+def test_offline_scans_validate_locally_then_replay(tmp_path):
+    qr = _FakeQR()
+    gate = OfflineGate(qr, directory=str(tmp_path), batch_size=2)
+    assert gate.refresh_snapshot()["success"]
+    qr.online = False
+
+    assert gate.scan("pickup", "a", 7)["offline"]
+    assert gate.scan("pickup", "a", 7)["message"] == "Cannot pickup: status is 'active'"   # caught locally
+    assert gate.scan("pickup", "zzz", 7)["message"] == "Invalid QR token"
+    assert gate.scan("return", "c", 7)["success"]
+    assert gate.scan("pickup", "b", 7)["success"]
+    qr.db["b"][0] = "cancelled"                     # changed centrally while the gate was offline
+
+    # a restarted kiosk still sees the unsynced scans
+    assert OfflineGate(qr, directory=str(tmp_path)).status()["pending"] == 3
+    assert not gate.sync()["success"]
+
+    qr.online = True
+    report = gate.sync()
+    assert report["success"] and qr.batches == [2, 1]
+    assert (report["applied"], report["duplicates"], report["pending"]) == (2, 0, 0)
+    assert [(c["booking_id"], c["reason"]) for c in report["conflicts"]] == [(2, "Cannot pickup: status is 'cancelled'")]
+    assert qr.db["a"][0] == "active" and qr.db["c"][0] == "completed"
+    assert gate.status()["pending"] == 0 and (tmp_path / "reconciliation.jsonl").exists()
+
+def test_refresher_takes_a_snapshot_before_the_db_drops(tmp_path):
+    import time
+
+    qr = _FakeQR()
+    gate = OfflineGate(_FakeQR(), directory=str(tmp_path))        # its own QR service stays unused
+    refresher = gate.start_refresher(qr, interval=3600)
+    try:
+        deadline = time.monotonic() + 2
+        while gate.snapshot_taken_at is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        refresher.stop()
+    assert sorted(qr.prefetched) == ["a", "b", "c"]                  # token cache warmed from the same rows
+    qr.online = False
+    assert gate.scan("pickup", "a", 7)["offline"]
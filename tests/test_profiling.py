@@ -0,0 +1,62 @@
+import pstats
+import time
+
+import pytest
+
+try:
+    from utils.profiling import profiled, profiler
+except Exception as e:
+    pytest.skip(f"utils.profiling not importable: {e}", allow_module_level=True)
+
+@profiled
+class _Service:
+    def outer(self):
+        return self.inner() + 1
+
+    def inner(self):
+        return sum(range(1000))
+
+    def slow(self):
+        time.sleep(0.05)
+        return "done"
+
+    def _private(self):
+        return "not wrapped"
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    saved = (profiler.mode, profiler.directory, profiler.interval * 1000)
+    profiler.configure("off", directory=str(tmp_path))
+    yield tmp_path
+    profiler.configure(*saved)
+
+def test_off_by_default_is_a_plain_call(profile_dir):
+    profiler.configure("off", directory=str(profile_dir))
+    assert _Service().outer() == 499501
+    assert list(profile_dir.iterdir()) == []
+
+def test_full_mode_dumps_one_profile_per_outer_action(profile_dir):
+    profiler.configure("full", directory=str(profile_dir))
+    _Service().outer()
+    stats_files = sorted(profile_dir.glob("*.pstats"))
+    assert [p.name.split("-", 3)[-1] for p in stats_files] == ["_Service.outer.pstats"]   # inner is nested
+    funcs = {f[2] for f in pstats.Stats(str(stats_files[0])).stats}
+    assert "inner" in funcs
+    summary = stats_files[0].with_suffix(".txt").read_text()
+    assert "action: _Service.outer" in summary and "top allocations" in summary
+
+def test_sample_mode_attributes_time_to_the_hot_frame(profile_dir):
+    profiler.configure("sample", directory=str(profile_dir), interval_ms=2)
+    assert _Service().slow() == "done"
+    summary = open(profiler.dump()).read()
+    assert "== _Service.slow: 1 calls" in summary
+    assert "slow (test_profiling.py" in summary
+    folded = (profile_dir / "samples.folded").read_text().splitlines()
+    assert folded and all(line.startswith("_Service.slow;") for line in folded)
+
+def test_shutdown_after_switching_off_writes_nothing(profile_dir):
+    profiler.configure("sample", directory=str(profile_dir), interval_ms=2)
+    _Service().slow()
+    profiler.configure("off", directory=str(profile_dir))
+    profiler.shutdown()                       # what the atexit hook runs
+    assert list(profile_dir.iterdir()) == []
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+try:
+    from services.audit_service import AuditService
+    from services.qrcode_service import QRService
+    from utils.ttl_cache import TTLCache
+except Exception as e:
+    pytest.skip(f"services.qrcode_service not importable: {e}", allow_module_level=True)
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_expires_and_evicts_lru():
+    clock = _Clock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1          # "a" is now most recently used
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1
+    clock.now = 11
+    assert cache.get("a") is None and cache.purge_expired() == 1
+
+class _GateCursor:
+    """Fake cursor: a single booking whose UPDATE only matches the expected status."""
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.db.statements.append(" ".join(sql.split()))
+        b = self.db.booking
+        if sql.lstrip().startswith("INSERT INTO outbox_events"):
+            self.db.events.append(params[:2])
+        elif sql.lstrip().startswith("DELETE FROM booking_day_slots"):
+            self.db.released.extend(params)
+        elif sql.lstrip().startswith("UPDATE"):
+            to, _at, _avail, booking_id, token, expected = params[:6]
+            self.rowcount = int(booking_id == b["id"] and token == b["token"] and b["status"] == expected)
+            if self.rowcount:
+                b["status"] = to
+        elif "IN (" in sql:
+            self._rows = [(b["token"], b["id"], 7, b["expires"])] if b["token"] in params else []
+        else:
+            self._rows = [(b["status"], b["expires"])] if params[0] == b["token"] else []
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+class _GateDB:
+    def __init__(self, expires):
+        self.booking = {"id": 1, "token": "tok", "status": "approved", "expires": expires}
+        self.statements = []
+        self.events = []
+        self.released = []
+
+    def get_connection(self):
+        db = self
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _GateCursor(db)
+
+            def start_transaction(self):
+                pass
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+        return _Conn()
+
+@pytest.fixture(autouse=True)
+def audit(monkeypatch):
+    QRService._token_cache.clear()
+    recorded = []
+    monkeypatch.setattr(AuditService, "record", classmethod(lambda cls, *a, **kw: recorded.append(a)))
+    yield recorded
+    QRService._token_cache.clear()
+
+def test_scan_is_one_update_when_token_cached():
+    db = _GateDB(datetime.now() + timedelta(days=1))
+    svc = QRService(db, signer=None)
+    assert svc.scan_pickup("tok", 99)["success"]           # miss: lookup + update
+    db.statements.clear()
+    res = svc.scan_return("tok", 99)
+    assert res == {"success": True, "message": "Booking 1 returned (completed)", "booking_id": 1}
+    # + slots, summary, outbox
+    assert [" ".join(s.split()[:3]) for s in db.statements] == [
+        "UPDATE bookings b", "DELETE FROM booking_day_slots",
+        "INSERT INTO booking_summaries", "INSERT INTO outbox_events"]
+    assert db.released == [1]
+    assert db.events == [("BookingPickedUp", 1), ("BookingReturned", 1)]
+
+def test_scan_keeps_approved_by_and_audits_scanner(audit):
+    db = _GateDB(datetime.now() + timedelta(days=1))
+    QRService(db, signer=None).scan_pickup("tok", 99)
+    update = next(s for s in db.statements if s.startswith("UPDATE"))
+    assert "approved_by" not in update
+    assert audit == [(1, "approved", "active", "pickup", 99)]
+
+def test_second_pickup_reports_current_status():
+    db = _GateDB(datetime.now() + timedelta(days=1))
+    svc = QRService(db, signer=None)
+    results = svc.scan_batch([("pickup", "tok"), ("pickup", "tok"), ("pickup", "nope")], 99)["results"]
+    assert results[0]["success"]
+    assert results[1]["message"] == "Cannot pickup: status is 'active'"
+    assert results[2]["message"] == "Invalid QR token"
+    assert db.events == [("BookingPickedUp", 1)]     # no event for the rejected scans
+
+def test_expired_token_rejected_without_update():
+    db = _GateDB(datetime.now() - timedelta(minutes=1))
+    res = QRService(db, signer=None).scan_pickup("tok", 99)
+    assert res["message"] == "QR token has expired"
+    assert not any(s.startswith("UPDATE") for s in db.statements)
+
+def _signer():
+    from utils.qr_tokens import QRTokenSigner
+    return QRTokenSigner({"k2": "new-secret", "k1": "old-secret"}, active_kid="k2")
+
+def test_signed_token_roundtrip_and_rotation():
+    from utils.qr_tokens import QRTokenSigner
+    expires = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+    old = QRTokenSigner({"k1": "old-secret"}).sign(42, expires)
+    new = _signer().sign(42, expires)
+    assert new.startswith("v1.k2.42.")
+    assert _signer().verify(old) == (True, "ok", 42, expires)    # old kid still verifies
+    assert _signer().verify(new).ok
+    assert _signer().verify(new.replace(".42.", ".43.")).reason == "invalid"
+    assert _signer().verify(new, now=expires + timedelta(seconds=1)).reason == "expired"
+    assert QRTokenSigner({"k1": "old-secret"}).verify(new).reason == "invalid"   # unknown kid
+
+def test_forged_signed_token_rejected_without_db():
+    db = _GateDB(datetime.now() + timedelta(days=1))
+    token = _signer().sign(1, datetime.now() + timedelta(days=1))
+    forged = token[:-1] + ("A" if token[-1] != "A" else "B")
+    assert QRService(db, signer=_signer()).scan_pickup(forged, 99)["message"] == "Invalid QR token"
+    assert db.statements == []
+
+def test_signed_token_scan_skips_lookup():
+    db = _GateDB(datetime.now() + timedelta(days=1))
+    db.booking["token"] = _signer().sign(1, db.booking["expires"])
+    svc = QRService(db, signer=_signer())
+    assert svc.scan_pickup(db.booking["token"], 99)["success"]
+    assert [s.split()[0] for s in db.statements] == ["UPDATE", "INSERT", "INSERT"]   # + summary, outbox
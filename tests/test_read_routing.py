@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+try:
+    from config.database import DatabaseConnection
+except Exception as e:
+    pytest.skip(f"config.database not importable: {e}", allow_module_level=True)
+
+PRIMARY = {"host": "primary", "port": 3306}
+REPLICAS = [{"host": "replica1", "port": 3306}, {"host": "replica2", "port": 3306}]
+
+class _SqliteConn:
+    """A SQLite copy standing in for a MySQL server (one in-memory DB per host)."""
+    def __init__(self, host, log):
+        self.host = host
+        self._db = sqlite3.connect(":memory:")
+        self._db.execute("CREATE TABLE cars (car_id INTEGER, served_by TEXT)")
+        self._db.execute("INSERT INTO cars VALUES (1, ?)", (host,))
+        self.closed = False
+        log.append(host)
+
+    def is_connected(self):
+        return True
+
+    def cursor(self):
+        return self._db.cursor()
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self.closed = True
+        self._db.close()
+
+def _db(lag=None, down=(), **kw):
+    opened = []
+    lag = lag or {}
+
+    def connect(dsn):
+        if dsn["host"] in down:
+            raise ConnectionError("unreachable")
+        return _SqliteConn(dsn["host"], opened)
+
+    db = DatabaseConnection(connect=connect, replicas=REPLICAS, pin_seconds=60,
+                            lag_probe=lambda conn: lag.get(conn.host, 0.0), **kw)
+    db._pinned_until = 0.0
+    return db, opened
+
+def _served_by(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT served_by FROM cars")
+    return cur.fetchone()[0]
+
+def test_reads_round_robin_across_replicas():
+    db, _ = _db()
+    hosts = []
+    for _ in range(4):
+        conn = db.get_read_connection()
+        hosts.append(_served_by(conn))
+        conn.close()
+    assert hosts == ["replica1", "replica2", "replica1", "replica2"]
+
+def test_least_loaded_prefers_idle_replica():
+    db, _ = _db(strategy="least_loaded")
+    busy = db.get_read_connection()
+    assert busy.replica == "replica1:3306"
+    assert db.get_read_connection().replica == "replica2:3306"   # replica1 still has one open
+    busy.close()
+    assert [r["in_flight"] for r in db.router.stats()] == [0, 1]
+
+def test_writes_pin_reads_to_primary(monkeypatch):
+    monkeypatch.setattr("config.database.primary_dsn", lambda: PRIMARY)
+    db, opened = _db()
+    db.get_connection().close()               # a checkout alone does not pin
+    assert _served_by(db.get_read_connection()).startswith("replica")
+    db.get_connection().commit()              # a write
+    assert _served_by(db.get_read_connection()) == "primary"
+    db._pinned_until = 0.0
+    assert _served_by(db.get_read_connection()).startswith("replica")
+
+def test_lagging_or_down_replicas_fall_back(monkeypatch):
+    monkeypatch.setattr("config.database.primary_dsn", lambda: PRIMARY)
+    db, _ = _db(lag={"replica1": 30.0}, down=("replica2",))
+    assert _served_by(db.get_read_connection()) == "primary"
+    assert db._pinned_until == 0.0            # a read fallback does not pin
+    stats = {s["replica"]: s for s in db.router.stats()}
+    assert stats["replica1:3306"]["lag"] == 30.0 and not stats["replica2:3306"]["up"]
+
+def test_quiet_connection_prints_no_banner(monkeypatch, capsys):
+    monkeypatch.setattr("config.database.primary_dsn", lambda: PRIMARY)
+    loud, _ = _db()
+    loud.get_connection()
+    assert "Database connection established" in capsys.readouterr().out
+    quiet, _ = _db(quiet=True)
+    quiet.get_connection()
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,143 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+try:
+    from services.audit_service import AuditService
+    from services.booking_service import BookingService
+    from services.reservations import SlotConflict, booking_days, reserve_days
+    from utils.holds import HoldStore
+except Exception as e:
+    pytest.skip(f"services.booking_service not importable: {e}", allow_module_level=True)
+
+class _DuplicateKey(Exception):
+    errno = 1062
+
+class _SlotCursor:
+    """Fake cursor: bookings plus a booking_day_slots table keyed by (car_id, day)."""
+    description = [("daily_rate",), ("min_period_days",), ("max_period_days",)]
+
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        db = self.db
+        if sql.startswith("SELECT daily_rate"):
+            self._rows = [(Decimal("50.00"), 1, 30)]
+        elif sql.startswith("SELECT 1 FROM booking_day_slots"):
+            car, start, end = params
+            self._rows = [(1,)] if any(c == car and start <= d <= end for c, d in db.slots) else []
+        elif sql.startswith("SELECT status FROM bookings"):
+            self._rows = [(db.bookings[params[0]],)]
+        elif sql.startswith("INSERT INTO bookings"):
+            self.lastrowid = len(db.bookings) + 1
+            db.bookings[self.lastrowid] = "pending"
+            db.tx.append(("booking", self.lastrowid))
+        elif sql.startswith("INSERT INTO booking_day_slots"):
+            rows = [tuple(params[i:i + 3]) for i in range(0, len(params), 3)]
+            if any((car, day) in db.slots for car, day, _ in rows):
+                raise _DuplicateKey("Duplicate entry")
+            for car, day, booking_id in rows:
+                db.slots[(car, day)] = booking_id
+                db.tx.append(("slot", (car, day)))
+        elif sql.startswith("DELETE FROM booking_day_slots"):
+            gone = [k for k, v in db.slots.items() if v in params]
+            for k in gone:
+                del db.slots[k]
+            self.rowcount = len(gone)
+        elif sql.startswith("UPDATE bookings SET status='rejected'"):
+            db.bookings[params[1]] = "rejected"
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+class _SlotDB:
+    def __init__(self):
+        self.bookings = {}
+        self.slots = {}
+        self.tx = []
+
+    def get_connection(self):
+        db = self
+
+        class _Conn:
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _SlotCursor(db)
+
+            def start_transaction(self):
+                db.tx = []
+
+            def commit(self):
+                db.tx = []
+
+            def rollback(self):
+                for kind, key in db.tx:
+                    (db.bookings if kind == "booking" else db.slots).pop(key, None)
+                db.tx = []
+
+            def close(self):
+                pass
+        return _Conn()
+
+    get_read_connection = get_connection
+
+@pytest.fixture(autouse=True)
+def no_audit(monkeypatch):
+    monkeypatch.setattr(AuditService, "record", classmethod(lambda cls, *a, **kw: None))
+    monkeypatch.setattr(BookingService, "holds", HoldStore(ttl=60))
+
+def test_booking_days_are_inclusive():
+    assert booking_days(date(2025, 9, 30), date(2025, 10, 2)) == [
+        date(2025, 9, 30), date(2025, 10, 1), date(2025, 10, 2)]
+
+def test_reserve_days_is_one_insert_and_maps_duplicates():
+    db = _SlotDB()
+    cur = db.get_connection().cursor()
+    reserve_days(cur, 1, 7, date(2025, 9, 1), date(2025, 9, 3))
+    assert len(db.slots) == 3
+    with pytest.raises(SlotConflict):
+        reserve_days(cur, 2, 7, date(2025, 9, 3), date(2025, 9, 4))
+    reserve_days(cur, 3, 8, date(2025, 9, 3), date(2025, 9, 4))    # other car: free
+
+def test_overlapping_booking_fails_and_rolls_back():
+    db = _SlotDB()
+    svc = BookingService(db)
+    first = svc.create_booking(10, 7, "2025-09-01", "2025-09-03")
+    assert first["success"]
+    clash = svc.create_booking(11, 7, "2025-09-03", "2025-09-05")
+    assert clash == {"success": False, "message": "Car is already booked for some of these dates"}
+    assert list(db.bookings) == [first["booking_id"]]               # the clashing row was rolled back
+    assert svc.create_booking(11, 7, "2025-09-04", "2025-09-05")["success"]
+
+def test_reject_releases_slots():
+    db = _SlotDB()
+    svc = BookingService(db)
+    booking_id = svc.create_booking(10, 7, "2025-09-01", "2025-09-03")["booking_id"]
+    assert svc.approve_booking(1, booking_id, approve=False)["success"]
+    assert db.slots == {}
+    assert svc.create_booking(11, 7, "2025-09-02", "2025-09-02")["success"]
+
+def test_hold_blocks_others_and_confirms_into_booking():
+    db = _SlotDB()
+    svc = BookingService(db)
+    held = svc.place_hold(10, 7, "2025-09-01", "2025-09-03")
+    assert held["success"] and db.bookings == {}                    # nothing written
+    blocked = svc.create_booking(11, 7, "2025-09-03", "2025-09-04")
+    assert blocked["message"] == "Car is on hold by another customer for these dates"
+    assert not svc.place_hold(11, 7, "2025-09-02", "2025-09-02")["success"]
+    booked = svc.confirm_hold(10, held["hold_id"])
+    assert booked["success"] and len(db.slots) == 3
+    assert svc.confirm_hold(10, held["hold_id"])["message"] == "Hold not found or expired"
+    assert svc.place_hold(11, 7, "2025-09-03", "2025-09-04")["message"] == \
+        "Car is already booked for some of these dates"
@@ -0,0 +1,66 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+try:
+    from utils.scheduler import Scheduler
+    from utils.sessions import SessionManager
+except Exception as e:
+    pytest.skip(f"utils.scheduler not importable: {e}", allow_module_level=True)
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_jobs_run_on_interval_and_report_stats():
+    clock = _Clock()
+    sched = Scheduler(clock=clock)
+    sched.add("sweep", 60, lambda: 5)
+    assert [r["rows"] for r in sched.run_pending()] == [5]
+    assert sched.run_pending() == []             # not due yet
+    clock.now = 61
+    sched.run_pending()
+    stats = sched.report()[0]
+    assert (stats["runs"], stats["total_rows"], stats["errors"]) == (2, 10, 0)
+    assert stats["last_duration_ms"] is not None
+
+def test_errors_are_recorded_not_raised():
+    sched = Scheduler()
+    sched.add("boom", 60, lambda: 1 / 0)
+    assert "division" in sched.run_job("boom")["error"]
+    assert sched.report()[0]["errors"] == 1
+
+def test_overlapping_run_is_skipped():
+    sched = Scheduler()
+    started, release = threading.Event(), threading.Event()
+    sched.add("slow", 60, lambda: (started.set(), release.wait(5), 1)[2])
+    t = threading.Thread(target=sched.run_job, args=("slow",))
+    t.start()
+    started.wait(5)
+    assert sched.run_job("slow") == {"job": "slow", "ran": False, "reason": "already running"}
+    release.set()
+    t.join()
+    assert sched.report()[0]["runs"] == 1 and sched.report()[0]["skipped"] == 1
+
+def test_cross_worker_guard_only_applies_to_guarded_jobs():
+    @contextmanager
+    def held_elsewhere(name):
+        yield False
+    sched = Scheduler(guard=held_elsewhere)
+    sched.add("db_sweep", 60, lambda: 1)
+    sched.add("local", 60, lambda: 2, guarded=False)
+    results = {r["job"]: r for r in sched.run_all()}
+    assert results["db_sweep"]["reason"] == "locked by another worker"
+    assert results["local"]["rows"] == 2
+
+def test_session_purge():
+    SessionManager._sessions.clear()
+    SessionManager.create({"user_id": 1}, ttl_sec=-1)
+    live = SessionManager.create({"user_id": 2})
+    assert SessionManager.purge_expired() == 1
+    assert list(SessionManager._sessions) == [live]
+    SessionManager._sessions.clear()
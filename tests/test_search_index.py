@@ -0,0 +1,43 @@
+import pytest
+
+try:
+    from utils.search_index import SearchIndex, tokenize
+except Exception as e:
+    pytest.skip(f"utils.search_index not importable: {e}", allow_module_level=True)
+
+@pytest.fixture
+def users():
+    idx = SearchIndex()
+    idx.add(1, "Alice Admin", "admin@carrental.com", payload="admin")
+    idx.add(2, "Carl Customer", "carl@example.com", payload="customer")
+    idx.add(3, "Carla Jones", "cjones@example.com", payload="customer")
+    idx.add(4, "Marcus Carlsen", "marcus@chess.org", payload="customer")
+    return idx
+
+def test_tokenize_splits_letters_and_digits():
+    assert tokenize("Carl", "carl.smith42@example.com") == ("carl", "smith", "42", "example", "com")
+
+def test_exact_ranks_before_prefix_and_substring(users):
+    ids = [doc_id for doc_id, _ in users.search("carl")]
+    assert ids[0] == 2            # exact token "carl"
+    assert ids[1] == 3            # prefix of "carla"
+    assert 4 in ids               # substring of "carlsen" via prefix/trigrams
+
+def test_all_query_tokens_must_match_and_filter(users):
+    assert [d for d, _ in users.search("carl example")] == [2, 3]
+    assert users.search("carl nowhere") == []
+    assert [d for d, _ in users.search("admin", where=lambda role: role == "customer")] == []
+
+def test_trigram_tolerates_substrings(users):
+    assert [d for d, _ in users.search("arcu")] == [4]
+
+def test_updates_and_removals(users):
+    users.add(2, "Carl Renamed", "renamed@example.com", payload="customer")
+    assert 2 in [d for d, _ in users.search("renamed")]
+    users.remove(2)
+    assert 2 not in [d for d, _ in users.search("carl")]
+    assert len(users) == 3
+    assert users.search("renamed") == []
+
+def test_top_k(users):
+    assert len(users.search("example", k=1)) == 1
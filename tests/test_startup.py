@@ -0,0 +1,13 @@
+import pytest
+
+try:
+    from benchmarks.bench_startup import heavy_modules_at_import, time_to_first_menu
+except Exception as e:
+    pytest.skip(f"benchmarks.bench_startup not importable: {e}", allow_module_level=True)
+
+def test_main_import_is_lazy():
+    assert heavy_modules_at_import() == []
+
+def test_menu_appears_without_database():
+    # generous bound: CI machines are slow, the benchmark itself enforces TARGET_MS
+    assert time_to_first_menu() < 2000
@@ -0,0 +1,116 @@
+import pytest
+
+try:
+    from models.models import Booking
+    from utils.pager import page
+    from utils.streaming import open_stream
+except Exception as e:
+    pytest.skip(f"utils.streaming not importable: {e}", allow_module_level=True)
+
+class _LazyCursor:
+    """Unbuffered-style cursor: rows are produced only when fetched."""
+    def __init__(self, n):
+        self.n = n
+        self.fetched = 0
+        self.closed = False
+        self.description = [("booking_id",), ("status",)]
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetchmany(self, size):
+        rows = [(i, "pending") for i in range(self.fetched, min(self.fetched + size, self.n))]
+        self.fetched += len(rows)
+        return rows
+
+    def fetchall(self):
+        raise AssertionError("streaming must not fetchall()")
+
+    def close(self):
+        self.closed = True
+
+class _Conn:
+    def __init__(self, cur):
+        self.cur = cur
+        self.closed = False
+
+    def cursor(self):
+        return self.cur
+
+    def close(self):
+        self.closed = True
+
+def test_stream_fetches_one_batch_at_a_time():
+    cur = _LazyCursor(10_000)
+    conn = _Conn(cur)
+    rows = open_stream(conn, "SELECT ...", (), Booking, batch_size=100)
+    first = next(rows)
+    assert first["booking_id"] == 0 and first.status == "pending"
+    assert cur.fetched == 100
+    assert sum(1 for _ in rows) == 9_999
+    assert cur.closed and conn.closed
+
+def test_pager_quit_closes_stream():
+    cur = _LazyCursor(10_000)
+    conn = _Conn(cur)
+    out = []
+    shown = page((str(r["booking_id"]) for r in open_stream(conn, "SELECT ...", (), Booking, batch_size=50)),
+                 page_size=20,
+                 input_fn=lambda _: "q", out=out.append)
+    assert shown == 20 and out[-1] == "19"
+    assert cur.fetched == 50
+    assert conn.closed
+
+def test_pager_does_not_prompt_after_last_page():
+    prompts = []
+    shown = page([str(i) for i in range(20)], page_size=20,
+                 input_fn=lambda p: prompts.append(p) or "", out=lambda _: None)
+    assert shown == 20 and prompts == []
+
+def test_list_customers_search_path_closes_cleanly(monkeypatch, capsys):
+    from controllers.user_controller import UserController
+
+    ctl = UserController(db=object())
+    users = [{"user_id": 1, "name": "Ann", "email": "ann@example.com", "created_at": "2025-01-01 10:00:00"}]
+    monkeypatch.setattr(ctl, "_require_admin", lambda user, token: user)
+    monkeypatch.setattr(ctl.userservice, "list_customers", lambda search=None: {"success": True, "customers": users})
+    monkeypatch.setattr("builtins.input", lambda prompt="": "ann")
+    ctl.list_customers({"user_id": 9, "role": "admin"}, "token")
+    assert "ann@example.com" in capsys.readouterr().out
+
+class _PooledConn(_Conn):
+    """Pooled connection: the cursor refuses to close while rows are unread."""
+    def consume_results(self):
+        self.cur.fetched = self.cur.n
+
+def test_early_close_consumes_unread_rows_before_release():
+    cur = _LazyCursor(1_000)
+    conn = _PooledConn(cur)
+
+    def close():
+        if cur.fetched < cur.n:
+            raise RuntimeError("Unread result found")
+        cur.closed = True
+    cur.close = close
+    rows = open_stream(conn, "SELECT ...", (), Booking, batch_size=10)
+    next(rows)
+    rows.close()
+    assert cur.closed and conn.closed and cur.fetched == 1_000
+
+def test_list_all_cars_closes_the_stream_when_the_pager_quits(monkeypatch):
+    from controllers import car_controller
+    from controllers.car_controller import CarController
+    from models.models import Car
+
+    ctl = CarController(db=object())
+    cur = _LazyCursor(1_000)
+    cur.description = [("car_id",), ("brand",), ("model",), ("daily_rate",), ("available_now",)]
+    cur.fetchmany = lambda size: [(i, "Kia", "Rio", 30, 1) for i in range(size)]
+    conn = _Conn(cur)
+    monkeypatch.setattr(CarController, "_check_session", staticmethod(lambda *a, **kw: {"user_id": 1}))
+    streams = []                                # still referenced: only an explicit close() releases it
+    monkeypatch.setattr(ctl.car_service, "stream_cars", lambda: {"success": True, "cars": streams.append(
+        open_stream(conn, "SELECT ...", (), Car, batch_size=5)) or streams[-1]})
+    monkeypatch.setattr(car_controller, "page", lambda lines: next(iter(lines)) and 1)   # shows one, then quits
+    ctl.list_all_cars({"user_id": 1, "role": "admin"}, "token")
+    assert conn.closed
@@ -0,0 +1,147 @@
+import csv
+import io
+
+import pytest
+
+try:
+    import services.user_import as user_import
+    from services.search_service import SearchService
+    from services.user_import import UserImportService, hash_all
+except Exception as e:
+    pytest.skip(f"services.user_import not importable: {e}", allow_module_level=True)
+
+class _DuplicateKey(Exception):
+    errno = 1062
+
+class _Cursor:
+    """Fake cursor over a users table keyed by lower(email)."""
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        db = self.db
+        db.log.append(sql)
+        if sql.startswith("SELECT email FROM users"):
+            self._rows = [(db.users[e.lower()][1],) for e in params if e.lower() in db.users]
+        elif sql.startswith("SELECT user_id, email"):
+            self._rows = [(db.users[e.lower()][0], db.users[e.lower()][1]) for e in params]
+        elif sql.startswith("INSERT INTO users"):
+            self._insert([params])
+
+    def executemany(self, sql, seq):
+        self.db.log.append("executemany")
+        self._insert(list(seq))
+
+    def _insert(self, rows):
+        db = self.db
+        if any(email.lower() in db.users for _, email, _ in rows):
+            raise _DuplicateKey("Duplicate entry")
+        for name, email, hashed in rows:
+            db.users[email.lower()] = (len(db.users) + 1, email, hashed)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+class _DB:
+    def __init__(self, existing=()):
+        self.users = {e.lower(): (i + 1, e, "x") for i, e in enumerate(existing)}
+        self.race = set()
+        self.log = []
+
+    def get_connection(self):
+        db = self
+
+        class _Conn:
+            snapshot = None
+
+            def is_connected(self):
+                return True
+
+            def cursor(self):
+                return _Cursor(db)
+
+            def start_transaction(self):
+                for email in db.race:                       # registered after our dedupe query
+                    db.users[email] = (999, email, "x")
+                db.race = set()
+                self.snapshot = dict(db.users)
+
+            def commit(self):
+                self.snapshot = None
+
+            def rollback(self):
+                if self.snapshot is not None:
+                    db.users.clear()
+                    db.users.update(self.snapshot)
+                self.snapshot = None
+
+            def close(self):
+                pass
+        return _Conn()
+
+def _reader(text):
+    return csv.DictReader(io.StringIO(text))
+
+@pytest.fixture(autouse=True)
+def cheap_hash(monkeypatch):
+    monkeypatch.setattr(user_import, "hash_password", lambda pw: "h:" + pw)
+    yield
+    SearchService.reset()
+
+CSV = """name,email,password
+Alice Driver,alice@corp.com,Secret123
+Bob,bob@corp.com,Secret123
+Al,al@corp.com,Secret123
+Carol Driver,carol@corp.com,weak
+Alice Again,ALICE@corp.com,Secret123
+Dave Driver,dave@corp.com,Secret123
+Erin Driver,erin@corp.com,Secret123
+"""
+
+def test_import_validates_dedupes_and_reports_every_line():
+    db = _DB(existing=["dave@corp.com"])
+    res = UserImportService(db, workers=1).import_rows(_reader(CSV))
+    assert res["success"] and (res["imported"], res["failed"]) == (3, 4)
+    by_line = {e["line"]: (e["status"], e["message"]) for e in res["report"]}
+    assert by_line[2] == ("imported", "")
+    assert by_line[4][1] == "Name must be at least 3 characters"
+    assert by_line[5][1].startswith("Password needs")
+    assert by_line[6][1] == "Duplicate of line 2"
+    assert by_line[7][1] == "Email already registered"
+    assert db.users["alice@corp.com"][2] == "h:Secret123"
+    # one IN query for the dedupe, one executemany for the inserts
+    assert sum(q.startswith("SELECT email FROM users") for q in db.log) == 1
+    assert db.log.count("executemany") == 1
+
+def test_chunk_retried_row_by_row_when_an_email_is_taken_meanwhile():
+    db = _DB()
+    db.race = {"bob@corp.com"}
+    text = "name,email,password\nAlice,alice@corp.com,Secret123\nBobby,bob@corp.com,Secret123\n"
+    res = UserImportService(db, workers=1).import_rows(_reader(text))
+    assert [(e["status"], e["message"]) for e in res["report"]] == [
+        ("imported", ""), ("error", "Email already registered")]
+    assert db.users["bob@corp.com"][0] == 999
+
+def test_missing_columns_and_admin_rows_are_refused():
+    assert UserImportService(_DB()).import_rows(_reader("name,email\nx,y\n"))["message"] == \
+        "Missing column(s): password"
+    res = UserImportService(_DB(), workers=1).import_rows(
+        _reader("name,email,password,role\nRoot User,root@corp.com,Secret123,admin\n"))
+    assert res["report"][0]["message"] == "Only customers can be bulk-imported"
+
+def _fast_bcrypt(password):
+    import bcrypt
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(4)).decode()
+
+def test_hash_all_on_a_process_pool(monkeypatch):
+    pytest.importorskip("bcrypt")
+    from utils.auth import verify_password
+    monkeypatch.setattr(user_import, "hash_password", _fast_bcrypt)   # pickled into the workers
+    passwords = [f"Secret{i}A" for i in range(user_import.POOL_MIN_ROWS)]
+    hashes = hash_all(passwords, workers=2)
+    assert all(verify_password(p, h) for p, h in zip(passwords, hashes))